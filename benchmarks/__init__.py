@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+    __init__.py
+    ~~~~~~~~~~~~~~~
+
+    Micro benchmarks, run them as modules e.g. `python -m benchmarks.bench_json_required`
+"""
+from __future__ import print_function
+
+import timeit
+
+
+def bench(name, fn, number=100000, repeat=3):
+    """
+    Times `fn` and prints the best per call cost
+
+    :param str name: label for the results
+    :param fn: callable without arguments
+    :param int number: calls per run
+    :param int repeat: number of runs, the best one is reported
+    :return: best cost per call in microseconds
+    """
+    best = min(timeit.repeat(fn, number=number, repeat=repeat))
+    per_call = best / number * 1e6
+    print('{:<40} {:>10.3f} us/call'.format(name, per_call))
+    return per_call
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_json_backends
+    ~~~~~~~~~~~~~~~
+
+    Encode and decode throughput of the json backends, compared with the flask.json path used before
+
+"""
+from __future__ import print_function
+
+from datetime import datetime
+
+from flask import Flask, json as flask_json
+
+from benchmarks import bench
+from webapp.lib import json_backend
+from webapp.lib.utils import CustomJSONEncoder
+
+PAYLOADS = {
+    'small': {'success': True, 'msg': 'hello world', 'id': 42},
+    'records': {'success': True, 'items': [
+        {'id': i, 'name': u'user %d' % i, 'email': u'user%d@example.com' % i, 'score': i * 1.5,
+         'active': i % 2 == 0, 'tags': [u'a', u'b'], 'created': datetime(2014, 1, 1, 12, 0, i % 60)}
+        for i in range(1000)]},
+    'nested': {'success': True, 'tree': {'level%d' % i: {'values': range(50), 'name': u'node'} for i in range(50)}},
+}
+
+
+def main():
+    app = Flask(__name__)
+    app.json_encoder = CustomJSONEncoder
+    backends = [json_backend.get_backend(name) for name in sorted(json_backend.BACKENDS)]
+
+    with app.app_context():
+        for payload_name, payload in sorted(PAYLOADS.items()):
+            number = 20 if payload_name == 'records' else 2000
+            encoded = json_backend.default_backend.dumps(payload)
+            print('{} payload ({} bytes)'.format(payload_name, len(encoded)))
+
+            bench('  encode flask.json (sorted keys)', lambda: flask_json.dumps(payload), number=number)
+            for backend in backends:
+                bench('  encode %s' % backend.name, lambda: backend.dumps(payload), number=number)
+
+            bench('  decode flask.json', lambda: flask_json.loads(encoded), number=number)
+            for backend in backends:
+                bench('  decode %s' % backend.name, lambda: backend.loads(encoded), number=number)
+
+
+    # cached entries returned by a view: decoded and encoded again, or spliced as raw fragments
+    backend = json_backend.default_backend
+    entries = [backend.dumps(entry) for entry in PAYLOADS['records']['items']]
+    print('cached entries ({} bytes)'.format(sum(len(entry) for entry in entries)))
+    bench('  loads + dumps', lambda: backend.dumps({'items': [backend.loads(entry) for entry in entries]}), number=20)
+    bench('  RawJSON', lambda: backend.dumps({'items': [json_backend.RawJSON(entry) for entry in entries]}),
+          number=20)
+
+
+if __name__ == '__main__':
+    main()
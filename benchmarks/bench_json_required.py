@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_json_required
+    ~~~~~~~~~~~~~~~
+
+    Per request validation cost of the compiled validators against the old `_check_fields`
+
+"""
+from __future__ import print_function
+
+from functools import partial
+
+from benchmarks import bench as _bench
+from webapp.lib.schema import compile_schema
+
+bench = partial(_bench, repeat=7)  # the timings are close, the best of more runs is more stable
+
+
+def legacy_check_fields(json_body, fields_dict, required=True):
+    """ `webapp.lib.api._check_fields` as it was before validators were compiled """
+    errors = []
+    for key, type_field in fields_dict.iteritems():
+        type_name = type_field.__name__
+        if type_field is str:
+            type_field = basestring
+        if type_field is float:
+            type_field = (float, int, long)
+
+        field = json_body.get(key, None)
+        if field is None:
+            if required:
+                errors.append("'%s' field is missing" % key)
+            else:
+                continue
+        elif not isinstance(field, type_field):
+            errors.append('%s field must be type %s' % (key, type_name))
+    return errors
+
+
+REQUIRED = {'name': str, 'email': str, 'age': int, 'weight': float, 'active': bool}
+OPTIONAL = {'nickname': str, 'score': float, 'referrer': int}
+
+VALID = {'name': u'John', 'email': u'john@example.com', 'age': 31, 'weight': 80, 'active': True,
+         'nickname': u'jj', 'score': 2.5}
+INVALID = {'name': 1, 'age': 'old', 'weight': 'heavy', 'active': True, 'score': 'high'}
+
+
+def main():
+    validate = compile_schema(REQUIRED, OPTIONAL)
+
+    def legacy(body):
+        return lambda: legacy_check_fields(body, REQUIRED) + legacy_check_fields(body, OPTIONAL, False)
+
+    print('flat payload, valid')
+    bench('  legacy _check_fields', legacy(VALID))
+    bench('  compiled validator', lambda: validate(VALID))
+    print('flat payload, invalid')
+    bench('  legacy _check_fields', legacy(INVALID))
+    bench('  compiled validator', lambda: validate(INVALID))
+
+    nested = compile_schema({'user': {'name': str, 'address': {'zip': str}}, 'tags': [str]})
+    payload = {'user': {'name': u'John', 'address': {'zip': u'12345'}}, 'tags': [u'a', u'b', u'c', u'd']}
+    print('nested payload, valid (no legacy equivalent)')
+    bench('  compiled validator', lambda: nested(payload))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_json_serializers
+    ~~~~~~~~~~~~~~~
+
+    Encoding of numeric heavy payloads with the serializer registry, numpy arrays are compared with the
+    `json_default` used before
+
+"""
+from __future__ import print_function
+
+import uuid
+from decimal import Decimal
+
+from benchmarks import bench
+from webapp.lib import json_backend
+from webapp.lib.utils import numpy
+
+
+def legacy_json_default(o):
+    """ `webapp.lib.utils.json_default` as it was before the serializer registry """
+    if hasattr(o, 'isoformat'):
+        return o.isoformat()
+    try:
+        iterable = iter(o)
+    except TypeError:
+        pass
+    else:
+        return list(iterable)
+    raise TypeError('%r is not JSON serializable' % (o,))
+
+
+def main():
+    backend = json_backend.default_backend
+    legacy = lambda payload: backend.module.dumps(payload, default=legacy_json_default, allow_nan=False,
+                                                  separators=(',', ':'))
+
+    prices = {'prices': [{'id': i, 'sku': uuid.UUID(int=i), 'price': Decimal('%d.99' % i), 'tags': set([i % 5])}
+                         for i in range(1000)]}
+    bench('records with Decimal, UUID and set', lambda: backend.dumps(prices), number=50)
+
+    if numpy is None:
+        print('numpy is not installed, skipping the array payloads')
+        return
+    arrays = {'series': [numpy.random.rand(1000) for _ in range(20)], 'matrix': numpy.random.rand(100, 100)}
+    print('numpy arrays, %d floats' % (20 * 1000 + 100 * 100))
+    bench('  iterated per element (before)', lambda: legacy(arrays), number=10)
+    bench('  registry (tolist)', lambda: backend.dumps(arrays), number=10)
+
+    # numpy scalars that are not python numbers, e.g. float32, and Decimal or UUID could not be encoded before
+    scalars = {'stats': [numpy.float32(i) for i in range(1000)]}
+    bench('numpy float32 scalars (item)', lambda: backend.dumps(scalars), number=50)
+
+
+if __name__ == '__main__':
+    main()
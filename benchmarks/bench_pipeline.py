@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_pipeline
+    ~~~~~~~~~~~~~~~
+
+    Throughput and latency of the whole request pipeline (hooks, views, errors and serialization) through the
+    test client, on the fixtures of the test suite
+
+    Usage:
+
+        python -m benchmarks.bench_pipeline --output baseline.json
+        python -m benchmarks.bench_pipeline --compare baseline.json  # exits with 1 on regressions
+
+    Every scenario is timed `--repeat` times, the best throughput and p50 of the runs are reported as
+    `benchmarks.bench` does, and the spread of the p50 between runs is kept as the noise of the measure.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+from datetime import datetime
+
+from tests.base import AppBase
+from webapp import AppFactory
+
+
+class Settings(object):
+    TESTING = False  # unexpected exceptions are answered with a 500 instead of being raised
+    BLUEPRINTS = (
+        ('webapp.base.base', ''),
+        ('tests.fixtures.app.views.test', '/test'),
+    )
+    ERROR_LOG_SAMPLING = True
+    JSON_SORT_KEYS = False  # sorted keys, the default of flask and settings, disable the C encoder
+
+
+LARGE_ITEMS = 5000
+
+
+def large_payload():
+    return {'items': [{'id': i, 'name': u'item %d' % i, 'email': u'user%d@example.com' % i, 'score': i * 1.5,
+                       'active': i % 2 == 0, 'tags': [u'a', u'b']} for i in xrange(LARGE_ITEMS)]}
+
+
+class PipelineClient(AppBase):
+    """ AppBase without response checks, the status is checked once per scenario """
+
+    response_decode = False
+
+    selected_app = AppFactory(Settings).get_app(__name__)
+    selected_app.add_url_rule('/bench/large', 'large_payload', large_payload)
+    selected_app.logger.disabled = True  # the 500 scenario would log a traceback per request
+
+
+#: (name, method, path, kwargs of the request, expected status)
+SCENARIOS = [
+    ('hello_world', 'get', '/', {}, 200),
+    ('none_view', 'get', '/test/', {}, 200),
+    ('json_required_success', 'post', '/test/validated', {'data_json': {'name': 'john'}}, 200),
+    ('json_required_failure', 'post', '/test/validated', {'data_json': {'name': 1}}, 400),
+    ('app_error', 'get', '/test/app_error', {}, 400),
+    ('unexpected_error', 'get', '/test/dangerous', {}, 500),
+    ('large_payload', 'get', '/bench/large', {}, 200),
+]
+
+
+def run_scenario(client, method, path, kwargs, expected_status, requests, warmup, repeat):
+    """
+    :return: dict with the best requests per second, the best latency percentiles in milliseconds and the noise,
+        the relative spread of the p50 between the runs
+    """
+    request = getattr(client, method)
+    response = request(path, **dict(kwargs))
+    if response.status_code != expected_status:
+        raise AssertionError('%s %s returned %d instead of %d: %r' % (method.upper(), path, response.status_code,
+                                                                       expected_status, response.data))
+    for _ in xrange(warmup):
+        request(path, **dict(kwargs))
+
+    runs = [_timed_run(request, path, kwargs, requests) for _ in xrange(repeat)]
+    p50s = [run['p50_ms'] for run in runs]
+    return {'requests': requests,
+            'repeat': repeat,
+            'rps': max(run['rps'] for run in runs),
+            'p50_ms': min(p50s),
+            'p99_ms': min(run['p99_ms'] for run in runs),
+            'noise': (max(p50s) - min(p50s)) / min(p50s)}
+
+
+def _timed_run(request, path, kwargs, requests):
+    clock = timeit.default_timer
+    latencies = []
+    started = clock()
+    for _ in xrange(requests):
+        start = clock()
+        request(path, **dict(kwargs))
+        latencies.append(clock() - start)
+    total = clock() - started
+    latencies.sort()
+    return {'rps': requests / total,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000}
+
+
+def percentile(values, percent):
+    """ nearest rank percentile of sorted values """
+    index = max(int(round(percent / 100.0 * len(values))) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def compare(results, baseline, threshold):
+    """
+    :return: list of regressions, a scenario regresses when its throughput drops or its p50 grows by more than
+        `threshold` (a fraction) plus the noise measured in either run, the noise allowance is capped at
+        `threshold` so that a noisy run can at most double the allowed slowdown
+    """
+    regressions = []
+    for name, result in sorted(results.iteritems()):
+        base = baseline.get(name)
+        if base is None:
+            continue
+        noise = max(result.get('noise', 0), base.get('noise', 0))
+        allowed = threshold + min(noise, threshold)
+        if result['rps'] < base['rps'] * (1 - allowed):
+            regressions.append('%s: %.0f req/s, baseline %.0f req/s' % (name, result['rps'], base['rps']))
+        if result['p50_ms'] > base['p50_ms'] * (1 + allowed):
+            regressions.append('%s: p50 %.3fms, baseline %.3fms' % (name, result['p50_ms'], base['p50_ms']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the request pipeline')
+    parser.add_argument('--requests', type=int, default=1000, help='timed requests per run of a scenario')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per scenario, the best one is reported')
+    parser.add_argument('--warmup', type=int, default=200, help='untimed requests per scenario')
+    parser.add_argument('--scenario', action='append', help='scenarios to run, by default all of them')
+    parser.add_argument('--output', help='write the results as json to this file')
+    parser.add_argument('--compare', help='json results of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown, 0.2 is 20%%, plus the noise of the runs up to the same amount')
+    args = parser.parse_args(argv)
+
+    client = PipelineClient()
+    client.setup_class()
+    results = {}
+    print('{:<24} {:>10} {:>10} {:>10} {:>8}'.format('scenario', 'req/s', 'p50 ms', 'p99 ms', 'noise'))
+    for name, method, path, kwargs, status in SCENARIOS:
+        if args.scenario and name not in args.scenario:
+            continue
+        # large payloads are slower by design, keep the run time comparable
+        requests = max(args.requests // 20, 10) if name == 'large_payload' else args.requests
+        warmup = min(args.warmup, requests)
+        result = results[name] = run_scenario(client, method, path, kwargs, status, requests, warmup,
+                                              args.repeat)
+        print('{:<24} {:>10.0f} {:>10.3f} {:>10.3f} {:>7.1f}%'.format(name, result['rps'], result['p50_ms'],
+                                                                       result['p99_ms'], result['noise'] * 100))
+
+    if args.output:
+        report = {'created': datetime.utcnow().isoformat(), 'python': platform.python_version(),
+                  'platform': platform.platform(), 'scenarios': results}
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['scenarios']
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print('REGRESSION %s' % regression, file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
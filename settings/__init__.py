@@ -25,4 +25,86 @@ BEFORE_REQUEST_HOOKS = (
 
 AFTER_REQUEST_HOOKS = (
 
-)
\ No newline at end of file
+)
+
+JSON_STREAM_CHUNK_SIZE = 16384  # bytes buffered before flushing a streamed json response
+
+JSON_BACKEND = 'json'  # json or simplejson, falls back to json if simplejson is not installed
+JSON_SORT_KEYS = True  # as flask, False is faster: sorted keys disable the C encoder of the stdlib json
+
+MAX_BODY_SIZE = None  # bytes, None for no global limit, checked with Content-Length before reading, routes can set their own limit
+BODY_CONTENT_TYPES = None  # accepted request bodies, e.g. ('application/json',), None for any
+
+NDJSON_ON_ERROR = 'fail'  # fail or skip invalid records of ndjson_required views
+NDJSON_MAX_BODY_SIZE = None  # bytes, ndjson bodies are read line by line so they can be bigger than MAX_BODY_SIZE
+NDJSON_MAX_LINE_SIZE = 1024 * 1024  # bytes
+NDJSON_MAX_ERRORS = 100  # invalid records reported with their line numbers, the rest are only counted
+
+RATELIMIT_ENABLED = True  # only used when webapp.lib.ratelimit.limiter is in EXTENSIONS
+RATELIMIT_DEFAULT = None  # limit of the routes without @limiter.limit, e.g. '100/minute'
+RATELIMIT_KEY = 'ip'  # ip, api_key or the import path of a function that returns the client key
+RATELIMIT_API_KEY_HEADER = 'X-Api-Key'
+RATELIMIT_MAX_KEYS = 100000  # buckets kept in memory, the least recently used are evicted
+RATELIMIT_HEADERS = True  # X-RateLimit-Limit and X-RateLimit-Remaining headers
+
+AUTO_ETAG = False  # hash json bodies into strong ETags and answer matching conditional GETs with 304
+
+COMPRESSION = False  # gzip/deflate responses when the client accepts it
+COMPRESSION_LEVEL = 6
+COMPRESSION_MIN_SIZE = 500  # bytes, smaller bodies are sent as they are
+COMPRESSION_SKIP_MIMETYPES = ('image/', 'video/', 'audio/', 'application/zip', 'application/gzip',
+                              'application/x-gzip', 'application/octet-stream')
+
+LAZY_LOADING = False  # import blueprints on the first request under their url prefix and extensions on the first request
+EAGER_LOADING = False  # overrides LAZY_LOADING, for servers that preload the app before forking workers
+
+STARTUP_PROFILING = False  # time every import and registration of get_app, see `python -m webapp.startup_profile`
+
+METRICS_ENABLED = False  # per endpoint request counts, latency histograms and api error counts
+METRICS_ROUTE = '/metrics'  # Prometheus text format
+METRICS_TOKEN = None  # required in METRICS_HEADER or as a bearer token, without one firewall the route
+METRICS_HEADER = 'X-Debug-Token'
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+
+PROFILING_ENABLED = False  # cProfile sampled requests, summarize them with `python -m webapp.request_profiles`
+PROFILING_DIR = os.path.join(ROOT_PATH, 'profiles')  # a directory of pstats files per endpoint
+PROFILING_RATE = 0.0  # fraction of the requests that are profiled
+PROFILING_HEADER = 'X-Profile'  # profiles the request when its value is PROFILING_TOKEN
+PROFILING_TOKEN = None
+PROFILING_MAX_FILES = 1000  # per endpoint
+
+MEMORY_TRACKING = False  # net memory retained by the requests of each endpoint, tracemalloc if installed else RSS
+MEMORY_ROUTE = '/debug/memory'  # json report, only registered with a MEMORY_TOKEN
+MEMORY_HEADER = 'X-Debug-Token'  # the route answers 403 unless its value is MEMORY_TOKEN
+MEMORY_TOKEN = None
+MEMORY_TOP_SITES = 10  # allocation sites kept per endpoint
+MEMORY_FRAMES = 1  # traceback frames stored by tracemalloc per allocation
+MEMORY_SITES_RATE = 0.01  # fraction of the requests whose allocation sites are recorded, two snapshots each
+MEMORY_SNAPSHOT_INTERVAL = 300  # seconds
+MEMORY_GROWTH_SNAPSHOTS = 3  # consecutive snapshots an endpoint has to grow to be reported as growing
+MEMORY_MIN_GROWTH = 1024 * 1024  # bytes retained between snapshots that count as growth
+
+SERVER_TIMING = False  # Server-Timing header with hooks, validation, view and serialization times
+
+BATCH_ENABLED = False  # POST a JSON array of {method, path, body} to run many api calls in one request
+BATCH_ROUTE = '/batch'
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_BODY_SIZE = 1024 * 1024  # bytes
+BATCH_PARALLEL = False  # let clients run independent sub requests in parallel with ?parallel=true
+BATCH_MAX_WORKERS = 4
+
+ERROR_LOG_SAMPLING = False  # log the first tracebacks of a repeated error and then only periodic counts
+ERROR_LOG_FIRST_N = 5
+ERROR_LOG_WINDOW = 60  # seconds between counts
+
+MEMOIZE_MAX_ENTRIES = 10000  # values of @memoize(ttl=...) functions kept per process
+
+PAGINATION_DEFAULT_LIMIT = 20  # page size when the client does not send ?limit=
+PAGINATION_MAX_LIMIT = 100
+
+SERVER_BIND = '127.0.0.1:5000'  # python -m webapp.server, the pre-fork production server
+SERVER_WORKERS = None  # defaults to the number of cores
+SERVER_MAX_REQUESTS = 0  # requests before a worker is replaced, 0 for no limit
+SERVER_REUSE_PORT = False  # a socket per worker with SO_REUSEPORT instead of a shared one
+SERVER_GRACEFUL_TIMEOUT = 30  # seconds workers have to finish their requests when stopping
+SERVER_CONNECTION_TIMEOUT = 30  # seconds a worker waits on a read or write of a slow client
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""
+    extensions
+    ~~~~~~~~~~~~~~~
+
+
+"""
+from webapp.lib.ratelimit import RateLimiter
+
+
+class CountingExtension(object):
+    """ extension that counts how many times it was initialized """
+
+    def __init__(self):
+        self.apps = []
+
+    def init_app(self, app):
+        self.apps.append(app)
+
+counting = CountingExtension()
+
+# rate limiter of the test app, the views of the fixtures use it
+limiter = RateLimiter()
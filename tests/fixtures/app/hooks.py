@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+    hooks
+    ~~~~~~~~~~~~~~~
+
+
+"""
+
+
+def identity(response):
+    return response
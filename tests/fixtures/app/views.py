@@ -6,9 +6,14 @@
     
 """
 from datetime import datetime
-from flask import Blueprint
+from flask import Blueprint, request
 
 from webapp.exceptions import AppBaseException
+from webapp.lib.api import api_success, json_required
+from webapp.lib.conditional import set_version
+from webapp.lib.json_backend import RawJSON
+from webapp.lib.timing import span
+from tests.fixtures.app.extensions import limiter
 
 
 class InvalidSomething(AppBaseException):
@@ -38,4 +43,73 @@ def json_date():
 
 @test.route('/datetime')
 def json_datetime():
-    return {'datetime': datetime.now()}
\ No newline at end of file
+    return {'datetime': datetime.now()}
+
+@test.route('/stream')
+def json_stream():
+    return {'items': ({'id': i} for i in xrange(1000)), 'count': 1000}
+
+
+@test.route('/large')
+def json_large():
+    return {'items': [{'id': i, 'name': 'item %d' % i} for i in xrange(100)]}
+
+
+@test.route('/validated', methods=['POST'])
+@json_required({'name': str})
+def validated():
+    with span('db', 'fake query'):
+        pass
+    return {'name': request.get_json()['name']}
+
+
+@test.route('/raw')
+def raw_response():
+    return RawJSON('{"entry":{"id":1}}')
+
+
+@test.route('/raw_entries')
+def raw_entries():
+    return api_success({'entries': [RawJSON('{"id":%d}' % i) for i in xrange(3)]}, 'cached entries')
+
+
+@test.route('/versioned')
+def versioned():
+    set_version(etag='v1')
+    return {'version': 1}
+
+
+@test.route('/generator')
+def generator_view():
+    return (chunk for chunk in ('streamed ', 'text'))
+
+
+@test.route('/limited')
+@limiter.limit('2/minute')
+def limited():
+    return {}
+
+
+@test.route('/unlimited')
+@limiter.exempt
+def unlimited():
+    return {}
+
+
+try:
+    import trollius
+    from trollius import From, Return
+except ImportError:
+    trollius = None
+else:
+    @test.route('/coroutine')
+    @trollius.coroutine
+    def coroutine_view():
+        yield From(trollius.sleep(0))
+        raise Return({'async': True})
+
+    @test.route('/coroutine_error')
+    @trollius.coroutine
+    def coroutine_error():
+        yield From(trollius.sleep(0))
+        raise InvalidSomething('invalid')
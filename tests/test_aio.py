@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+    test_aio
+    ~~~~~~~~~~~~~~~
+
+    Tests for coroutine views and fan out
+
+"""
+import time
+from nose.plugins.skip import SkipTest
+from nose.tools import *
+
+from tests.base import AppBase
+from tests.fixtures.app.app import app
+from webapp.lib import aio
+
+try:
+    import trollius
+    from trollius import From, Return
+    coroutine = trollius.coroutine
+except ImportError:
+    trollius = None
+    coroutine = lambda fn: fn
+
+
+def setup_module():
+    if trollius is None:
+        raise SkipTest('trollius is not installed')
+
+
+class TestCoroutineViews(AppBase):
+
+    selected_app = app
+
+    def test_coroutine_view(self):
+        r = self.get('/coroutine')
+        ok_(r['async'])
+
+    def test_coroutine_error(self):
+        self.get('/coroutine_error', expect_error='invalid_something')
+
+
+@coroutine
+def double(value, delay=0.05):
+    yield From(trollius.sleep(delay))
+    raise Return(value * 2)
+
+
+def test_fan_out_is_concurrent():
+    start = time.time()
+    results = aio.run_coroutine(aio.fan_out(double(1), double(2), lambda: 3, double(4)))
+    eq_(results, [2, 4, 3, 8])
+    ok_(time.time() - start < 0.15)
+
+
+def test_fan_out_timeouts():
+    with assert_raises(trollius.TimeoutError):
+        aio.run_coroutine(aio.fan_out(double(1), (double(2, delay=1), 0.01)))
+
+    results = aio.run_coroutine(aio.fan_out(double(1), double(2, delay=1), timeout=0.01, return_exceptions=True))
+    ok_(isinstance(results[0], trollius.TimeoutError))
+    ok_(isinstance(results[1], trollius.TimeoutError))
+
+    results = aio.run_coroutine(aio.fan_out(double(1), (double(2, delay=1), 0.01), return_exceptions=True))
+    eq_(results[0], 2)
+    ok_(isinstance(results[1], trollius.TimeoutError))
+
+
+def test_loop_per_thread():
+    loop = aio.get_loop()
+    ok_(loop is aio.get_loop())
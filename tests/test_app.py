@@ -37,4 +37,25 @@ class TestApp(AppBase):
         eq_(r['date'], today)
 
         r = self.get('/datetime')
-        ok_(r['datetime'].startswith(today))
\ No newline at end of file
+        ok_(r['datetime'].startswith(today))
+
+    def test_streamed_response(self):
+        r = self.get('/stream')
+        eq_(r['count'], 1000)
+        eq_(r['items'], [{'id': i} for i in xrange(1000)])
+
+    def test_generator_view(self):
+        # plain generators are response bodies, not coroutines
+        r = self.client.get('/generator')
+        eq_(r.status_code, 200)
+        eq_(r.data, 'streamed text')
+
+    def test_raw_json(self):
+        r = self.get('/raw')
+        eq_(r, {'success': True, 'entry': {'id': 1}})
+        r = self.get('/raw_entries')
+        eq_(r['entries'], [{'id': i} for i in xrange(3)])
+        eq_(r['description'], 'cached entries')
+
+    def test_json_backend(self):
+        ok_(self.app.json_backend is not None)
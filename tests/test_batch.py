@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+    test_batch
+    ~~~~~~~~~~~~~~~
+
+    Tests for the batch endpoint
+
+"""
+from flask import json
+from nose.tools import *
+
+from tests.base import AppBase
+from webapp import AppFactory
+
+
+class Settings(object):
+    BATCH_ENABLED = True
+    BATCH_MAX_REQUESTS = 5
+    BATCH_MAX_BODY_SIZE = 1024
+    BATCH_PARALLEL = True
+    METRICS_ENABLED = True
+    BLUEPRINTS = (
+        ('tests.fixtures.app.views.test', ''),
+    )
+
+
+class TestBatch(AppBase):
+
+    selected_app = AppFactory(Settings).get_app(__name__)
+
+    batch = [
+        {'method': 'GET', 'path': '/json_response'},
+        {'method': 'POST', 'path': '/validated', 'body': {'name': 'batched'}},
+        {'method': 'POST', 'path': '/validated', 'body': {'name': 1}},
+        {'path': '/app_error'},
+        {'path': '/does_not_exist'},
+    ]
+
+    def check_responses(self, r):
+        responses = r['responses']
+        eq_([response['status'] for response in responses], [200, 200, 400, 400, 404])
+        eq_(responses[0]['body']['this'], 'that')
+        eq_(responses[1]['body']['name'], 'batched')
+        eq_(responses[2]['body']['error'], 'invalid_parameters')
+        eq_(responses[3]['body']['error'], 'invalid_something')
+        eq_(responses[4]['body']['error'], 'not_found')
+
+    def test_batch(self):
+        self.check_responses(self.post('/batch', data_json=self.batch))
+
+    def test_parallel_batch(self):
+        self.check_responses(self.post('/batch', data_json=self.batch, parallel='true'))
+
+    def test_query_string(self):
+        r = self.post('/batch', data_json=[{'path': '/json_response?x=1'}])
+        eq_(r['responses'][0]['status'], 200)
+
+    def test_limits(self):
+        self.post('/batch', data_json=self.batch * 2, expect_error='invalid_parameters')
+        r = self.client.post('/batch', data=json.dumps([{'path': '/json_response', 'body': 'x' * 2048}]),
+                             content_type='application/json')
+        eq_(r.status_code, 413)
+        self.post('/batch', data_json={'path': '/'}, expect_error='invalid_body')
+        self.post('/batch', data_json=[], expect_error='invalid_body')
+
+    def test_invalid_sub_requests(self):
+        self.post('/batch', data_json=[{'path': 'relative'}], expect_error='invalid_parameters')
+        self.post('/batch', data_json=[{'path': '/', 'method': 'BREW'}], expect_error='invalid_parameters')
+        self.post('/batch', data_json=[{'path': '/batch', 'method': 'POST'}], expect_error='invalid_parameters')
+        self.post('/batch', data_json=['/'], expect_error='invalid_parameters')
+
+    def test_isolated_sub_requests(self):
+        batch = [{'path': '/versioned'}, {'path': '/json_response'}, {'path': '/app_error'},
+                 {'path': '/does_not_exist'}]
+        for parallel in ('false', 'true'):
+            errors = dict(self.app.metrics.collect()[2])
+            r = self.client.post('/batch?parallel=%s' % parallel, data=json.dumps(batch),
+                                 content_type='application/json', headers={'If-None-Match': '"v1"'})
+            eq_(r.status_code, 200)
+            responses = json.loads(r.data)['responses']
+            eq_([response['status'] for response in responses], [304, 200, 400, 404])
+            counts = self.app.metrics.collect()[2]
+            eq_(counts['invalid_something'] - errors.get('invalid_something', 0), 1)
+            eq_(counts['not_found'] - errors.get('not_found', 0), 1)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+    test_body
+    ~~~~~~~~~~~~~~~
+
+    Tests for the request body limits
+
+"""
+from StringIO import StringIO
+from nose.tools import *
+
+import settings
+from flask import json, request
+from tests.base import AppBase
+from webapp import AppFactory, Flask
+from webapp.lib import api
+from webapp.lib.body import body_limits, check_request_body
+
+app = Flask(__name__)
+app.config['MAX_BODY_SIZE'] = 100
+app.config['BODY_CONTENT_TYPES'] = ('application/json',)
+app.before_request(check_request_body)
+app.errorhandler(Exception)(api.error_handler)
+
+
+@app.route('/echo', methods=['POST'])
+def echo():
+    return {'body': api.get_json_body()}
+
+
+@app.route('/upload', methods=['POST'])
+@body_limits(max_size=1000, content_types=None)
+def upload():
+    return {'size': len(request.get_data())}
+
+
+@app.route('/validated', methods=['POST'])
+@api.json_required({'name': str}, max_size=20)
+def validated():
+    return {}
+
+
+class TestBody(AppBase):
+
+    selected_app = app
+
+    def post_raw(self, path, data, content_type='application/json', chunked=False):
+        if not chunked:
+            return self.client.post(path, data=data, content_type=content_type)
+        # no Content-Length, like a chunked body behind a server that sets wsgi.input_terminated
+        return self.client.post(path, input_stream=StringIO(data), content_type=content_type,
+                                headers={'Transfer-Encoding': 'chunked'},
+                                environ_overrides={'wsgi.input_terminated': True})
+
+    def check_error(self, r, status, error):
+        eq_(r.status_code, status)
+        eq_(json.loads(r.data)['error'], error)
+
+    def test_global_limits(self):
+        eq_(self.post('/echo', data_json={'a': 1})['body'], {'a': 1})
+        self.check_error(self.post_raw('/echo', json.dumps({'a': 'x' * 100})), 413, 'payload_too_large')
+        self.check_error(self.post_raw('/echo', 'a=1', 'application/x-www-form-urlencoded'), 415,
+                         'unsupported_media_type')
+
+    def test_route_limits(self):
+        eq_(json.loads(self.post_raw('/upload', 'x' * 500, 'text/plain').data)['size'], 500)
+        self.check_error(self.post_raw('/upload', 'x' * 1001, 'text/plain'), 413, 'payload_too_large')
+
+    def test_json_required(self):
+        self.post('/validated', data_json={'name': 'a'})
+        self.check_error(self.post_raw('/validated', json.dumps({'name': 'x' * 20})), 413, 'payload_too_large')
+        self.check_error(self.post_raw('/validated', 'name=a', 'text/plain'), 415, 'unsupported_media_type')
+        self.post('/validated', expect_error='invalid_body')
+
+    def test_chunked(self):
+        eq_(json.loads(self.post_raw('/echo', json.dumps({'a': 1}), chunked=True).data)['body'], {'a': 1})
+        self.check_error(self.post_raw('/echo', json.dumps({'a': 'x' * 100}), chunked=True), 413,
+                         'payload_too_large')
+        r = self.post_raw('/upload', 'x' * 800, 'text/plain', chunked=True)
+        eq_(json.loads(r.data)['size'], 800)
+        self.check_error(self.post_raw('/upload', 'x' * 5000, 'text/plain', chunked=True), 413,
+                         'payload_too_large')
+
+    def test_no_global_limit_by_default(self):
+        default_app = AppFactory(settings).get_app(__name__)
+        ok_(check_request_body not in default_app.before_request_funcs.get(None, []))
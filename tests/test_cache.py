@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+    test_cache
+    ~~~~~~~~~~~~~~~
+
+    Tests for the response cache
+
+"""
+from nose.tools import *
+
+from tests.base import AppBase
+from webapp import Flask
+from webapp.exceptions import InvalidParametersException
+from webapp.lib import api
+from webapp.lib.cache import cached_response, MemoryBackend
+
+app = Flask(__name__)
+calls = {'count': 0}
+
+
+@app.route('/cached')
+@cached_response(ttl=60, max_entries=2, query_args=('page',), headers=('Accept-Language',))
+def cached():
+    calls['count'] += 1
+    return {'count': calls['count']}
+
+
+@app.route('/cached_error')
+@cached_response()
+def cached_error():
+    calls['count'] += 1
+    raise InvalidParametersException('nope')
+
+app.errorhandler(Exception)(api.error_handler)
+
+
+class TestCache(AppBase):
+
+    selected_app = app
+
+    def setup(self):
+        cached.cache.clear()
+        calls['count'] = 0
+
+    def test_hit_skips_view(self):
+        eq_(self.get('/cached')['count'], 1)
+        eq_(self.get('/cached')['count'], 1)
+        eq_(calls['count'], 1)
+        eq_(cached.cache.stats()['hits'], 1)
+        r = self.client.get('/cached')
+        eq_(r.mimetype, 'application/json')
+
+    def test_key(self):
+        eq_(self.get('/cached', page=1)['count'], 1)
+        eq_(self.get('/cached', page=1, ignored='x')['count'], 1)
+        eq_(self.get('/cached', page=2)['count'], 2)
+        r = self.client.get('/cached?page=1', headers={'Accept-Language': 'es'})
+        ok_('"count":3' in r.data)
+
+    def test_invalidate(self):
+        eq_(self.get('/cached')['count'], 1)
+        ok_(cached.cache.invalidate('/cached'))
+        eq_(self.get('/cached')['count'], 2)
+
+    def test_lru_eviction(self):
+        evictions = cached.cache.stats()['evictions']
+        self.get('/cached', page=1)
+        self.get('/cached', page=2)
+        self.get('/cached', page=1)
+        self.get('/cached', page=3)  # evicts page 2
+        eq_(cached.cache.stats()['evictions'], evictions + 1)
+        eq_(self.get('/cached', page=1)['count'], 1)
+        eq_(self.get('/cached', page=2)['count'], 4)
+
+    def test_errors_not_cached(self):
+        self.get('/cached_error', expect_error='invalid_parameters')
+        self.get('/cached_error', expect_error='invalid_parameters')
+        eq_(calls['count'], 2)
+
+
+def test_memory_backend_ttl():
+    now = [0]
+    backend = MemoryBackend(clock=lambda: now[0])
+    backend.set('a', 1, ttl=10)
+    backend.set('b', 2)
+    eq_(backend.get('a'), 1)
+    now[0] = 10
+    eq_(backend.get('a'), None)
+    eq_(backend.get('b'), 2)
+    ok_(backend.delete('b'))
+    ok_(not backend.delete('b'))
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+    test_compression
+    ~~~~~~~~~~~~~~~
+
+    Tests for the response compression
+
+"""
+import gzip
+import zlib
+from StringIO import StringIO
+from nose.tools import *
+
+from flask import json
+from tests.base import AppBase
+from webapp import AppFactory
+from webapp.lib.compression import compress_response
+
+
+class Settings(object):
+    COMPRESSION = True
+    COMPRESSION_MIN_SIZE = 100
+    AUTO_ETAG = True
+    BLUEPRINTS = (
+        ('tests.fixtures.app.views.test', ''),
+    )
+
+app = AppFactory(Settings).get_app(__name__)
+
+
+def gunzip(data):
+    return gzip.GzipFile(fileobj=StringIO(data)).read()
+
+
+class TestCompression(AppBase):
+
+    selected_app = app
+    response_decode = False
+
+    def test_gzip(self):
+        r = self.client.get('/stream', headers={'Accept-Encoding': 'gzip, deflate'})
+        eq_(r.headers['Content-Encoding'], 'gzip')
+        ok_('Accept-Encoding' in r.headers['Vary'])
+        response = json.loads(gunzip(r.data))
+        eq_(len(response['items']), 1000)
+
+    def test_deflate(self):
+        r = self.client.get('/stream', headers={'Accept-Encoding': 'deflate'})
+        eq_(r.headers['Content-Encoding'], 'deflate')
+        response = json.loads(zlib.decompress(r.data))
+        eq_(len(response['items']), 1000)
+
+    def test_not_accepted(self):
+        r = self.client.get('/stream')
+        ok_('Content-Encoding' not in r.headers)
+        eq_(len(json.loads(r.data)['items']), 1000)
+        for accept in ('gzip;q=0, br', 'gzip;q=0, deflate;q=0, *', '*;q=0'):
+            r = self.client.get('/stream', headers={'Accept-Encoding': accept})
+            ok_('Content-Encoding' not in r.headers)
+            eq_(len(json.loads(r.data)['items']), 1000)
+
+    def test_qualities(self):
+        for accept in ('gzip;q=0.5, deflate', 'gzip;q=0, *'):
+            r = self.client.get('/stream', headers={'Accept-Encoding': accept})
+            eq_(r.headers['Content-Encoding'], 'deflate')
+            eq_(len(json.loads(zlib.decompress(r.data))['items']), 1000)
+
+    def test_partial_content(self):
+        with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+            response = app.response_class('x' * 1000, status=206)
+            response.headers['Content-Range'] = 'bytes 0-999/5000'
+            ok_('Content-Encoding' not in compress_response(response).headers)
+
+    def test_threshold(self):
+        r = self.client.get('/json_response', headers={'Accept-Encoding': 'gzip'})
+        ok_('Content-Encoding' not in r.headers)
+        eq_(json.loads(r.data)['this'], 'that')
+
+    def test_etag_weakened(self):
+        r = self.client.get('/large', headers={'Accept-Encoding': 'gzip'})
+        eq_(r.headers['Content-Encoding'], 'gzip')
+        eq_(int(r.headers['Content-Length']), len(r.data))
+        ok_(r.headers['ETag'].startswith('W/'))
+        eq_(len(json.loads(gunzip(r.data))['items']), 100)
+
+        # the weak etag of the compressed response matches the strong one of the body
+        etag = r.headers['ETag']
+        r = self.client.get('/large', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        eq_(r.status_code, 304)
+        eq_(r.data, '')
+        r = self.client.get('/large', headers={'If-None-Match': etag})
+        eq_(r.status_code, 304)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+    test_conditional
+    ~~~~~~~~~~~~~~~
+
+    Tests for ETags and conditional GETs
+
+"""
+from datetime import datetime
+from nose.tools import *
+from werkzeug.http import http_date
+
+from tests.base import AppBase
+from webapp import Flask
+from webapp.lib.conditional import set_version
+
+app = Flask(__name__)
+app.config['AUTO_ETAG'] = True
+calls = {'encode': 0}
+
+
+class Counted(object):
+    """ counts how many times the response is encoded """
+
+    def isoformat(self):
+        calls['encode'] += 1
+        return 'encoded'
+
+
+@app.route('/auto', methods=['GET', 'POST'])
+def auto():
+    return {'data': 'same'}
+
+
+@app.route('/versioned', methods=['GET', 'POST', 'PUT'])
+def versioned():
+    set_version(etag='v1', last_modified=datetime(2014, 1, 1))
+    return {'data': Counted()}
+
+
+class TestConditional(AppBase):
+
+    selected_app = app
+    response_decode = False
+
+    def test_auto_etag(self):
+        r = self.get('/auto')
+        eq_(r.status_code, 200)
+        etag = r.headers['ETag']
+        ok_(etag.startswith('"'))
+
+        r = self.client.get('/auto', headers={'If-None-Match': etag})
+        eq_(r.status_code, 304)
+        eq_(r.data, '')
+
+        r = self.client.get('/auto', headers={'If-None-Match': '"other"'})
+        eq_(r.status_code, 200)
+
+    def test_version_token(self):
+        calls['encode'] = 0
+        r = self.get('/versioned')
+        eq_(r.status_code, 200)
+        eq_(r.headers['ETag'], '"v1"')
+        eq_(calls['encode'], 1)
+
+        r = self.client.get('/versioned', headers={'If-None-Match': '"v1"'})
+        eq_(r.status_code, 304)
+        eq_(r.data, '')
+        eq_(r.headers['ETag'], '"v1"')
+        eq_(calls['encode'], 1)
+
+    def test_if_modified_since(self):
+        calls['encode'] = 0
+        r = self.client.get('/versioned', headers={'If-Modified-Since': http_date(datetime(2014, 2, 1))})
+        eq_(r.status_code, 304)
+        r = self.client.get('/versioned', headers={'If-Modified-Since': http_date(datetime(2013, 2, 1))})
+        eq_(r.status_code, 200)
+        eq_(calls['encode'], 1)
+
+    def test_only_get_and_head(self):
+        r = self.client.head('/versioned', headers={'If-None-Match': '"v1"'})
+        eq_(r.status_code, 304)
+        for method in (self.client.post, self.client.put):
+            r = method('/versioned', headers={'If-None-Match': '"v1"'})
+            eq_(r.status_code, 200)
+            ok_(r.data)
+            eq_(r.headers['ETag'], '"v1"')
+        etag = self.get('/auto').headers['ETag']
+        r = self.client.post('/auto', headers={'If-None-Match': etag})
+        eq_(r.status_code, 200)
+        ok_(r.data)
+
+    def test_weak_comparison(self):
+        r = self.client.get('/versioned', headers={'If-None-Match': 'W/"v1"'})
+        eq_(r.status_code, 304)
+        r = self.client.get('/versioned', headers={'If-None-Match': '"v0", W/"v1"'})
+        eq_(r.status_code, 304)
+        etag = self.get('/auto').headers['ETag']
+        for weak in ('W/' + etag, 'w/' + etag):
+            r = self.client.get('/auto', headers={'If-None-Match': weak})
+            eq_(r.status_code, 304)
+            eq_(r.data, '')
+        # If-None-Match takes precedence over If-Modified-Since
+        r = self.client.get('/versioned', headers={'If-None-Match': '"v0"',
+                                                   'If-Modified-Since': http_date(datetime(2014, 2, 1))})
+        eq_(r.status_code, 200)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+    test_errors
+    ~~~~~~~~~~~~~~~
+
+    Tests for the error names and the sampled traceback logging
+
+"""
+from nose.tools import *
+from werkzeug.exceptions import NotFound
+
+from tests.base import AppBase
+from webapp import AppFactory
+from webapp.exceptions import InvalidParametersException
+from webapp.lib import api
+from webapp.lib.errors import TracebackSampler
+
+
+class FakeLogger(object):
+
+    def __init__(self):
+        self.messages = []
+
+    def warning(self, msg, *args):
+        self.messages.append(msg % args if args else msg)
+
+
+def raise_and_log(sampler, logger, error_class=ValueError):
+    try:
+        raise error_class('boom')
+    except error_class as e:
+        return sampler.log(e, logger)
+
+
+def test_error_name_for():
+    eq_(api.error_name_for(InvalidParametersException), 'invalid_parameters')
+    eq_(api.error_name_for(NotFound), 'not_found')
+    ok_(InvalidParametersException in api._error_names)
+
+
+def test_sampler_logs_first_n_then_counts():
+    now = [0]
+    logger = FakeLogger()
+    sampler = TracebackSampler(first_n=2, window=60, clock=lambda: now[0], flush_timer=False)
+
+    ok_(raise_and_log(sampler, logger).startswith('Traceback'))
+    ok_(raise_and_log(sampler, logger))
+    for _ in range(10):
+        eq_(raise_and_log(sampler, logger), None)
+    eq_(len(logger.messages), 2)
+
+    now[0] = 61
+    raise_and_log(sampler, logger)
+    eq_(len(logger.messages), 3)
+    # the errors logged in full are not counted again
+    assert_in('ValueError: boom seen 11 times in 61s (13 in total)', logger.messages[-1])
+
+    now[0] = 70
+    raise_and_log(sampler, logger)
+    eq_(len(logger.messages), 3)
+    eq_(sampler.counters, {'ValueError': 14})
+
+    # the storm is over, the last count is logged once its window is over
+    now[0] = 100
+    sampler.flush()
+    eq_(len(logger.messages), 3)
+    now[0] = 130
+    sampler.flush()
+    eq_(len(logger.messages), 4)
+    assert_in('ValueError: boom seen 1 times in 60s (14 in total)', logger.messages[-1])
+    sampler.flush()
+    eq_(len(logger.messages), 4)
+
+
+def test_sampler_flushed_by_other_errors():
+    now = [0]
+    logger = FakeLogger()
+    sampler = TracebackSampler(first_n=1, window=60, clock=lambda: now[0], flush_timer=False)
+    raise_and_log(sampler, logger, ValueError)
+    raise_and_log(sampler, logger, ValueError)
+    now[0] = 60
+    raise_and_log(sampler, logger, KeyError)
+    eq_(len(logger.messages), 3)
+    assert_in('ValueError: boom seen 1 times in 60s (2 in total)', logger.messages[1])
+
+
+def test_sampler_flush_timer():
+    logger = FakeLogger()
+    sampler = TracebackSampler(first_n=0, window=0.05)
+    raise_and_log(sampler, logger)
+    eq_(logger.messages, [])
+    sampler._timer.join(1)
+    eq_(len(logger.messages), 1)
+    assert_in('seen 1 times', logger.messages[0])
+
+
+def test_sampler_signatures():
+    logger = FakeLogger()
+    sampler = TracebackSampler(first_n=1, flush_timer=False)
+    raise_and_log(sampler, logger, ValueError)
+    raise_and_log(sampler, logger, KeyError)
+    raise_and_log(sampler, logger, ValueError)
+    eq_(len(logger.messages), 2)
+    eq_(sampler.counters, {'ValueError': 2, 'KeyError': 1})
+
+
+class Settings(object):
+    ERROR_LOG_SAMPLING = True
+    ERROR_LOG_FIRST_N = 1
+    BLUEPRINTS = (
+        ('tests.fixtures.app.views.test', ''),
+    )
+
+
+class TestErrorSampling(AppBase):
+
+    selected_app = AppFactory(Settings).get_app(__name__)
+
+    @classmethod
+    def teardown_class(cls):
+        cls.selected_app.error_sampler.close()
+
+    def test_unexpected_exceptions(self):
+        for _ in range(3):
+            self.get('/dangerous', expect_error='unexpected_exception')
+        eq_(self.app.error_sampler.counters['ValueError'], 3)
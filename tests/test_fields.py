@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+    test_fields
+    ~~~~~~~~~~~~~~~
+
+    Tests for sparse fieldsets
+
+"""
+from nose.tools import *
+
+from tests.base import AppBase
+from webapp import Flask
+from webapp.lib import api
+from webapp.lib.fields import parse_fields, is_allowed, project, selectable_fields
+
+app = Flask(__name__)
+app.errorhandler(Exception)(api.error_handler)
+
+USER = {'id': 1, 'name': 'john', 'email': 'john@example.com', 'owner': {'id': 2, 'name': 'jane'}}
+
+
+@app.route('/user')
+@selectable_fields('id', 'name', 'email', 'owner')
+def user():
+    return dict(USER, description='a user')
+
+
+@app.route('/users')
+@selectable_fields('id', 'name', 'owner.id', root='items')
+def users():
+    return {'items': [USER, USER], 'total': 2}
+
+
+@app.route('/users_stream')
+@selectable_fields('id', root='items')
+def users_stream():
+    return {'items': (USER for _ in range(3))}
+
+
+class TestFields(AppBase):
+
+    selected_app = app
+
+    def test_whole_response(self):
+        r = self.get('/user', fields='id,owner.name')
+        eq_(r, {'id': 1, 'owner': {'name': 'jane'}, 'success': True, 'description': 'a user'})
+
+    def test_no_fields(self):
+        r = self.get('/user')
+        eq_(r['email'], USER['email'])
+
+    def test_root(self):
+        r = self.get('/users', fields='name,owner.id')
+        eq_(r['items'], [{'name': 'john', 'owner': {'id': 2}}] * 2)
+        eq_(r['total'], 2)
+
+    def test_stream(self):
+        r = self.get('/users_stream', fields='id')
+        eq_(r['items'], [{'id': 1}] * 3)
+
+    def test_not_selectable(self):
+        self.get('/users', fields='email', expect_error='invalid_parameters')
+        self.get('/users', fields='owner', expect_error='invalid_parameters')
+        self.get('/users', fields='owner.name', expect_error='invalid_parameters')
+
+
+def test_parse_fields():
+    eq_(parse_fields('id, owner.id,owner.name,'), {'id': {}, 'owner': {'id': {}, 'name': {}}})
+    eq_(parse_fields('owner.id,owner'), {'owner': {}})
+    eq_(parse_fields('owner,owner.id'), {'owner': {}})
+    ok_(parse_fields('a,b.c') is parse_fields('a,b.c'))
+
+
+def test_is_allowed():
+    allowed = parse_fields('id,owner')
+    ok_(is_allowed(parse_fields('owner.id'), allowed))
+    ok_(not is_allowed(parse_fields('name'), allowed))
+
+
+def test_project():
+    eq_(project({'a': 1, 'b': [{'c': 1, 'd': 2}]}, parse_fields('b.c')), {'b': [{'c': 1}]})
+    eq_(project({'a': 1}, {}), {'a': 1})
+    eq_(project(5, parse_fields('a')), 5)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+    test_json_backend
+    ~~~~~~~~~~~~~~~
+
+    Tests for the pluggable json backends
+
+"""
+from datetime import date, datetime
+from flask import Flask
+from nose.tools import *
+
+from webapp.lib import json_backend
+from webapp.lib.utils import CustomJSONEncoder
+
+
+class Money(object):
+
+    def __init__(self, cents):
+        self.cents = cents
+
+
+class MoneyEncoder(CustomJSONEncoder):
+
+    def default(self, o):
+        if isinstance(o, Money):
+            return '%.2f' % (o.cents / 100.0)
+        return super(MoneyEncoder, self).default(o)
+
+
+def check_backend(backend):
+    eq_(backend.dumps({'a': [1, 2]}), '{"a":[1,2]}')
+    eq_(backend.dumps({'date': date(2014, 1, 2)}), '{"date":"2014-01-02"}')
+    eq_(backend.dumps({'datetime': datetime(2014, 1, 2, 3, 4, 5)}), '{"datetime":"2014-01-02T03:04:05"}')
+    eq_(backend.dumps({'set': set([1])}), '{"set":[1]}')
+    eq_(backend.dumps({'gen': (i for i in range(3))}), '{"gen":[0,1,2]}')
+    with assert_raises(ValueError):
+        backend.dumps({'nan': float('nan')})
+    with assert_raises(TypeError):
+        backend.dumps({'obj': object()})
+
+    eq_(backend.loads('{"a":[1,2],"b":"c"}'), {'a': [1, 2], 'b': 'c'})
+    with assert_raises(ValueError):
+        backend.loads('{not json')
+
+
+def test_backends():
+    for name in json_backend.BACKENDS:
+        yield check_backend, json_backend.get_backend(name)
+
+
+def test_sort_keys():
+    backend = json_backend.get_backend('json', sort_keys=True)
+    eq_(backend.dumps({'b': 1, 'a': 2}), '{"a":2,"b":1}')
+
+
+def test_fallback_to_stdlib():
+    json_backend.BACKENDS['missing'] = 'a_json_library_that_does_not_exist'
+    try:
+        backend = json_backend.get_backend('missing')
+        eq_(backend.name, 'json')
+        check_backend(backend)
+    finally:
+        del json_backend.BACKENDS['missing']
+
+
+def test_unknown_backend():
+    with assert_raises(ValueError):
+        json_backend.get_backend('yaml')
+
+
+def test_sorted_keys_by_default():
+    # as flask's JSON_SORT_KEYS, apps opt out for the C encoder
+    eq_(json_backend.backend_from_config({}).dumps({'b': 1, 'a': 2}), '{"a":2,"b":1}')
+
+
+def test_backend_from_config():
+    backend = json_backend.backend_from_config({'JSON_BACKEND': 'json', 'JSON_SORT_KEYS': True})
+    eq_(backend.name, 'json')
+    ok_(backend.sort_keys)
+    ok_(backend.ensure_ascii)
+
+
+def test_raw_json():
+    backend = json_backend.get_backend('json', sort_keys=True)
+    raw = json_backend.RawJSON('{"name":"cached","tags":["a"]}')
+    eq_(backend.dumps({'id': 1, 'entry': raw}), '{"entry":{"name":"cached","tags":["a"]},"id":1}')
+    eq_(backend.dumps([raw, json_backend.RawJSON('2')]), '[{"name":"cached","tags":["a"]},2]')
+    eq_(backend.dumps(raw), raw.encoded)
+    # strings that look like a placeholder are encoded as they are
+    eq_(backend.dumps({'a': json_backend._RAW_TOKEN + '0'}), '{"a":"%s0"}' % json_backend._RAW_TOKEN)
+
+
+def test_raw_json_unicode():
+    backend = json_backend.get_backend('json', ensure_ascii=False)
+    eq_(backend.dumps([u'ñ', json_backend.RawJSON(u'"ü"'.encode('utf-8'))]), u'["ñ","ü"]')
+
+
+def test_raw_json_validation():
+    invalid = {'raw': json_backend.RawJSON('{not json')}
+    eq_(json_backend.get_backend('json').dumps(invalid), '{"raw":{not json}')
+    with assert_raises(ValueError):
+        json_backend.backend_from_config({'DEBUG': True}).dumps(invalid)
+
+
+def test_app_json_encoder_fallback():
+    backend = json_backend.get_backend('json')
+    with assert_raises(TypeError):
+        backend.dumps({'price': Money(150)})
+    app = Flask(__name__)
+    app.json_encoder = MoneyEncoder
+    with app.app_context():
+        eq_(backend.dumps({'price': Money(150)}), '{"price":"1.50"}')
+        with assert_raises(TypeError):
+            backend.dumps({'obj': object()})
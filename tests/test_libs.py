@@ -6,6 +6,10 @@
     Libs module tests
 
 """
+import uuid
+from datetime import date
+from decimal import Decimal
+from nose.plugins.skip import SkipTest
 from nose.tools import *
 
 from flask import Flask, json
@@ -23,6 +27,49 @@ def test_camel_case_to_underscore():
     eq_(utils.camel_case_to_underscore('MoreComplicatedExpression'), 'more_complicated_expression')
 
 
+class Point(object):
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+
+class Point3D(Point):
+    pass
+
+
+def test_json_default():
+    eq_(utils.json_default(date(2014, 1, 2)), '2014-01-02')
+    eq_(utils.json_default(Decimal('1.50')), '1.50')
+    eq_(utils.json_default(Decimal('0.10000000000000000001')), '0.10000000000000000001')  # no float rounding
+    eq_(utils.json_default(uuid.UUID(int=1)), '00000000-0000-0000-0000-000000000001')
+    eq_(utils.json_default(frozenset([1])), [1])
+    eq_(utils.json_default(x for x in range(2)), [0, 1])
+    with assert_raises(TypeError):
+        utils.json_default(object())
+
+
+def test_json_serializer():
+    with assert_raises(TypeError):
+        utils.json_default(Point(1, 2))
+    utils.json_serializer(Point)(lambda point: [point.x, point.y])
+    try:
+        eq_(utils.json_default(Point(1, 2)), [1, 2])
+        eq_(utils.json_default(Point3D(3, 4)), [3, 4])  # found along the MRO
+        ok_(utils.serializer_for(Point3D) is utils.serializer_for(Point))
+    finally:
+        del utils._serializers[Point]
+        utils._class_serializers.clear()
+
+
+def test_json_default_numpy():
+    if utils.numpy is None:
+        raise SkipTest('numpy is not installed')
+    numpy = utils.numpy
+    eq_(utils.json_default(numpy.arange(3)), [0, 1, 2])
+    eq_(utils.json_default(numpy.array([[1.5], [2.5]])), [[1.5], [2.5]])
+    value = utils.json_default(numpy.int32(7))
+    eq_((value, type(value)), (7, int))
+
+
 def test_api_success_data_description():
     with app.test_request_context():
         description = 'test description'
@@ -161,4 +208,37 @@ def test_error_unexpected_exception_debug():
         response = json.loads(r.data)
         assert_false(response['success'])
         eq_(response['error'], 'unexpected_exception')
-        assert_in('tb', response)
\ No newline at end of file
+        assert_in('tb', response)
+
+def test_api_success_stream():
+    app.config['JSON_STREAM_CHUNK_SIZE'] = 64
+    try:
+        with app.test_request_context():
+            r = api.api_success({'items': (i for i in xrange(100)), 'total': 100}, 'streamed')
+            ok_(r.is_streamed)
+            eq_(r.mimetype, 'application/json')
+            chunks = list(r.response)
+            ok_(len(chunks) > 1)
+
+            # checking response
+            response = json.loads(''.join(chunks))
+            ok_(response['success'])
+            eq_(response['description'], 'streamed')
+            eq_(response['total'], 100)
+            eq_(response['items'], range(100))
+    finally:
+        app.config.pop('JSON_STREAM_CHUNK_SIZE')
+
+
+def test_api_success_empty_stream():
+    with app.test_request_context():
+        r = api.api_success({'items': iter([])})
+        ok_(r.is_streamed)
+        response = json.loads(r.get_data())
+        eq_(response['items'], [])
+        ok_(response['success'])
+
+
+def test_peak_rss_units():
+    in_bytes = utils.peak_rss('darwin')  # getrusage reports kilobytes here, read as bytes on macOS
+    ok_(0 < in_bytes * 1024 <= utils.peak_rss('linux2'))
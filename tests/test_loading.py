@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+    test_loading
+    ~~~~~~~~~~~~~~~
+
+    Tests for lazy loading of blueprints and extensions
+
+"""
+import sys
+import threading
+from nose.tools import *
+
+from flask import url_for
+from tests.base import AppBase
+from tests.fixtures.app.extensions import counting
+from webapp import AppFactory
+from webapp.lib.loading import LazyLoader
+
+
+class Settings(object):
+    LAZY_LOADING = True
+    BLUEPRINTS = (
+        ('tests.fixtures.app.views.test', '/lazy'),
+    )
+    EXTENSIONS = (
+        'tests.fixtures.app.extensions.counting',
+    )
+
+
+class EagerSettings(Settings):
+    EAGER_LOADING = True
+
+
+class TestLazyLoading(AppBase):
+
+    def setup(self):
+        del counting.apps[:]
+        self._app = AppFactory(Settings).get_app(__name__)
+
+    def test_loaded_on_first_request(self):
+        ok_(self.app.lazy_loader.pending)
+        ok_('test' not in self.app.blueprints)
+        eq_(counting.apps, [])
+
+        # the extension is initialized on the first request, the blueprint only for its prefix
+        self.client.get('/other')
+        eq_(counting.apps, [self.app])
+        ok_('test' not in self.app.blueprints)
+
+        self.get('/lazy/json_response')
+        ok_('test' in self.app.blueprints)
+        ok_(not self.app.lazy_loader.pending)
+        eq_(counting.apps, [self.app])
+
+    def test_concurrent_first_requests(self):
+        threads = [threading.Thread(target=self.app.test_client().get, args=('/lazy/',)) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        eq_(counting.apps, [self.app])
+        ok_('test' in self.app.blueprints)
+
+    def test_url_for(self):
+        with self.app.test_request_context('/other'):
+            eq_(url_for('test.json_response'), '/lazy/json_response')
+
+    def test_load_all(self):
+        self.app.lazy_loader.load_all()
+        ok_('test' in self.app.blueprints)
+        eq_(counting.apps, [self.app])
+
+
+def test_blueprint_without_prefix():
+    loaded = []
+    loader = LazyLoader()
+    loader.add_blueprint(None, lambda: loaded.append('blueprint'))
+    loader.load_for_path('/anything')
+    eq_(loaded, ['blueprint'])
+    ok_(not loader.pending)
+
+
+def test_eager_loading():
+    del counting.apps[:]
+    app = AppFactory(EagerSettings).get_app(__name__)
+    eq_(app.lazy_loader, None)
+    ok_('test' in app.blueprints)
+    eq_(counting.apps, [app])
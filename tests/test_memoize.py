@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+    test_memoize
+    ~~~~~~~~~~~~~~~
+
+    Tests for the memoization of helper functions
+
+"""
+import threading
+import time
+from nose.tools import *
+
+from tests.base import AppBase
+from webapp import AppFactory
+from webapp.lib.memoize import memoize, invalidate_tags, MemoStore, MISSING, default_store
+
+calls = []
+
+
+@memoize()
+def current_user():
+    calls.append('user')
+    return {'id': 1}
+
+
+@memoize(ttl=60, tags=('tenant:{0}',))
+def tenant_config(tenant_id):
+    calls.append(tenant_id)
+    return {'tenant': tenant_id}
+
+
+class Settings(object):
+    BLUEPRINTS = ()
+
+
+app = AppFactory(Settings).get_app(__name__)
+
+
+@app.route('/memo/<int:tenant_id>')
+def memo_view(tenant_id):
+    for _ in range(3):
+        current_user()
+        tenant_config(tenant_id)
+    return {}
+
+
+class TestMemoize(AppBase):
+
+    selected_app = app
+
+    def setup(self):
+        del calls[:]
+        default_store.clear()
+
+    def test_request_memo(self):
+        self.get('/memo/1')
+        eq_(calls, ['user', 1])
+        self.get('/memo/1')  # the request memo is cleared, the process store is not
+        eq_(calls, ['user', 1, 'user'])
+
+    def test_invalidate_tags(self):
+        self.get('/memo/1')
+        self.get('/memo/2')
+        eq_(invalidate_tags('tenant:1'), 1)
+        self.get('/memo/1')
+        self.get('/memo/2')
+        eq_(sorted(calls, key=str), [1, 1, 2] + ['user'] * 4)
+
+    def test_stats(self):
+        before = tenant_config.memo.stats()
+        self.get('/memo/3')
+        self.get('/memo/3')
+        stats = tenant_config.memo.stats()
+        eq_(stats['misses'] - before['misses'], 1)
+        eq_(stats['hits'] - before['hits'], 1)
+        eq_(stats['request_hits'] - before['request_hits'], 4)
+        ok_(0 < stats['hit_ratio'] < 1)
+
+    def test_invalidate_key(self):
+        tenant_config(4)
+        ok_(tenant_config.memo.invalidate(4))
+        tenant_config(4)
+        eq_(calls, [4, 4])
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_store_ttl_and_size():
+    clock = Clock()
+    store = MemoStore(max_entries=2, clock=clock)
+    store.set('a', 1, ttl=10, tags=['x'])
+    store.set('b', None)
+    eq_(store.get('a'), 1)
+    eq_(store.get('b'), None)  # None is a value
+    store.set('c', 3, tags=['x'])
+    eq_(store.get('a'), MISSING)  # evicted, b was used more recently
+    eq_(store.evictions, 1)
+    clock.now += 11
+    store.set('d', 4, ttl=10)
+    eq_(store.get('d'), 4)
+    eq_(store.invalidate('x'), 1)
+    eq_(len(store), 1)
+
+
+def test_single_flight():
+    store = MemoStore()
+    computed = []
+
+    def compute():
+        computed.append(1)
+        time.sleep(0.1)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get_or_compute('k', compute)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    eq_(len(computed), 1)
+    eq_(sorted(results), [('value', False)] + [('value', True)] * 4)
+
+
+def test_invalidated_while_computing():
+    store = MemoStore()
+
+    def compute():
+        store.invalidate('t')
+        return 'stale'
+
+    eq_(store.get_or_compute('k', compute, tags=['t']), ('stale', False))
+    eq_(store.get('k'), MISSING)
+
+
+def test_deleted_while_computing():
+    store = MemoStore()
+
+    def compute():
+        store.delete('k')
+        return 'stale'
+
+    eq_(store.get_or_compute('k', compute), ('stale', False))
+    eq_(store.get('k'), MISSING)
+
+
+def test_other_keys_invalidated_while_computing():
+    store = MemoStore()
+    store.set('other', 1, tags=['u'])
+
+    def compute():
+        store.delete('other')
+        store.invalidate('u')
+        return 'value'
+
+    eq_(store.get_or_compute('k', compute, tags=['t']), ('value', False))
+    eq_(store.get('k'), 'value')
+    eq_(store.get('other'), MISSING)
+
+
+def test_stats_from_threads():
+    @memoize(shared=False)
+    def double(value):
+        return value * 2
+
+    def run():
+        for i in range(500):
+            double(i)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    eq_(double.memo.stats()['misses'], 2000)
+
+def test_functions_with_the_same_name():
+    def make(kind):
+        @memoize(ttl=60)
+        def load(object_id):
+            return kind, object_id
+        return load
+
+    eq_(make('user')(1), ('user', 1))
+    eq_(make('tenant')(1), ('tenant', 1))
+
+
+def test_unhashable_arguments():
+    @memoize(ttl=10)
+    def echo(value):
+        return value
+    eq_(echo([1]), [1])
+    eq_(echo.memo.stats()['misses'], 0)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+    test_memory
+    ~~~~~~~~~~~~~~~
+
+    Tests for the per endpoint memory tracking
+
+"""
+from nose.tools import *
+
+from tests.base import AppBase
+from webapp import AppFactory
+from webapp.lib import metrics
+from webapp.lib.memory import MemoryTracker
+
+
+class Settings(object):
+    MEMORY_TRACKING = True
+    MEMORY_TOKEN = 'secret'
+    BLUEPRINTS = (
+        ('tests.fixtures.app.views.test', ''),
+    )
+
+
+class TestMemoryRoute(AppBase):
+
+    selected_app = AppFactory(Settings).get_app(__name__)
+
+    def test_report(self):
+        self.get('/json_response')
+        self.client.get('/does_not_exist')
+        r = self.client.get('/debug/memory?snapshot=1', headers={'X-Debug-Token': 'secret'})
+        eq_(r.status_code, 200)
+        report = self.app.json_backend.loads(r.data)
+        ok_(report['success'])
+        assert_in(report['backend'], ('tracemalloc', 'rss'))
+        ok_(report['process']['rss'] > 0)
+        ok_(report['snapshots'] >= 1)
+        eq_(report['endpoints']['test.json_response']['requests'], 1)
+        assert_in('unmatched', report['endpoints'])
+
+    def test_token_required(self):
+        eq_(self.client.get('/debug/memory').status_code, 403)
+        eq_(self.client.get('/debug/memory', headers={'X-Debug-Token': 'wrong'}).status_code, 403)
+
+
+class AllHooksSettings(Settings):
+    METRICS_ENABLED = True
+    PROFILING_ENABLED = True
+
+
+def test_hooks_order():
+    app = AppFactory(AllHooksSettings).get_app(__name__)
+    eq_(app.before_request_funcs[None][:3], [metrics.start_timer, app.request_profiler.start,
+                                             app.memory_tracker.start])
+    eq_(app.teardown_request_funcs[None][:2], [app.memory_tracker.finish, app.request_profiler.finish])
+    eq_(app.after_request_funcs[None][0], metrics.record_request)
+    with app.test_client() as client:
+        eq_(client.get('/json_response').status_code, 200)
+    eq_(app.memory_tracker.report()['endpoints']['test.json_response']['requests'], 1)
+    eq_(app.metrics.collect()[0][('test.json_response', 'GET', 200)], 1)
+class FakeMemory(object):
+
+    def __init__(self):
+        self.now = 0.0
+        self.used = 0
+
+    def clock(self):
+        return self.now
+
+    def measure(self):
+        return self.used
+
+
+def test_growing_endpoints():
+    memory = FakeMemory()
+    tracker = MemoryTracker(snapshot_interval=60, growth_snapshots=2, min_growth=100,
+                            measure=memory.measure, clock=memory.clock)
+    eq_(tracker.backend, 'rss')
+    for _ in range(3):
+        tracker.record('leaky', 80)
+        tracker.record('leaky', 80)
+        tracker.record('stable', 200)
+        tracker.record('stable', -200)
+        memory.now += 60
+        tracker.snapshot()
+    eq_(tracker.growing(), ['leaky'])
+
+    report = tracker.report()
+    eq_(report['growing'], ['leaky'])
+    eq_(report['snapshots'], 3)
+    leaky = report['endpoints']['leaky']
+    eq_((leaky['requests'], leaky['net_bytes'], leaky['mean_bytes'], leaky['max_bytes']), (6, 480, 80, 80))
+    eq_(report['endpoints']['stable']['growth_streak'], 0)
+
+    # a snapshot without growth resets the streak
+    tracker.record('leaky', 10)
+    eq_(tracker.snapshot(), [])
+    tracker.reset()
+    eq_(tracker.report()['endpoints'], {})
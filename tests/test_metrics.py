@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+    test_metrics
+    ~~~~~~~~~~~~~~~
+
+    Tests for the request metrics
+
+"""
+import threading
+from nose.tools import *
+
+from tests.base import AppBase
+from webapp import AppFactory
+from webapp.lib.metrics import Metrics
+
+
+class Settings(object):
+    METRICS_ENABLED = True
+    METRICS_ROUTE = '/_metrics'
+    BLUEPRINTS = (
+        ('tests.fixtures.app.views.test', ''),
+    )
+
+app = AppFactory(Settings).get_app(__name__)
+
+
+class TestMetrics(AppBase):
+
+    selected_app = app
+
+    def test_metrics_endpoint(self):
+        self.get('/json_response')
+        self.get('/json_response')
+        self.get('/app_error', expect_error='invalid_something')
+        self.client.get('/does_not_exist')
+
+        r = self.client.get('/_metrics')
+        eq_(r.status_code, 200)
+        eq_(r.mimetype, 'text/plain')
+        text = r.data
+        assert_in('http_requests_total{endpoint="test.json_response",method="GET",status="200"} 2', text)
+        assert_in('http_requests_total{endpoint="test.app_error",method="GET",status="400"} 1', text)
+        assert_in('http_requests_total{endpoint="unmatched",method="GET",status="404"} 1', text)
+        assert_in('http_request_duration_seconds_bucket{endpoint="test.json_response",le="+Inf"} 2', text)
+        assert_in('http_request_duration_seconds_count{endpoint="test.json_response"} 2', text)
+        assert_in('api_errors_total{error="invalid_something"} 1', text)
+        assert_in('api_errors_total{error="not_found"} 1', text)
+
+
+def test_histogram_buckets():
+    metrics = Metrics(buckets=(0.1, 1))
+    metrics.observe('view', 'GET', 200, 0.05)
+    metrics.observe('view', 'GET', 200, 0.1)
+    metrics.observe('view', 'GET', 200, 0.5)
+    metrics.observe('view', 'GET', 500, 3)
+    text = metrics.render()
+    assert_in('http_request_duration_seconds_bucket{endpoint="view",le="0.1"} 2', text)
+    assert_in('http_request_duration_seconds_bucket{endpoint="view",le="1"} 3', text)
+    assert_in('http_request_duration_seconds_bucket{endpoint="view",le="+Inf"} 4', text)
+    assert_in('http_request_duration_seconds_sum{endpoint="view"} 3.65', text)
+    assert_in('http_requests_total{endpoint="view",method="GET",status="500"} 1', text)
+
+
+def test_threads_are_merged():
+    metrics = Metrics()
+
+    def observe():
+        for _ in range(100):
+            metrics.observe('view', 'GET', 200, 0.01)
+            metrics.count_error('boom')
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    requests, latency, errors = metrics.collect()
+    eq_(requests[('view', 'GET', 200)], 400)
+    eq_(sum(latency['view'][:-1]), 400)
+    eq_(errors['boom'], 400)
+
+
+def test_finished_threads_are_folded():
+    metrics = Metrics()
+
+    def observe():
+        metrics.observe('view', 'GET', 200, 0.01)
+        metrics.count_error('boom')
+
+    for _ in range(50):  # a thread per request
+        thread = threading.Thread(target=observe)
+        thread.start()
+        thread.join()
+    ok_(len(metrics._shards) < 16)
+    requests, latency, errors = metrics.collect()
+    eq_(metrics._shards, [])
+    eq_(requests[('view', 'GET', 200)], 50)
+    eq_(sum(latency['view'][:-1]), 50)
+    eq_(errors['boom'], 50)
+    eq_(metrics.collect()[0][('view', 'GET', 200)], 50)
+
+
+def test_metrics_token():
+    class TokenSettings(Settings):
+        METRICS_TOKEN = 'secret'
+    client = AppFactory(TokenSettings).get_app(__name__).test_client()
+    eq_(client.get('/_metrics').status_code, 403)
+    eq_(client.get('/_metrics', headers={'X-Debug-Token': 'wrong'}).status_code, 403)
+    eq_(client.get('/_metrics', headers={'X-Debug-Token': 'secret'}).status_code, 200)
+    eq_(client.get('/_metrics', headers={'Authorization': 'Bearer secret'}).status_code, 200)
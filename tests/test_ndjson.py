@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+    test_ndjson
+    ~~~~~~~~~~~~~~~
+
+    Tests for the ndjson_required decorator
+
+"""
+from StringIO import StringIO
+from nose.tools import *
+
+from flask import json
+from tests.base import AppBase
+from webapp import Flask
+from webapp.lib import api
+from webapp.lib.body import check_request_body
+from webapp.lib.ndjson import ndjson_required, SKIP
+
+app = Flask(__name__)
+app.config['MAX_BODY_SIZE'] = 100
+app.config['NDJSON_MAX_LINE_SIZE'] = 50
+app.before_request(check_request_body)
+app.errorhandler(Exception)(api.error_handler)
+
+SPEC = ({'type': str}, {'count': int})
+
+
+@app.route('/fail', methods=['POST'])
+@ndjson_required(*SPEC)
+def fail(records):
+    return {'records': list(records)}
+
+
+@app.route('/skip', methods=['POST'])
+@ndjson_required(*SPEC, on_error=SKIP, max_size=1000)
+def skip(records):
+    return {'records': list(records), 'invalid': records.invalid, 'errors': records.errors}
+
+
+def ndjson(*records):
+    return '\n'.join(json.dumps(record) if isinstance(record, dict) else record for record in records) + '\n'
+
+
+class TestNDJSON(AppBase):
+
+    selected_app = app
+
+    def post_ndjson(self, path, data, content_type='application/x-ndjson', chunked=False):
+        kwargs = {'data': data}
+        if chunked:
+            kwargs = {'input_stream': StringIO(data), 'headers': {'Transfer-Encoding': 'chunked'},
+                      'environ_overrides': {'wsgi.input_terminated': True}}
+        r = self.client.post(path, content_type=content_type, **kwargs)
+        return r.status_code, json.loads(r.data)
+
+    def test_valid(self):
+        status, r = self.post_ndjson('/fail', ndjson({'type': 'a'}, '', {'type': 'b', 'count': 2}))
+        eq_(status, 200)
+        eq_(r['records'], [{'type': 'a'}, {'type': 'b', 'count': 2}])
+
+    def test_fail_fast(self):
+        status, r = self.post_ndjson('/fail', ndjson({'type': 'a'}, {'type': 1}, 'not json'))
+        eq_(status, 400)
+        eq_(r['error'], 'invalid_parameters')
+        ok_(r['description'].startswith('line 2:'), r['description'])
+
+    def test_skip(self):
+        body = ndjson({'type': 'a'}, {'type': 1}, 'not json', '[1]', {'type': 'b'})
+        status, r = self.post_ndjson('/skip', body)
+        eq_(status, 200)
+        eq_(r['records'], [{'type': 'a'}, {'type': 'b'}])
+        eq_(r['invalid'], 3)
+        eq_([error['line'] for error in r['errors']], [2, 3, 4])
+        eq_(r['errors'][2]['description'], 'a JSON object is required')
+
+    def test_limits(self):
+        status, r = self.post_ndjson('/skip', ndjson(*[{'type': 'a'}] * 100))
+        eq_((status, r['error']), (413, 'payload_too_large'))
+        status, r = self.post_ndjson('/skip', ndjson(*[{'type': 'a'}] * 100), chunked=True)
+        eq_((status, r['error']), (413, 'payload_too_large'))
+        status, r = self.post_ndjson('/skip', ndjson({'type': 'a' * 50}))
+        eq_((status, r['error']), (413, 'payload_too_large'))
+        status, r = self.post_ndjson('/skip', ndjson({'type': 'a'}), content_type='application/json')
+        eq_((status, r['error']), (415, 'unsupported_media_type'))
+
+    def test_chunked(self):
+        status, r = self.post_ndjson('/skip', ndjson({'type': 'a'}, {'type': 'b'}), chunked=True)
+        eq_(len(r['records']), 2)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+    test_pagination
+    ~~~~~~~~~~~~~~~
+
+    Tests for the cursor pagination
+
+"""
+from bisect import bisect_left, bisect_right
+from nose.tools import *
+
+from tests.base import AppBase
+from webapp import Flask
+from webapp.lib import api
+from webapp.lib.pagination import paginate, NEXT
+
+app = Flask(__name__)
+app.config['SECRET_KEY'] = 'test'
+app.config['PAGINATION_DEFAULT_LIMIT'] = 10
+app.config['PAGINATION_MAX_LIMIT'] = 50
+app.errorhandler(Exception)(api.error_handler)
+
+IDS = range(0, 190, 2)  # 95 items
+
+
+def fetch(position, direction, limit):
+    """ keyset access to a sorted list, like an indexed query """
+    if direction == NEXT:
+        start = 0 if position is None else bisect_right(IDS, position)
+        return ({'id': i} for i in IDS[start:start + limit])
+    end = bisect_left(IDS, position)
+    return ({'id': i} for i in reversed(IDS[max(0, end - limit):end]))
+
+
+@app.route('/items')
+def items():
+    return paginate(fetch, key='id')
+
+
+def ids(page):
+    return [item['id'] for item in page['items']]
+
+
+class TestPagination(AppBase):
+
+    selected_app = app
+
+    def test_walk_forward_and_back(self):
+        page = self.get('/items')
+        eq_(ids(page), IDS[:10])
+        eq_(page['prev_cursor'], None)
+
+        pages = [page]
+        while page['next_cursor']:
+            page = self.get('/items', cursor=page['next_cursor'])
+            pages.append(page)
+        eq_(len(pages), 10)
+        eq_(sum((ids(p) for p in pages), []), IDS)
+        eq_(ids(pages[-1]), IDS[90:])
+
+        page = self.get('/items', cursor=pages[-1]['prev_cursor'])
+        eq_(ids(page), IDS[80:90])
+        ok_(page['next_cursor'])
+
+        page = self.get('/items', cursor=pages[1]['prev_cursor'])
+        eq_(ids(page), IDS[:10])
+        eq_(page['prev_cursor'], None)
+
+    def test_limit(self):
+        eq_(len(self.get('/items', limit=25)['items']), 25)
+        self.get('/items', limit=51, expect_error='invalid_parameters')
+        self.get('/items', limit=0, expect_error='invalid_parameters')
+        self.get('/items', limit='many', expect_error='invalid_parameters')
+
+    def test_tampered_cursor(self):
+        cursor = self.get('/items')['next_cursor']
+        self.get('/items', cursor=cursor[:-2] + 'xx', expect_error='invalid_parameters')
+        self.get('/items', cursor='garbage', expect_error='invalid_parameters')
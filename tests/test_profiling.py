@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+    test_profiling
+    ~~~~~~~~~~~~~~~
+
+    Tests for the sampled request profiles
+
+"""
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+from nose.tools import *
+
+from tests.base import AppBase
+from webapp import AppFactory
+from webapp import request_profiles
+
+PROFILES_DIR = tempfile.mkdtemp()
+
+
+class Settings(object):
+    PROFILING_ENABLED = True
+    PROFILING_DIR = PROFILES_DIR
+    PROFILING_TOKEN = 'secret'
+    PROFILING_MAX_FILES = 3
+    BLUEPRINTS = (
+        ('tests.fixtures.app.views.test', ''),
+    )
+
+
+class TestProfiling(AppBase):
+
+    selected_app = AppFactory(Settings).get_app(__name__)
+
+    def setup(self):
+        self.app.request_profiler.rate = 0.0
+        shutil.rmtree(PROFILES_DIR, ignore_errors=True)
+
+    @classmethod
+    def teardown_class(cls):
+        shutil.rmtree(PROFILES_DIR, ignore_errors=True)
+
+    def get_profiled(self, path, token='secret'):
+        return self.client.get(path, headers={'X-Profile': token})
+
+    def test_not_sampled(self):
+        self.get('/json_response')
+        self.get_profiled('/json_response', token='wrong')
+        eq_(request_profiles.list_profiles(PROFILES_DIR), {})
+
+    def test_header(self):
+        eq_(self.get_profiled('/json_response').status_code, 200)
+        self.get_profiled('/does_not_exist')
+        profiles = request_profiles.list_profiles(PROFILES_DIR)
+        eq_(sorted(profiles), ['test.json_response', 'unmatched'])
+        stats = request_profiles.merge(profiles['test.json_response'], StringIO())
+        ok_(any(name == 'json_response' for _, _, name in stats.stats))
+
+    def test_rate_and_max_files(self):
+        self.app.request_profiler.rate = 1.0
+        for _ in range(5):
+            self.get('/json_response')
+        eq_(len(request_profiles.list_profiles(PROFILES_DIR)['test.json_response']), 3)
+
+    def test_cli(self):
+        for _ in range(2):
+            self.get_profiled('/json_response')
+        merged = os.path.join(tempfile.mkdtemp(), 'merged.pstats')
+        eq_(request_profiles.main(['--dir', PROFILES_DIR, '--endpoint', 'test.json_response', '--merge', merged]), 0)
+        ok_(os.path.exists(merged))
+        shutil.rmtree(os.path.dirname(merged))
+        eq_(request_profiles.main(['--dir', PROFILES_DIR, '--endpoint', 'missing']), 1)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+    test_ratelimit
+    ~~~~~~~~~~~~~~~
+
+    Tests for the token bucket rate limiter
+
+"""
+from nose.tools import *
+
+from flask import json
+from tests.base import AppBase
+from webapp import AppFactory
+from webapp.lib.ratelimit import Limit, MemoryStore
+
+
+class Settings(object):
+    EXTENSIONS = (
+        'tests.fixtures.app.extensions.limiter',
+    )
+    BLUEPRINTS = (
+        ('tests.fixtures.app.views.test', ''),
+    )
+    RATELIMIT_DEFAULT = '3/minute'
+    RATELIMIT_KEY = 'api_key'
+
+
+class TestRateLimit(AppBase):
+
+    selected_app = AppFactory(Settings).get_app(__name__)
+
+    def setup(self):
+        self.app.extensions['rate_limiter'].store.clear()
+
+    def get_status(self, path, api_key='a'):
+        r = self.client.get(path, headers={'X-Api-Key': api_key})
+        return r.status_code, r
+
+    def test_route_limit(self):
+        eq_(self.get_status('/limited')[0], 200)
+        status, r = self.get_status('/limited')
+        eq_(status, 200)
+        eq_(r.headers['X-RateLimit-Remaining'], '0')
+        status, r = self.get_status('/limited')
+        eq_(status, 429)
+        eq_(json.loads(r.data)['error'], 'too_many_requests')
+        eq_(r.headers['Retry-After'], '30')
+        # other clients and routes have their own buckets
+        eq_(self.get_status('/limited', api_key='b')[0], 200)
+        eq_(self.get_status('/json_response')[0], 200)
+
+    def test_default_limit(self):
+        statuses = [self.get_status('/json_response')[0] for _ in range(4)]
+        eq_(statuses, [200, 200, 200, 429])
+        eq_(self.get_status('/date')[0], 429)  # the default limit is shared by the routes
+
+    def test_exempt(self):
+        statuses = [self.get_status('/unlimited')[0] for _ in range(5)]
+        eq_(statuses, [200] * 5)
+        ok_('X-RateLimit-Limit' not in self.get_status('/unlimited')[1].headers)
+
+    def test_apps_keep_their_settings(self):
+        class OtherSettings(Settings):
+            RATELIMIT_DEFAULT = None
+            RATELIMIT_KEY = 'ip'
+        other = AppFactory(OtherSettings).get_app(__name__)
+        ok_(other.extensions['rate_limiter'].store is not self.app.extensions['rate_limiter'].store)
+        eq_([self.get_status('/json_response')[0] for _ in range(4)], [200, 200, 200, 429])
+        client = other.test_client()
+        eq_([client.get('/json_response').status_code for _ in range(4)], [200] * 4)
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_store_refill():
+    clock = Clock()
+    store = MemoryStore(clock=clock)
+    limit = Limit.parse('2/second', burst=4)
+    eq_([store.consume('k', limit)[0] for _ in range(5)], [True] * 4 + [False])
+    eq_(store.consume('k', limit)[2], 0.5)
+    clock.now += 0.5
+    eq_(store.consume('k', limit)[:2], (True, 0))
+
+
+def test_memory_store_eviction():
+    clock = Clock()
+    store = MemoryStore(max_keys=3, clock=clock)
+    limit = Limit.parse('1/second')
+    for key in 'abcd':
+        store.consume(key, limit)
+    eq_(len(store), 3)
+    eq_(store.evictions, 1)
+    clock.now += 1
+    store.consume('e', limit)  # full buckets are dropped
+    ok_(len(store) < 3)
+
+
+def test_parse():
+    limit = Limit.parse('100/minutes')
+    eq_((limit.count, limit.period, limit.burst, str(limit)), (100, 60, 100, '100/minute'))
+    assert_raises(ValueError, Limit.parse, '100/fortnight')
+    assert_raises(ValueError, Limit.parse, 'many')
@@ -29,6 +29,12 @@ def fn1():
 def fn2():
     return api.api_success()
 
+
+@app.route('/test3', methods=['POST'])
+@api.json_required({'address': {'zip': str, 'number': int}}, {'tags': [str], 'items': [{'id': int}]})
+def fn3():
+    return api.api_success()
+
 app.errorhandler(Exception)(api.error_handler)
 
 
@@ -67,3 +73,26 @@ class TestRequireJson(AppBase):
 
         # invalid optional field
         self.post('/test0', data_json={'weight': 1.2, 'number': 123, 'string': 444}, expect_error='invalid_parameters')
+
+    def test_nested_decorator(self):
+        # valid requests
+        self.post('/test3', data_json={'address': {'zip': '12345', 'number': 1}})
+        self.post('/test3', data_json={'address': {'zip': '12345', 'number': 1},
+                                       'tags': ['a', 'b'], 'items': [{'id': 1}, {'id': 2}]})
+        self.post('/test3', data_json={'address': {'zip': '12345', 'number': 1}, 'tags': []})
+
+        # invalid nested object
+        self.post('/test3', data_json={'address': '12345'}, expect_error='invalid_parameters')
+        self.post('/test3', data_json={'address': {'zip': 12345, 'number': 1}}, expect_error='invalid_parameters')
+        self.post('/test3', data_json={'address': {'number': 1}}, expect_error='invalid_parameters')
+
+        # invalid lists
+        self.post('/test3', data_json={'address': {'zip': '1', 'number': 1}, 'tags': 'a'},
+                  expect_error='invalid_parameters')
+        self.post('/test3', data_json={'address': {'zip': '1', 'number': 1}, 'tags': ['a', 1]},
+                  expect_error='invalid_parameters')
+        self.post('/test3', data_json={'address': {'zip': '1', 'number': 1}, 'items': [{'id': 1}, {}]},
+                  expect_error='invalid_parameters')
+
+    def test_body_not_an_object(self):
+        self.post('/test1', data_json=[1, 2, 3], expect_error='invalid_body')
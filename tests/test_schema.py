@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+    test_schema
+    ~~~~~~~~~~~~~~~
+
+    Tests for the compiled field validators
+
+"""
+from nose.tools import *
+
+from webapp.lib.schema import compile_schema
+
+
+def test_flat_fields():
+    validate = compile_schema({'number': int, 'string': str}, {'weight': float})
+    eq_(validate({'number': 1, 'string': u'yay'}), [])
+    eq_(validate({'number': 1, 'string': 'yay', 'weight': 2}), [])
+    eq_(validate({'number': 1, 'string': 'yay', 'weight': 2.5}), [])
+    eq_(validate({'string': 'yay'}), ["'number' field is missing"])
+    eq_(validate({'number': 1, 'string': 'yay', 'weight': 'heavy'}), ['weight field must be type float'])
+
+
+def test_no_fields():
+    validate = compile_schema()
+    eq_(validate({'anything': 1}), [])
+
+
+def test_nested_object():
+    validate = compile_schema({'address': {'zip': str}})
+    eq_(validate({'address': {'zip': '12345'}}), [])
+    eq_(validate({'address': 'nope'}), ['address field must be type object'])
+    eq_(validate({'address': {}}), ["'address.zip' field is missing"])
+    eq_(validate({'address': {'zip': 1}}), ['address.zip field must be type str'])
+
+
+def test_typed_list():
+    validate = compile_schema({'ids': [int]})
+    eq_(validate({'ids': []}), [])
+    eq_(validate({'ids': [1, 2, 3]}), [])
+    eq_(validate({'ids': 1}), ['ids field must be type list of int'])
+    eq_(validate({'ids': [1, 'two', 3]}), ['ids[1] field must be type int'])
+
+
+def test_list_of_objects():
+    validate = compile_schema(optional_fields={'items': [{'id': int, 'tags': [str]}]})
+    eq_(validate({}), [])
+    eq_(validate({'items': [{'id': 1, 'tags': ['a']}]}), [])
+    eq_(sorted(validate({'items': [{'id': 1, 'tags': ['a']}, {'tags': [1]}]})),
+        ["'items[1].id' field is missing", 'items[1].tags[0] field must be type str'])
+
+
+def test_invalid_list_spec():
+    with assert_raises(ValueError):
+        compile_schema({'ids': [int, str]})
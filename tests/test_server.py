@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+    test_server
+    ~~~~~~~~~~~~~~~
+
+    Tests for the pre-fork server, it is run in a subprocess
+
+"""
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import types
+import urllib2
+from nose.tools import *
+
+from webapp.server import PreforkServer, project_packages, unload_modules
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestServer(object):
+
+    def setup(self):
+        self.port = free_port()
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'webapp.server', '--env', 'testing', '--bind', '127.0.0.1:%d' % self.port,
+             '--workers', '2', '--max-requests', '3', '--connection-timeout', '1'], cwd=ROOT, env=env, stderr=subprocess.PIPE)
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            try:
+                self.get()
+                return
+            except (urllib2.URLError, socket.error):
+                time.sleep(0.1)
+        raise AssertionError('the server did not start')
+
+    def teardown(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+    def get(self):
+        response = urllib2.urlopen('http://127.0.0.1:%d/' % self.port, timeout=5)
+        return json.loads(response.read())
+
+    def test_serve_and_recycle(self):
+        # more requests than two workers serve before they are replaced
+        for _ in range(10):
+            eq_(self.get()['msg'], 'hello world')
+
+    def test_reload_and_stop(self):
+        self.process.send_signal(signal.SIGHUP)
+        for _ in range(10):
+            eq_(self.get()['msg'], 'hello world')
+            time.sleep(0.05)
+        self.process.send_signal(signal.SIGTERM)
+        eq_(self.process.wait(), 0)
+        assert_raises(urllib2.URLError, self.get)
+        ok_('reloaded, generation 1' in self.process.stderr.read())
+
+    def test_slow_clients_time_out(self):
+        # idle connections hold both workers until the connection timeout
+        idle = [socket.create_connection(('127.0.0.1', self.port)) for _ in range(2)]
+        time.sleep(0.2)
+        try:
+            eq_(self.get()['msg'], 'hello world')
+        finally:
+            for sock in idle:
+                sock.close()
+
+
+def test_unload_project_modules():
+    packages = project_packages({'BLUEPRINTS': (('tests.fixtures.app.views.test', ''),),
+                                 'EXTENSIONS': ('myext.limiter',)})
+    eq_(packages, set(['webapp', 'settings', 'tests', 'myext']))
+    sys.modules['myext'] = types.ModuleType('myext')
+    sys.modules['myext.limiter'] = types.ModuleType('myext.limiter')
+    sys.modules['myextension'] = types.ModuleType('myextension')
+    unload_modules(set(['myext']))
+    ok_('myext' not in sys.modules)
+    ok_('myext.limiter' not in sys.modules)
+    ok_('werkzeug.serving' in sys.modules)
+    ok_(sys.modules.pop('myextension'))
+
+
+def test_default_workers():
+    import multiprocessing
+    eq_(PreforkServer('testing').num_workers, multiprocessing.cpu_count())
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+    test_startup
+    ~~~~~~~~~~~~~~~
+
+    Tests for the startup profiler
+
+"""
+from nose.tools import *
+
+from webapp import AppFactory
+from webapp.lib.startup import StartupProfiler, format_bytes
+
+
+class Settings(object):
+    STARTUP_PROFILING = True
+    BLUEPRINTS = (
+        ('tests.fixtures.app.views.test', ''),
+    )
+    EXTENSIONS = (
+        'tests.fixtures.app.extensions.counting',
+    )
+    AFTER_REQUEST_HOOKS = (
+        'tests.fixtures.app.hooks.identity',
+    )
+
+
+def test_factory_steps():
+    app = AppFactory(Settings).get_app(__name__)
+    report = app.startup_profiler.report()
+    steps = set((step['kind'], step['name']) for step in report['steps'])
+    eq_(steps, set([('import', 'tests.fixtures.app.views.test'),
+                    ('blueprint', 'tests.fixtures.app.views.test'),
+                    ('import', 'tests.fixtures.app.extensions.counting'),
+                    ('extension', 'tests.fixtures.app.extensions.counting'),
+                    ('import', 'tests.fixtures.app.hooks.identity'),
+                    ('hook', 'tests.fixtures.app.hooks.identity')]))
+    seconds = [step['seconds'] for step in report['steps']]
+    eq_(seconds, sorted(seconds, reverse=True))
+    ok_(app.startup_profiler.log_line().startswith('startup took'))
+
+
+def test_disabled():
+    profiler = StartupProfiler(enabled=False)
+    with profiler.step('import', 'os'):
+        pass
+    eq_(profiler.steps, [])
+    eq_(profiler.report()['seconds'], 0)
+
+
+def test_format_bytes():
+    eq_(format_bytes(0), '+0.0B')
+    eq_(format_bytes(1536), '+1.5KB')
+    eq_(format_bytes(-3 * 1024 * 1024), '-3.0MB')
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+    test_timing
+    ~~~~~~~~~~~~~~~
+
+    Tests for the Server-Timing header
+
+"""
+from nose.tools import *
+
+from tests.base import AppBase
+from webapp import AppFactory
+from webapp.lib.timing import ServerTiming
+
+
+class Settings(object):
+    SERVER_TIMING = True
+    BLUEPRINTS = (
+        ('tests.fixtures.app.views.test', ''),
+    )
+
+
+class DisabledSettings(object):
+    BLUEPRINTS = Settings.BLUEPRINTS
+
+
+def metric_names(header):
+    return [metric.split(';')[0] for metric in header.split(', ')]
+
+
+class TestServerTiming(AppBase):
+
+    selected_app = AppFactory(Settings).get_app(__name__)
+    response_decode = False
+
+    def test_phases(self):
+        r = self.post('/validated', data_json={'name': 'timing'})
+        eq_(r.status_code, 200)
+        eq_(metric_names(r.headers['Server-Timing']),
+            ['before_hooks', 'validate', 'db', 'view', 'serialize', 'after_hooks'])
+        assert_in('db;dur=', r.headers['Server-Timing'])
+        assert_in('desc="fake query"', r.headers['Server-Timing'])
+
+    def test_errors(self):
+        r = self.get('/app_error')
+        eq_(r.status_code, 400)
+        eq_(metric_names(r.headers['Server-Timing']), ['before_hooks', 'view', 'serialize', 'after_hooks'])
+
+
+class TestServerTimingDisabled(AppBase):
+
+    selected_app = AppFactory(DisabledSettings).get_app(__name__)
+    response_decode = False
+
+    def test_no_header(self):
+        r = self.post('/validated', data_json={'name': 'timing'})
+        eq_(r.status_code, 200)
+        ok_('Server-Timing' not in r.headers)
+
+
+def test_header():
+    timing = ServerTiming()
+    timing.add('db', 0.0015, 'say "hi"')
+    timing.add('view', 0.01)
+    eq_(timing.header(), 'db;dur=1.500;desc="say \'hi\'", view;dur=10.000')
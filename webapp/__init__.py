@@ -6,9 +6,25 @@
     
 """
 
+import time
+from functools import partial
 from importlib import import_module
-from flask import Flask as _Flask
+from types import GeneratorType
+from flask import Flask as _Flask, g, request
+from webapp.lib.aio import is_coroutine, run_coroutine
 from webapp.lib.api import api_success, error_handler
+from webapp.lib.batch import BatchDispatcher
+from webapp.lib.body import body_limits, check_request_body
+from webapp.lib.errors import TracebackSampler
+from webapp.lib.compression import compress_response
+from webapp.lib.json_backend import backend_from_config, RawJSON
+from webapp.lib.loading import LazyLoader
+from webapp.lib import memoize
+from webapp.lib.memory import MemoryTracker, memory_view
+from webapp.lib import metrics
+from webapp.lib.profiling import RequestProfiler
+from webapp.lib.startup import StartupProfiler
+from webapp.lib.timing import ServerTiming, NESTED_PHASES
 from webapp.lib.utils import CustomJSONEncoder
 
 
@@ -17,11 +33,86 @@ class Flask(_Flask):
     Custom Flask class that accepts other types of views responses
     """
 
+    #: :class:`webapp.lib.json_backend.JSONBackend` used to encode responses and decode json bodies
+    json_backend = None
+
+    #: :class:`webapp.lib.loading.LazyLoader` with the blueprints and extensions that are not loaded yet
+    lazy_loader = None
+
+    #: :class:`webapp.lib.startup.StartupProfiler` with the steps that built the app
+    startup_profiler = None
+
+    #: :class:`webapp.lib.profiling.RequestProfiler` when `PROFILING_ENABLED`
+    request_profiler = None
+
+    #: :class:`webapp.lib.memory.MemoryTracker` when `MEMORY_TRACKING`
+    memory_tracker = None
+
+    #: :class:`webapp.lib.metrics.Metrics` of the requests when `METRICS_ENABLED`
+    metrics = None
+
+    #: :class:`webapp.lib.errors.TracebackSampler` used to log unexpected exceptions when `ERROR_LOG_SAMPLING`
+    error_sampler = None
+
+    #: adds a Server-Timing header with the time of hooks, validation, view and serialization
+    server_timing = False
+
+    def request_context(self, environ):
+        """
+        Loads the pending lazy blueprints and extensions that the request needs before it is routed
+        """
+        if self.lazy_loader is not None and self.lazy_loader.pending:
+            self.lazy_loader.load_for_path(environ.get('PATH_INFO', ''))
+        return super(Flask, self).request_context(environ)
+
+    def preprocess_request(self):
+        if not self.server_timing:
+            return super(Flask, self).preprocess_request()
+        timing = g._server_timing = ServerTiming()
+        start = time.time()
+        try:
+            return super(Flask, self).preprocess_request()
+        finally:
+            timing.add('before_hooks', time.time() - start)
+
+    def dispatch_request(self):
+        timing = g._server_timing if self.server_timing else None
+        if timing is None:
+            return self._dispatch_view()
+        mark = len(timing.spans)
+        start = time.time()
+        try:
+            return self._dispatch_view()
+        finally:
+            nested = sum(seconds for name, seconds, _ in timing.spans[mark:] if name in NESTED_PHASES)
+            timing.add('view', time.time() - start - nested)
+
+    def _dispatch_view(self):
+        """
+        Coroutine views are run on the event loop of the worker, exceptions raised inside them are handled
+        by the error handlers like the ones of any other view
+        """
+        rv = super(Flask, self).dispatch_request()
+        if is_coroutine(rv, self.view_functions.get(request.endpoint)):
+            rv = run_coroutine(rv)
+        return rv
+
+    def process_response(self, response):
+        timing = getattr(g, '_server_timing', None) if self.server_timing else None
+        if timing is None:
+            return super(Flask, self).process_response(response)
+        start = time.time()
+        response = super(Flask, self).process_response(response)
+        timing.add('after_hooks', time.time() - start)
+        response.headers['Server-Timing'] = timing.header()
+        return response
+
     def make_response(self, rv):
         """
         Extended version of make_response, in addition to accepting the normal make response
          types it also accepts None, which gets converted to api_success and a dict that
-         gets json encoded automatically
+         gets json encoded automatically, already encoded json objects can be returned as RawJSON and
+         generators are streamed as the body of the response
 
         :param rv: return value from the view function
         """
@@ -30,6 +121,10 @@ class Flask(_Flask):
         if isinstance(rv, dict):
             description = rv.pop('description', None)
             rv = api_success(rv, description)
+        elif isinstance(rv, RawJSON):
+            rv = api_success(rv)
+        elif isinstance(rv, GeneratorType):
+            rv = self.response_class(rv)
         return super(Flask, self).make_response(rv)
 
 
@@ -57,30 +152,69 @@ class AppFactory(object):
         """
         self._app = Flask(module_name, **kwargs)
         self._app.config.from_object(self.app_config)
+        self._app.startup_profiler = StartupProfiler(self._app.config.get('STARTUP_PROFILING', False))
+        if self._is_lazy():
+            self._app.lazy_loader = LazyLoader()
+            self._app.url_build_error_handlers.append(self._app.lazy_loader.handle_build_error)
 
+        # each one inserts its before request hook first, so they run as metrics, profiler, memory tracker
+        self._add_memory_tracking()
+        self._add_profiling()
+        self._add_metrics()
+        self._add_compression()
+        self._add_body_limits()
         self._bind_extensions()
         self._register_blueprints()
         self._customize_encoder()
+        self._app.server_timing = self._app.config.get('SERVER_TIMING', False)
         self._add_hooks()
+        self._add_memoize()
+        self._add_batch()
         self._register_error_handlers()
 
+        if self._app.startup_profiler.enabled:
+            self._app.logger.info(self._app.startup_profiler.log_line())
         return self._app
 
     def _get_imports_by_path(self, path):
         module_name , object_name = path.rsplit('.', 1)
-        module = import_module(module_name)
+        with self._app.startup_profiler.step('import', path):
+            module = import_module(module_name)
         if not hasattr(module, object_name):
             raise ImportError('Module %s does not have %s' % (module, object_name))
         return getattr(module, object_name)
 
+    def _is_lazy(self):
+        """
+        Lazy loading is skipped in debug mode, flask does not allow to register blueprints once it served
+        a request, and when `EAGER_LOADING` is set, e.g. to preload the app before forking workers
+        """
+        config = self._app.config
+        return config.get('LAZY_LOADING', False) and not config.get('EAGER_LOADING', False) and not self._app.debug
+
     def _register_blueprints(self):
         for blueprint_path, url_prefix in self._app.config.get('BLUEPRINTS', []):
-            blueprint = self._get_imports_by_path(blueprint_path)
+            if self._app.lazy_loader is not None:
+                self._app.lazy_loader.add_blueprint(url_prefix, partial(self._register_blueprint, blueprint_path,
+                                                                        url_prefix))
+            else:
+                self._register_blueprint(blueprint_path, url_prefix)
+
+    def _register_blueprint(self, blueprint_path, url_prefix):
+        blueprint = self._get_imports_by_path(blueprint_path)
+        with self._app.startup_profiler.step('blueprint', blueprint_path):
             self._app.register_blueprint(blueprint, url_prefix=url_prefix)
 
     def _bind_extensions(self):
         for ext_path in self._app.config.get('EXTENSIONS', []):
-            ext = self._get_imports_by_path(ext_path)
+            if self._app.lazy_loader is not None:
+                self._app.lazy_loader.add_extension(partial(self._bind_extension, ext_path))
+            else:
+                self._bind_extension(ext_path)
+
+    def _bind_extension(self, ext_path):
+        ext = self._get_imports_by_path(ext_path)
+        with self._app.startup_profiler.step('extension', ext_path):
             if getattr(ext, 'init_app', False):
                 ext.init_app(self._app)
             else:
@@ -88,18 +222,80 @@ class AppFactory(object):
 
     def _customize_encoder(self):
         self._app.json_encoder = CustomJSONEncoder
+        self._app.json_backend = backend_from_config(self._app.config)
 
     def _register_error_handlers(self):
+        config = self._app.config
+        if config.get('ERROR_LOG_SAMPLING', False):
+            self._app.error_sampler = TracebackSampler(config.get('ERROR_LOG_FIRST_N', 5),
+                                                       config.get('ERROR_LOG_WINDOW', 60))
         self._app.errorhandler(Exception)(error_handler)
 
         for error in range(400, 420) + range(500, 506):
             self._app.error_handler_spec[None][error] = error_handler
 
+    def _add_metrics(self):
+        # added last of the three, the timer runs before any other before request hook and the recording after
+        # every other after request hook
+        config = self._app.config
+        if not config.get('METRICS_ENABLED', False):
+            return
+        self._app.metrics = metrics.Metrics(config.get('METRICS_BUCKETS', metrics.DEFAULT_BUCKETS))
+        self._app.before_request_funcs.setdefault(None, []).insert(0, metrics.start_timer)
+        self._app.after_request(metrics.record_request)
+        self._app.add_url_rule(config.get('METRICS_ROUTE', '/metrics'), 'metrics', metrics.metrics_view)
+
+    def _add_profiling(self):
+        # the profile starts after the metrics timer, before the memory tracker and the other before request
+        # hooks, and is saved at teardown before the memory is measured
+        if not self._app.config.get('PROFILING_ENABLED', False):
+            return
+        self._app.request_profiler = RequestProfiler.from_config(self._app.config)
+        self._app.before_request_funcs.setdefault(None, []).insert(0, self._app.request_profiler.start)
+        self._app.teardown_request(self._app.request_profiler.finish)
+
+    def _add_memory_tracking(self):
+        # added first of the three, measured after the metrics timer and the profiler started and before the
+        # other before request hooks, the teardown is registered first so it runs after every other teardown
+        config = self._app.config
+        if not config.get('MEMORY_TRACKING', False):
+            return
+        tracker = self._app.memory_tracker = MemoryTracker.from_config(config)
+        tracker.start_tracing()
+        self._app.before_request_funcs.setdefault(None, []).insert(0, tracker.start)
+        self._app.teardown_request(tracker.finish)
+        if config.get('MEMORY_TOKEN') is not None:
+            self._app.add_url_rule(config.get('MEMORY_ROUTE', '/debug/memory'), 'memory', memory_view)
+
+    def _add_compression(self):
+        # registered before any other hook, after request hooks run in reverse order so it runs last
+        if self._app.config.get('COMPRESSION', False):
+            self._app.after_request(compress_response)
+
+    def _add_body_limits(self):
+        # registered before extensions and hooks so that rejected bodies don't reach them
+        config = self._app.config
+        if config.get('MAX_BODY_SIZE') is not None or config.get('BODY_CONTENT_TYPES') is not None:
+            self._app.before_request(check_request_body)
+
+    def _add_memoize(self):
+        memoize.default_store.max_entries = self._app.config.get('MEMOIZE_MAX_ENTRIES', 10000)
+        self._app.teardown_request(memoize.clear_request_memo)
+
+    def _add_batch(self):
+        config = self._app.config
+        if config.get('BATCH_ENABLED', False):
+            dispatcher = BatchDispatcher.from_config(config)
+            view = body_limits(dispatcher.max_body_size)(dispatcher.view)
+            self._app.add_url_rule(config.get('BATCH_ROUTE', '/batch'), 'batch', view, methods=['POST'])
+
     def _add_hooks(self):
         for path in self._app.config.get('BEFORE_REQUEST_HOOKS', []):
             hook = self._get_imports_by_path(path)
-            self._app.before_request(hook)
+            with self._app.startup_profiler.step('hook', path):
+                self._app.before_request(hook)
 
         for path in self._app.config.get('AFTER_REQUEST_HOOKS', []):
             hook = self._get_imports_by_path(path)
-            self._app.after_request(hook)
\ No newline at end of file
+            with self._app.startup_profiler.step('hook', path):
+                self._app.after_request(hook)
\ No newline at end of file
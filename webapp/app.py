@@ -3,7 +3,7 @@
     app
     ~~~~~~~~~~~~~~~
 
-    Main flask app
+    Main flask app, `python -m webapp.server` runs it with the pre-fork production server
 """
 import os
 from werkzeug.utils import import_string
@@ -9,9 +9,11 @@
 
 class AppBaseException(Exception):
     """
-    App Base Exception, all api exceptions should inherit from this exception
+    App Base Exception, all api exceptions should inherit from this exception, `code` is the HTTP status and
+    `headers` are added to the error response
     """
-    pass
+    code = 400
+    headers = None
 
 
 class InvalidParametersException(AppBaseException):
@@ -19,4 +21,25 @@ class InvalidParametersException(AppBaseException):
 
 
 class InvalidBodyException(AppBaseException):
-    pass
\ No newline at end of file
+    pass
+
+
+class ForbiddenException(AppBaseException):
+    code = 403
+
+
+class PayloadTooLargeException(AppBaseException):
+    code = 413
+
+
+class UnsupportedMediaTypeException(AppBaseException):
+    code = 415
+
+
+class TooManyRequestsException(AppBaseException):
+    code = 429
+
+    def __init__(self, message, retry_after=None):
+        super(TooManyRequestsException, self).__init__(message)
+        if retry_after is not None:
+            self.headers = {'Retry-After': str(retry_after)}
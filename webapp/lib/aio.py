@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+    aio
+    ~~~~~~~~~~~~~~~
+
+    Coroutine views and concurrent fan out of I/O bound calls
+
+    Uses asyncio, or its python 2 port trollius, when installed. Each worker thread runs its own
+    event loop, coroutine views are run to completion on it before the response is made.
+"""
+import inspect
+import threading
+
+try:
+    import asyncio
+except ImportError:  # python 2
+    try:
+        import trollius as asyncio
+    except ImportError:
+        asyncio = None
+
+_local = threading.local()
+
+
+def get_loop():
+    """
+    :return: event loop of the current thread, created on first use
+    :raise RuntimeError: if neither asyncio nor trollius are installed
+    """
+    if asyncio is None:
+        raise RuntimeError('coroutine views require asyncio or trollius')
+    loop = getattr(_local, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    return loop
+
+
+def is_coroutine(value, view=None):
+    """
+    Trollius takes any generator for a coroutine, a generator is only run on the loop when the view is a
+    coroutine function, otherwise it is e.g. the body of a streamed response
+
+    :param value: return value of a view
+    :param view: view function that returned the value
+    :rtype: bool
+    """
+    if asyncio is None or not asyncio.iscoroutine(value):
+        return False
+    if not inspect.isgenerator(value):  # native coroutine or the debug wrapper of a trollius one
+        return True
+    return view is not None and asyncio.iscoroutinefunction(view)
+
+
+def run_coroutine(coroutine):
+    """
+    Runs a coroutine to completion on the event loop of the current thread
+
+    :return: result of the coroutine, exceptions are raised as they are
+    """
+    return get_loop().run_until_complete(coroutine)
+
+
+def fan_out(*calls, **kwargs):
+    """
+    Usage (python 3):
+
+        @base.route('/dashboard')
+        async def dashboard():
+            user, orders = await fan_out(fetch_user(), (fetch_orders(), 0.5), timeout=2)
+            return {'user': user, 'orders': orders}
+
+    Usage (trollius):
+
+        @base.route('/dashboard')
+        @trollius.coroutine
+        def dashboard():
+            user, orders = yield From(fan_out(fetch_user(), (fetch_orders(), 0.5), timeout=2))
+            raise Return({'user': user, 'orders': orders})
+
+    Runs calls concurrently and returns a future with their results in order. A call is a coroutine, a
+    function without arguments that is run in the loop executor (for blocking clients) or a `(call, timeout)`
+    tuple that overrides the default timeout of that call.
+
+    :param float timeout: default timeout of each call in seconds, None waits forever
+    :param bool return_exceptions: return the exceptions (e.g. `asyncio.TimeoutError`) in the results instead
+        of raising the first one
+    :return: future with the list of results
+    """
+    timeout = kwargs.pop('timeout', None)
+    return_exceptions = kwargs.pop('return_exceptions', False)
+    if kwargs:
+        raise TypeError('unexpected arguments: %s' % ', '.join(kwargs))
+    loop = get_loop()
+    futures = []
+    for call in calls:
+        call_timeout = timeout
+        if isinstance(call, tuple):
+            call, call_timeout = call
+        if not asyncio.iscoroutine(call) and callable(call):
+            call = loop.run_in_executor(None, call)
+        futures.append(asyncio.wait_for(call, call_timeout))
+    return asyncio.gather(*futures, return_exceptions=return_exceptions)
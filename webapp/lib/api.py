@@ -9,30 +9,110 @@
 from functools import wraps
 
 import traceback
-from flask import jsonify, current_app, request
+from flask import current_app, g, request, stream_with_context
 from werkzeug.exceptions import HTTPException
 from webapp.exceptions import AppBaseException, InvalidBodyException, InvalidParametersException
+from webapp.lib.body import JSON_TYPES, limit_body, read_body
+from webapp.lib.conditional import get_version, is_not_modified, not_modified_response, set_validators, \
+    make_conditional
+from webapp.lib.fields import apply_fieldset
+from webapp.lib.json_backend import default_backend, RawJSON
+from webapp.lib.schema import compile_schema
+from webapp.lib.streaming import has_streams, iter_json, DEFAULT_CHUNK_SIZE
+from webapp.lib.timing import span
 from webapp.lib.utils import camel_case_to_underscore
 
 
 def api_success(response=None, description=None):
     """
     Response indicating that the action was successful. Returns a json object with success: true as well
-    as the response.
+    as the response. If any value of the response is a generator or iterator the response is streamed in
+    chunks of `JSON_STREAM_CHUNK_SIZE` bytes instead of being encoded in memory.
+
+    Conditional GETs are answered with an empty 304: if the view set a version with
+    :func:`webapp.lib.conditional.set_version` the check happens before encoding, otherwise when `AUTO_ETAG`
+    is enabled a strong ETag is computed from the encoded body.
+
+    Fields requested with `?fields=` in views decorated with :func:`webapp.lib.fields.selectable_fields` are
+    selected before encoding.
+
+    The response can be a :class:`webapp.lib.json_backend.RawJSON` object, e.g. from a cache, then the envelope
+    is concatenated to it without decoding it, fields can not be selected.
 
     :param response: api response to be converted to json
     :param description: description if any
     :return: a json response
     """
+    version = get_version()
+    if version is not None and is_not_modified(*version):
+        return not_modified_response(*version)
+
+    if isinstance(response, RawJSON):
+        with span('serialize'):
+            rv = _raw_response(response, description)
+        if version is not None:
+            set_validators(rv, *version)
+            return rv
+        return make_conditional(rv)
+
     if response is None:
         response = {}
+    else:
+        response = apply_fieldset(response)
     response['success'] = True
     if description is not None:
         response['description'] = description
-    return jsonify(response)
+    with span('serialize'):
+        if has_streams(response):
+            rv = _stream_response(response)
+        else:
+            rv = _json_response(response)
+
+    if version is not None:
+        set_validators(rv, *version)
+        return rv
+    return make_conditional(rv)
+
+
+def get_json_backend():
+    """ json backend of the current app, apps not built by the factory use the stdlib """
+    return getattr(current_app, 'json_backend', None) or default_backend
+
+
+def _json_response(response):
+    return current_app.response_class(get_json_backend().dumps(response), mimetype='application/json')
+
+
+def _raw_response(response, description):
+    """
+    Adds the envelope to an encoded json object by concatenation
+    """
+    backend = get_json_backend()
+    encoded = backend.check_raw(response).lstrip()
+    if not encoded.startswith('{'):
+        raise TypeError('a raw json response must be an object')
+    envelope = '{"success":true'
+    if description is not None:
+        envelope = '%s,"description":%s' % (envelope, backend.dumps(description))
+    body = encoded[1:].lstrip()
+    if body.startswith('}'):
+        encoded = envelope + body
+    else:
+        encoded = envelope + ',' + body
+    return current_app.response_class(encoded, mimetype='application/json')
 
 
-def api_error(error, description, extra_info=None, error_code=500):
+def _stream_response(response):
+    """
+    Builds a chunked json response, the generator keeps the request context so that items can still
+    be fetched lazily (e.g. from a db cursor) while the response is sent.
+    """
+    chunk_size = current_app.config.get('JSON_STREAM_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    chunks = iter_json(response, get_json_backend().dumps, chunk_size)
+    return current_app.response_class(stream_with_context(chunks), mimetype='application/json')
+
+
+def api_error(error, description, extra_info=None, error_code=500, headers=None):
     """
     Response indicating error and that the actions as not successful. Returns a json
      response.
@@ -41,20 +121,46 @@ def api_error(error, description, extra_info=None, error_code=500):
     :param str description: description of the error
     :param dict extra_info: any extra info that should be included in the response
     :param int error_code: HTTP error code
+    :param dict headers: headers of the response, e.g. `Retry-After`
     :return: a json response with success: False, error name and other info with the specified error code
     """
+    g.api_error = error  # picked up by the request metrics
     response = {'success': False,
                 'error': error,
                 'description': description}
     if extra_info and isinstance(extra_info, dict):
         response.update(extra_info)
-    return jsonify(response), error_code
+    with span('serialize'):
+        rv = _json_response(response)
+    if headers:
+        return rv, error_code, headers
+    return rv, error_code
+
+
+_error_names = {}
+
+
+def error_name_for(error_class):
+    """
+    Api error name of an exception class, e.g. InvalidParametersException -> invalid_parameters. Names are
+    cached per class.
+
+    :param error_class: subclass of :class:`HTTPException` or :class:`AppBaseException`
+    :rtype: str
+    """
+    name = _error_names.get(error_class)
+    if name is None:
+        name = camel_case_to_underscore(error_class.__name__)
+        if issubclass(error_class, AppBaseException):
+            name = name.replace('_exception', '')
+        _error_names[error_class] = name
+    return name
 
 
 def error_handler(error):
     """
     API error handler, if the exception inherits from AppBaseException the error name is extracted and converted
-    to an api error json response with code 400. If the error is an HTTPException, then the error code, message and name
+    to an api error json response with the code of the exception, 400 by default. If the error is an HTTPException, then the error code, message and name
     are taken from the error. Any other type of error is considered an unexpected exception it returns
     a json 500 error.
 
@@ -62,94 +168,99 @@ def error_handler(error):
     :return: :raise error: json response with error information if the app is in testing mode it re raise the exception.
     """
     extra_info = None
+    headers = None
     if isinstance(error, HTTPException):
-        error_name = camel_case_to_underscore(error.__class__.__name__)
+        error_name = error_name_for(error.__class__)
         error_code = error.code
         message = error.description
     elif isinstance(error, AppBaseException):
-        error_name = camel_case_to_underscore(error.__class__.__name__).replace('_exception', '')
-        error_code = 400  # Bad request
+        error_name = error_name_for(error.__class__)
+        error_code = error.code  # 400 Bad request unless the exception sets its own
         message = error.message
+        headers = error.headers
     else:
-        # log traceback
-        tb = traceback.format_exc()
-        current_app.logger.warning(tb)
+        # log traceback, sampled when the app has an error sampler
+        sampler = getattr(current_app, 'error_sampler', None)
+        if sampler is None:
+            tb = traceback.format_exc()
+            current_app.logger.warning(tb)
+        else:
+            tb = sampler.log(error, current_app.logger)
         # re raise generic error when testing to ease debug when testing
         if current_app.config.get('TESTING', False):
             raise error
         # when debugging add the tb
         if current_app.config.get('DEBUG', False):
-            extra_info = {'tb': tb}
+            extra_info = {'tb': tb or traceback.format_exc()}
         error_name = 'unexpected_exception'
         error_code = 500  # server error
         message = "something went bad, don't panic"
-    return api_error(error_name, message, error_code=error_code, extra_info=extra_info)
+    return api_error(error_name, message, error_code=error_code, extra_info=extra_info, headers=headers)
 
 
-def json_required(required_fields=None, optional_fields=None):
+def json_required(required_fields=None, optional_fields=None, max_size=None):
     """
     Usage:
 
-        @json_required({'name': str}, {'age': int})
+        @json_required({'name': str, 'address': {'zip': str}}, {'age': int, 'tags': [str]})
         def view_fn():
             # do something with json
 
     Decorator that checks if the request contains a valid json body, if required fields is
+    set the fields have to be present and of the given type. Field specs are compiled once, when
+    the view is decorated, see :mod:`webapp.lib.schema` for the supported specs.
+
+    Bodies bigger than `max_size` or that are not json are rejected with a 413 or 415 before they are read.
+
     :param dict required_fields: dictionary with required fields as keys and the type they should be as value
+    :param dict optional_fields: dictionary with optional fields as keys and the type they should be as value
+    :param int max_size: maximum body size in bytes, defaults to `MAX_BODY_SIZE`
     :return: :raise InvalidParametersException: decorated function
     """
-    if required_fields is None:
-        required_fields = {}
-    if optional_fields is None:
-        optional_fields = {}
+    validate = compile_schema(required_fields, optional_fields)
+    invalid_body_msg = 'a valid JSON body is required'
+    if required_fields:
+        invalid_body_msg = '%s, required fields: %s' % (invalid_body_msg, ', '.join(required_fields.iterkeys()))
 
     def wrapper(fn):
         @wraps(fn)
         def wrapped_view(*args, **kwargs):
-            json_body = request.get_json(silent=True, cache=True)
-            if not json_body:
-                error_msg = 'a valid JSON body is required'
-                if required_fields:
-                    error_msg = '%s, required fields: %s' % (error_msg, ', '.join(required_fields.iterkeys()))
-                raise InvalidBodyException(error_msg)
-            #checking required fields
-            errors = _check_fields(json_body, required_fields)
-
-            #checking optional fields
-            errors += _check_fields(json_body, optional_fields, False)
-
-            if errors:
-                raise InvalidParametersException('errors: %s' % ', '.join(errors))
+            with span('validate'):
+                limit_body(max_size, JSON_TYPES)
+                json_body = get_json_body()
+                if not json_body or not isinstance(json_body, dict):
+                    raise InvalidBodyException(invalid_body_msg)
+
+                errors = validate(json_body)
+                if errors:
+                    raise InvalidParametersException('errors: %s' % ', '.join(errors))
             return fn(*args, **kwargs)
 
+        wrapped_view.body_limits = (max_size, JSON_TYPES)
         return wrapped_view
     return wrapper
 
 
-def _check_fields(json_body, fields_dict, required=True):
-    """
-    Checks fields in the json body. It accumulates errors and returns them. If the required flag
-    is `True`, the field has to be present in the json_body
-    :param dict json_body: parsed json body
-    :param dict fields_dict: dict that maps fields to the type they should be
-    :param bool required: indicates if the fields in the dict are required
-    :return: list of all the errors found in the json_body
-    :rtype: list
-    """
-    errors = []
-    for key, type_field in fields_dict.iteritems():
-        type_name = type_field.__name__
-        if type_field is str: # str -> basestring so that unicode strings are ok
-            type_field = basestring
-        if type_field is float:
-            type_field = (float, int, long)  # float -> take all of the integer values too
-
-        field = json_body.get(key, None)
-        if field is None:
-            if required:
-                errors.append("'%s' field is missing" % key)
-            else:
-                continue
-        elif not isinstance(field, type_field):
-            errors.append('%s field must be type %s' % (key, type_name))
-    return errors
\ No newline at end of file
+def get_json_body():
+    """
+    Decodes the request body with the app json backend, like `request.get_json(silent=True, cache=True)`
+    the decoded body is cached in the request so views can still use `request.get_json()`. The body is read
+    with the `MAX_BODY_SIZE` limit unless the view already read it with its own.
+
+    :return: decoded json or None if the body is not json
+    """
+    json_body = getattr(request, '_cached_json', None)
+    if json_body is not None:
+        return json_body
+    if request.mimetype != 'application/json':
+        return None
+    data = read_body(current_app.config.get('MAX_BODY_SIZE'))
+    charset = request.mimetype_params.get('charset')
+    try:
+        if charset is not None:
+            data = data.decode(charset)
+        json_body = get_json_backend().loads(data)
+    except ValueError:  # UnicodeDecodeError is a ValueError too
+        json_body = None
+    request._cached_json = json_body
+    return json_body
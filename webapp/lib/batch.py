@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+    batch
+    ~~~~~~~~~~~~~~~
+
+    Batch endpoint that runs many api calls in one HTTP request
+
+"""
+import threading
+from multiprocessing.pool import ThreadPool
+
+from flask import current_app, request
+from werkzeug.test import EnvironBuilder
+
+from webapp.exceptions import InvalidBodyException, InvalidParametersException
+from webapp.lib.api import api_success, error_handler, get_json_body
+from webapp.lib.body import limit_body
+from webapp.lib.json_backend import default_backend, RawJSON
+
+METHODS = frozenset(['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS'])
+
+# headers of the batch request that are not passed to the sub requests
+_SKIPPED_HEADERS = frozenset(['content-length', 'content-type', 'content-encoding', 'transfer-encoding',
+                              'accept-encoding'])
+
+
+class BatchDispatcher(object):
+
+    def __init__(self, max_requests=20, max_body_size=1024 * 1024, parallel=False, max_workers=4):
+        """
+        Runs sub requests in process against the app url map, they go through the same hooks and error
+        handlers as normal requests.
+
+        :param int max_requests: maximum number of sub requests in a batch
+        :param int max_body_size: maximum size in bytes of the batch body
+        :param bool parallel: allow clients to run the sub requests in parallel with `?parallel=true`
+        :param int max_workers: size of the thread pool for parallel batches
+        """
+        self.max_requests = max_requests
+        self.max_body_size = max_body_size
+        self.parallel = parallel
+        self.max_workers = max_workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(max_requests=config.get('BATCH_MAX_REQUESTS', 20),
+                   max_body_size=config.get('BATCH_MAX_BODY_SIZE', 1024 * 1024),
+                   parallel=config.get('BATCH_PARALLEL', False),
+                   max_workers=config.get('BATCH_MAX_WORKERS', 4))
+
+    def view(self):
+        """
+        Usage:
+
+            POST /batch
+            [{"method": "GET", "path": "/users/1"}, {"method": "POST", "path": "/orders", "body": {"id": 2}}]
+
+        :return: api response with the status and body of every sub request, in order
+        """
+        limit_body(self.max_body_size)
+        sub_requests = get_json_body()
+        if not isinstance(sub_requests, list) or not sub_requests:
+            raise InvalidBodyException('a JSON array of requests is required')
+        if len(sub_requests) > self.max_requests:
+            raise InvalidParametersException('a batch can not have more than %d requests' % self.max_requests)
+        sub_requests = [self._validate(index, sub_request) for index, sub_request in enumerate(sub_requests)]
+
+        app = current_app._get_current_object()
+        headers = [(name, value) for name, value in request.headers.items() if name.lower() not in _SKIPPED_HEADERS]
+        calls = [(app, headers) + sub_request for sub_request in sub_requests]
+        if self.parallel and len(calls) > 1 and request.args.get('parallel') in ('1', 'true'):
+            responses = self._get_pool().map(_run, calls)
+        else:
+            responses = map(_run, calls)
+        return api_success({'responses': responses})
+
+    def _validate(self, index, sub_request):
+        if not isinstance(sub_request, dict):
+            raise InvalidParametersException('request %d must be an object' % index)
+        method = sub_request.get('method', 'GET')
+        path = sub_request.get('path')
+        if not isinstance(method, basestring) or method.upper() not in METHODS:
+            raise InvalidParametersException('request %d has an invalid method' % index)
+        if not isinstance(path, basestring) or not path.startswith('/'):
+            raise InvalidParametersException('request %d must have an absolute path' % index)
+        if path.split('?', 1)[0] == request.path:
+            raise InvalidParametersException('request %d can not be a batch' % index)
+        return method.upper(), path, sub_request.get('body')
+
+    def _get_pool(self):
+        # created on first use so that each forked worker gets its own threads
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPool(self.max_workers)
+        return self._pool
+
+
+def _run(args):
+    """
+    Dispatches a sub request and returns its status and encoded body
+    """
+    app, headers, method, path, body = args
+    backend = getattr(app, 'json_backend', None) or default_backend
+    path, _, query_string = path.partition('?')
+    data = None
+    if body is not None:
+        data = backend.dumps(body)
+    builder = EnvironBuilder(path=path, method=method, query_string=query_string, headers=headers, data=data,
+                             content_type='application/json' if data is not None else None)
+    # a sub request gets its own app context, otherwise it would share `g` with the batch and the others
+    with app.app_context(), app.request_context(builder.get_environ()):
+        if body is not None:
+            request._cached_json = body  # already decoded, views don't need to decode it again
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            response = app.make_response(error_handler(e))
+        data = response.get_data()
+        if not data:
+            body = None
+        elif response.mimetype == 'application/json':
+            body = RawJSON(data)  # already encoded, spliced as it is in the batch response
+        else:
+            body = response.get_data(as_text=True)
+        return {'status': response.status_code, 'body': body}
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+    body
+    ~~~~~~~~~~~~~~~
+
+    Request body limits, checked with the headers before the body is read
+
+"""
+from functools import wraps
+
+from flask import current_app, request
+
+from webapp.exceptions import PayloadTooLargeException, UnsupportedMediaTypeException
+
+JSON_TYPES = ('application/json',)
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def has_body():
+    """ True if the request has a body, either with a positive `Content-Length` or chunked """
+    if request.content_length is not None:
+        return request.content_length > 0
+    return request.headers.get('Transfer-Encoding', '').lower() == 'chunked'
+
+
+def check_body(max_size=None, content_types=None):
+    """
+    Checks the `Content-Length` and `Content-Type` of the request, nothing is read. Requests without a body
+    are accepted.
+
+    :param int max_size: maximum body size in bytes, None for no limit
+    :param content_types: accepted mimetypes, None for any
+    :raise PayloadTooLargeException: if the declared length is bigger than `max_size`
+    :raise UnsupportedMediaTypeException: if the mimetype is not accepted
+    """
+    if not has_body():
+        return
+    if content_types is not None and request.mimetype not in content_types:
+        raise UnsupportedMediaTypeException('the body must be %s' % ' or '.join(content_types))
+    if max_size is not None and (request.content_length or 0) > max_size:
+        raise _too_large(max_size)
+
+
+def read_body(max_size=None):
+    """
+    Reads the body up to `max_size` bytes and caches it in the request, so that `request.get_data()` and
+    `request.get_json()` do not read it again. Bodies without a `Content-Length` (chunked) are read in chunks
+    and the read is aborted as soon as the limit is passed.
+
+    :param int max_size: maximum body size in bytes, None for no limit
+    :return: the body
+    :raise PayloadTooLargeException: if the body is bigger than `max_size`
+    """
+    data = getattr(request, '_cached_data', None)
+    if data is not None:
+        return data
+    if max_size is None or request.content_length is not None:
+        check_body(max_size)  # the stream is limited to the content length
+        return request.get_data(cache=True)
+
+    chunks = []
+    size = 0
+    stream = request.stream
+    while True:
+        chunk = stream.read(min(READ_CHUNK_SIZE, max_size + 1 - size))
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise _too_large(max_size)
+        chunks.append(chunk)
+    request._cached_data = data = b''.join(chunks)
+    return data
+
+
+def limit_body(max_size=None, content_types=JSON_TYPES):
+    """
+    Checks the headers and then reads the body with the limit, see :func:`check_body` and :func:`read_body`
+
+    :param int max_size: maximum body size in bytes, defaults to `MAX_BODY_SIZE`
+    :param content_types: accepted mimetypes, None for any
+    """
+    if max_size is None:
+        max_size = current_app.config.get('MAX_BODY_SIZE')
+    check_body(max_size, content_types)
+    if has_body():
+        read_body(max_size)
+
+
+def body_limits(max_size=None, content_types=JSON_TYPES):
+    """
+    Usage:
+
+        @base.route('/uploads', methods=['POST'])
+        @body_limits(max_size=10 * 1024 * 1024)
+        def upload():
+            # do something with request.get_json()
+
+    Rejects requests with a body bigger than `max_size` or of another content type before the view runs.
+    Routes with their own limits are skipped by the global :func:`check_request_body` hook.
+
+    :param int max_size: maximum body size in bytes, defaults to `MAX_BODY_SIZE`
+    :param content_types: accepted mimetypes, None for any
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def wrapped_view(*args, **kwargs):
+            limit_body(max_size, content_types)
+            return fn(*args, **kwargs)
+
+        wrapped_view.body_limits = (max_size, content_types)
+        return wrapped_view
+    return wrapper
+
+
+def check_request_body():
+    """
+    Before request hook that applies `MAX_BODY_SIZE` and `BODY_CONTENT_TYPES` to every route without its own
+    limits. Only the headers are checked, chunked bodies are bounded when they are read with :func:`read_body`.
+    """
+    if not has_body():
+        return
+    view = current_app.view_functions.get(request.endpoint)
+    if view is None or hasattr(view, 'body_limits'):
+        return
+    config = current_app.config
+    check_body(config.get('MAX_BODY_SIZE'), config.get('BODY_CONTENT_TYPES'))
+
+
+def _too_large(max_size):
+    return PayloadTooLargeException('the body can not be bigger than %d bytes' % max_size)
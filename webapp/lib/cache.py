@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+    cache
+    ~~~~~~~~~~~~~~~
+
+    Response cache for idempotent views
+
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib import urlencode
+
+from flask import current_app, request
+
+# headers that should never be replayed from a cached response
+_SKIPPED_HEADERS = frozenset(['content-length', 'set-cookie', 'date'])
+
+
+class CacheBackend(object):
+    """
+    Interface for cache stores, values are returned as they were stored. A shared store (e.g. redis
+    or memcached) only needs to implement these methods and be able to pickle tuples of strings.
+    """
+
+    def get(self, key):
+        """
+        :param str key: cache key
+        :return: stored value or None if the key is missing or expired
+        """
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        """
+        :param str key: cache key
+        :param value: value to be stored
+        :param ttl: seconds until the value expires, None never expires
+        """
+        raise NotImplementedError
+
+    def delete(self, key):
+        """
+        :param str key: cache key
+        :return: True if the key was stored
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+
+    def __init__(self, max_entries=1024, clock=time.time):
+        """
+        In process LRU store with per entry TTL. When full, the least recently used entry is evicted.
+
+        :param int max_entries: maximum number of entries
+        :param clock: function that returns the current time in seconds
+        """
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (expires, value), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires <= self._clock():
+                return None
+            self._data[key] = entry
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = None if ttl is None else self._clock() + ttl
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (expires, value)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResponseCache(object):
+
+    def __init__(self, ttl=60, max_entries=1024, query_args=True, headers=(), key_fn=None, backend=None,
+                 namespace=''):
+        """
+        Caches the serialized responses of a view, see :func:`cached_response`
+
+        :param ttl: seconds a response is cached, None never expires
+        :param int max_entries: maximum number of cached responses for the default in process backend
+        :param query_args: True to key on every query argument, a list of argument names to key only on
+            those or False to ignore the query string
+        :param headers: request headers that are part of the key, e.g. ('Accept-Language',)
+        :param key_fn: function that returns the key for the current request, overrides the other key options
+        :param backend: a :class:`CacheBackend`, defaults to a :class:`MemoryBackend`
+        :param str namespace: prefix of the keys, useful when a backend is shared by many views
+        """
+        self.ttl = ttl
+        self.query_args = query_args
+        self.headers = tuple(headers)
+        self.key_fn = key_fn
+        self.backend = backend if backend is not None else MemoryBackend(max_entries)
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, path, args=None, headers=None):
+        """
+        Builds a cache key, it is used with the current request on every call of the view and can be used
+        with explicit values to invalidate a response
+
+        :param str path: request path
+        :param args: query arguments, dict or :class:`werkzeug.datastructures.MultiDict`
+        :param headers: request headers, dict-like
+        :rtype: str
+        """
+        parts = [self.namespace, path]
+        if self.query_args and args:
+            items = args.iteritems(multi=True) if hasattr(args, 'getlist') else args.iteritems()
+            if self.query_args is not True:
+                items = ((name, value) for name, value in items if name in self.query_args)
+            parts.append(urlencode(sorted((name, unicode(value).encode('utf-8')) for name, value in items)))
+        if self.headers:
+            headers = headers or {}
+            parts.extend('%s=%s' % (name, headers.get(name, '')) for name in self.headers)
+        return '|'.join(parts)
+
+    def invalidate(self, path, args=None, headers=None):
+        """
+        Removes a cached response
+
+        :return: True if the response was cached
+        """
+        return self.backend.delete(self.make_key(path, args, headers))
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        """
+        Counters are updated without locks, they can be slightly off under heavy concurrency
+
+        :return: dict with hits, misses and evictions (if the backend counts them)
+        """
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': getattr(self.backend, 'evictions', None)}
+
+    def __call__(self, fn):
+        @wraps(fn)
+        def cached_view(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return fn(*args, **kwargs)
+
+            if self.key_fn is not None:
+                key = self.key_fn()
+            else:
+                key = self.make_key(request.path, request.args, request.headers)
+            cached = self.backend.get(key)
+            if cached is not None:
+                self.hits += 1
+                body, status, headers = cached
+                response = current_app.response_class(body, status=status, headers=headers)
+                if 'ETag' in response.headers:
+                    response.make_conditional(request)
+                return response
+
+            self.misses += 1
+            response = current_app.make_response(fn(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                headers = [(name, value) for name, value in response.headers.to_list()
+                           if name.lower() not in _SKIPPED_HEADERS]
+                self.backend.set(key, (response.get_data(), response.status_code, headers), self.ttl)
+            return response
+
+        cached_view.cache = self
+        return cached_view
+
+
+def cached_response(ttl=60, max_entries=1024, query_args=True, headers=(), key_fn=None, backend=None,
+                    namespace=''):
+    """
+    Usage:
+
+        @base.route('/countries')
+        @cached_response(ttl=300, headers=('Accept-Language',))
+        def countries():
+            return {'countries': load_countries()}
+
+        countries.cache.invalidate('/countries')
+
+    Decorator that caches the serialized response of GET and HEAD requests. A hit returns the stored bytes
+    without calling the view or encoding json, only responses with status 200 that are not streamed are
+    cached. The :class:`ResponseCache` is available as the `cache` attribute of the view for invalidation
+    and stats.
+
+    :return: decorator, see :class:`ResponseCache` for the parameters
+    """
+    return ResponseCache(ttl, max_entries, query_args, headers, key_fn, backend, namespace)
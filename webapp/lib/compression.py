@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+    compression
+    ~~~~~~~~~~~~~~~
+
+    Negotiated gzip/deflate compression of responses
+
+"""
+import zlib
+
+from flask import current_app, request
+from werkzeug.http import quote_etag
+
+# encoding -> zlib window bits, gzip adds a gzip header and trailer, deflate is the zlib format
+ENCODINGS = (
+    ('gzip', 16 + zlib.MAX_WBITS),
+    ('deflate', zlib.MAX_WBITS),
+)
+
+DEFAULT_SKIP_MIMETYPES = ('image/', 'video/', 'audio/', 'application/zip', 'application/gzip',
+                          'application/x-gzip', 'application/octet-stream')
+
+
+def compress_response(response):
+    """
+    After request hook that compresses the response with the best encoding accepted by the client.
+    Responses smaller than `COMPRESSION_MIN_SIZE`, already encoded or with a mimetype starting with one
+    of `COMPRESSION_SKIP_MIMETYPES` are left alone, as well as partial content since its range is of the
+    uncompressed body. Streamed responses are compressed chunk by chunk.
+
+    :param response: response to be compressed
+    :return: the response
+    """
+    if response.status_code < 200 or response.status_code in (204, 206, 304) or \
+            'Content-Encoding' in response.headers or 'Content-Range' in response.headers:
+        return response
+    config = current_app.config
+    mimetype = response.mimetype or ''
+    if mimetype.startswith(tuple(config.get('COMPRESSION_SKIP_MIMETYPES', DEFAULT_SKIP_MIMETYPES))):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding, wbits = _negotiate()
+    if encoding is None:
+        return response
+
+    level = config.get('COMPRESSION_LEVEL', 6)
+    if response.is_streamed:
+        chunks = response.response
+        response.response = _compress_chunks(response.iter_encoded(), chunks,
+                                             zlib.compressobj(level, zlib.DEFLATED, wbits))
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config.get('COMPRESSION_MIN_SIZE', 500):
+            return response
+        compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+        response.set_data(compressor.compress(data) + compressor.flush())
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:  # the compressed body is not byte equal to the one the etag was made for
+        # built here, older werkzeug versions write a lowercase w/ that clients don't recognize
+        response.headers['ETag'] = 'W/' + quote_etag(etag)
+    return response
+
+
+def _negotiate():
+    """
+    Encodings with `q=0` are refused, `*` stands for the encodings that are not listed. The qualities are
+    read here instead of using `best_match`, older werkzeug versions match `q=0` entries too.
+
+    :return: `(encoding, window bits)` of the best encoding accepted by the request, `(None, None)` if none
+    """
+    qualities = {}
+    for value, quality in request.accept_encodings:
+        qualities.setdefault(value.lower(), quality)
+    best, best_quality = (None, None), 0
+    for encoding, wbits in ENCODINGS:
+        quality = qualities.get(encoding, qualities.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = (encoding, wbits), quality
+    return best
+
+
+def _compress_chunks(encoded, chunks, compressor):
+    """
+    Compresses a stream incrementally, every chunk is flushed so clients get data as soon as it is produced.
+    The original stream is closed at the end, it can hold resources like the request context.
+    """
+    try:
+        for chunk in encoded:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+    conditional
+    ~~~~~~~~~~~~~~~
+
+    ETags and conditional GET (304) support for api responses
+
+"""
+from flask import current_app, g, request
+from werkzeug.http import is_resource_modified, parse_etags, quote_etag
+
+
+def set_version(etag=None, last_modified=None):
+    """
+    Usage:
+
+        @base.route('/catalog')
+        def catalog():
+            set_version(etag=str(catalog_revision()))
+            return {'items': load_catalog()}
+
+    Sets a cheap version of the response of the current request. :func:`webapp.lib.api.api_success` checks
+    it against `If-None-Match` / `If-Modified-Since` before encoding the response, so a matching request
+    gets a 304 without paying the serialization.
+
+    :param str etag: version token, used as a strong ETag
+    :param datetime last_modified: last modification date of the resource
+    """
+    g._response_version = (etag, last_modified)
+
+
+def get_version():
+    """
+    :return: `(etag, last_modified)` set by :func:`set_version` or None
+    """
+    return getattr(g, '_response_version', None)
+
+
+def is_not_modified(etag=None, last_modified=None):
+    """
+    `If-None-Match` is compared weakly (RFC 7232 3.2), so the weak ETags of compressed responses match, and
+    it takes precedence over `If-Modified-Since`
+
+    :return: True if the request is a conditional GET or HEAD that matches the etag or last modified date
+    """
+    # werkzeug answers "not modified" for any other method, they always get the full response
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return etag is not None and parse_etags(if_none_match).contains_weak(etag)
+    return not is_resource_modified(request.environ, last_modified=last_modified)
+
+
+def not_modified_response(etag=None, last_modified=None):
+    """
+    :return: an empty 304 response with the validators
+    """
+    response = current_app.response_class(status=304)
+    set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag=None, last_modified=None):
+    if etag is not None:
+        response.headers['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+
+
+def make_conditional(response):
+    """
+    Adds a strong ETag computed from the body when `AUTO_ETAG` is enabled and turns the response into a
+    304 if the request matches it. Streamed responses are left alone, their body is not known yet.
+
+    :param response: a serialized response
+    :return: the response
+    """
+    if response.is_streamed or not current_app.config.get('AUTO_ETAG', False):
+        return response
+    response.add_etag()
+    if is_not_modified(response.get_etag()[0], response.last_modified):
+        response.status_code = 304  # the body is not sent with a 304
+    return response
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+    errors
+    ~~~~~~~~~~~~~~~
+
+    Sampled logging of unexpected exceptions, so that an error storm does not flood the logs
+
+"""
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+
+class TracebackSampler(object):
+
+    def __init__(self, first_n=5, window=60, max_signatures=1000, clock=time.time, flush_timer=True):
+        """
+        Deduplicates tracebacks by exception class and the code locations of the traceback. The first
+        `first_n` occurrences of a traceback are logged in full, after that only a count is logged once per
+        window. The traceback is only formatted when it is logged.
+
+        Counts are logged when their window is over, by the next error of any kind or by a timer, so the end
+        of a storm is logged too.
+
+        :param int first_n: occurrences of a traceback logged in full
+        :param int window: seconds between the counts of a repeated traceback
+        :param int max_signatures: tracebacks remembered, the least recently seen are forgotten
+        :param clock: function that returns the current time in seconds
+        :param bool flush_timer: start a timer thread that logs the counts of the windows that are over
+        """
+        self.first_n = first_n
+        self.window = window
+        self.max_signatures = max_signatures
+        self.flush_timer = flush_timer
+        self.counters = {}  # exception class name -> count
+        self._clock = clock
+        self._seen = OrderedDict()  # signature -> _Seen
+        self._next_flush = None  # end of the first window with pending counts
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def log(self, error, logger):
+        """
+        Counts the error and logs it if it was not seen too many times
+
+        :param error: the exception being handled, the traceback is taken from `sys.exc_info`
+        :param logger: logger used to log the traceback or the count
+        :return: the formatted traceback if it was logged, otherwise None
+        """
+        tb = sys.exc_info()[2]
+        error_class = error.__class__.__name__
+        signature = (error.__class__, _locations(tb))
+        now = self._clock()
+        with self._lock:
+            self.counters[error_class] = self.counters.get(error_class, 0) + 1
+            seen = self._seen.pop(signature, None)
+            if seen is None:
+                seen = _Seen(error_class)
+            self._seen[signature] = seen
+            if len(self._seen) > self.max_signatures:
+                self._seen.popitem(last=False)
+            seen.total += 1
+            total = seen.total
+            if total > self.first_n:
+                seen.message, seen.logger = str(error), logger
+                if not seen.pending:  # the window starts with the first error that is not logged
+                    seen.window_start = now
+                    self._schedule(now + self.window)
+                seen.pending += 1
+            summaries = self._due(now)
+
+        _log_summaries(summaries)
+        if total <= self.first_n:
+            formatted = traceback.format_exc()
+            logger.warning(formatted)
+            return formatted
+        return None
+
+    def flush(self):
+        """ Logs the counts of the windows that are over """
+        with self._lock:
+            self._timer = None
+            summaries = self._due(self._clock())
+            if self._next_flush is not None:
+                self._schedule(self._next_flush)
+        _log_summaries(summaries)
+
+    def close(self):
+        """ Stops the flush timer """
+        with self._lock:
+            self.flush_timer = False
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _due(self, now):
+        # called with the lock held, returns the summaries of the windows that are over and resets them
+        if self._next_flush is None or now < self._next_flush:
+            return []
+        summaries = []
+        self._next_flush = None
+        for seen in self._seen.itervalues():
+            if not seen.pending:
+                continue
+            if now - seen.window_start >= self.window:
+                summaries.append((seen.logger, seen.error_class, seen.message, seen.pending,
+                                  now - seen.window_start, seen.total))
+                seen.pending = 0
+            else:
+                self._schedule(seen.window_start + self.window)
+        return summaries
+
+    def _schedule(self, when):
+        # called with the lock held
+        if self._next_flush is None or when < self._next_flush:
+            self._next_flush = when
+        if self.flush_timer and self._timer is None:
+            self._timer = threading.Timer(max(self._next_flush - self._clock(), 0), self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+
+class _Seen(object):
+
+    __slots__ = ('error_class', 'total', 'pending', 'window_start', 'message', 'logger')
+
+    def __init__(self, error_class):
+        self.error_class = error_class
+        self.total = 0
+        self.pending = 0  # errors not logged in the current window
+        self.window_start = None
+        self.message = None
+        self.logger = None
+
+
+def _log_summaries(summaries):
+    for logger, error_class, message, count, seconds, total in summaries:
+        logger.warning('%s: %s seen %d times in %ds (%d in total)', error_class, message, count, seconds, total)
+
+
+def _locations(tb):
+    locations = []
+    while tb is not None:
+        locations.append((tb.tb_frame.f_code.co_filename, tb.tb_lineno))
+        tb = tb.tb_next
+    return tuple(locations)
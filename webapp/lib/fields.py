@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+    fields
+    ~~~~~~~~~~~~~~~
+
+    Sparse fieldsets, `?fields=id,name,owner.id` selects the fields of the response before it is encoded
+
+"""
+from functools import wraps
+
+from flask import g, request
+
+from webapp.exceptions import InvalidParametersException
+from webapp.lib.streaming import is_stream
+
+_MAX_CACHED_SPECS = 1024
+_parsed_specs = {}
+
+
+def parse_fields(spec):
+    """
+    Parses a field spec into a tree, an empty dict selects the whole value. Parsed specs are cached.
+
+        >>> parse_fields('id,owner.id,owner.name')
+        {'id': {}, 'owner': {'id': {}, 'name': {}}}
+
+    :param str spec: comma separated field paths, nested fields use dots
+    :rtype: dict
+    """
+    tree = _parsed_specs.get(spec)
+    if tree is not None:
+        return tree
+    tree = {}
+    for path in spec.split(','):
+        path = path.strip()
+        if not path:
+            continue
+        node = tree
+        parts = path.split('.')
+        for index, part in enumerate(parts):
+            if part in node and not node[part]:  # the whole value is already selected
+                break
+            if index == len(parts) - 1:
+                node[part] = {}
+            else:
+                node = node.setdefault(part, {})
+    if len(_parsed_specs) >= _MAX_CACHED_SPECS:
+        _parsed_specs.clear()
+    _parsed_specs[spec] = tree
+    return tree
+
+
+def is_allowed(tree, allowed):
+    """
+    :param dict tree: requested fields
+    :param dict allowed: selectable fields, a field is selectable if it or one of its parents is
+    :rtype: bool
+    """
+    for name, subtree in tree.iteritems():
+        if name not in allowed:
+            return False
+        if allowed[name] and (not subtree or not is_allowed(subtree, allowed[name])):
+            return False
+    return True
+
+
+def project(value, tree):
+    """
+    Keeps the selected fields of dicts, lists and streams of dicts, any other value is returned as it is
+
+    :param value: value to be projected
+    :param dict tree: parsed fields, empty selects everything
+    """
+    if not tree:
+        return value
+    if isinstance(value, dict):
+        return dict((name, project(value[name], subtree)) for name, subtree in tree.iteritems() if name in value)
+    if isinstance(value, (list, tuple)):
+        return [project(item, tree) for item in value]
+    if is_stream(value):
+        return (project(item, tree) for item in value)
+    return value
+
+
+def selectable_fields(*fields, **kwargs):
+    """
+    Usage:
+
+        @base.route('/users')
+        @selectable_fields('id', 'name', 'email', 'owner.id', root='items')
+        def users():
+            return {'items': load_users()}
+
+    Lets clients select the fields of the response with the `fields` query argument, unrequested fields are
+    removed by :func:`webapp.lib.api.api_success` before encoding. Without `fields` the response is not changed.
+
+    :param fields: selectable field paths
+    :param str root: key of the response with the objects to be projected, by default the whole response
+    :raise InvalidParametersException: if a requested field is not selectable
+    """
+    root = kwargs.pop('root', None)
+    if kwargs:
+        raise TypeError('unexpected arguments: %s' % ', '.join(kwargs))
+    allowed = parse_fields(','.join(fields))
+    allowed_names = ', '.join(sorted(fields))
+
+    def wrapper(fn):
+        @wraps(fn)
+        def wrapped_view(*args, **kwargs):
+            spec = request.args.get('fields')
+            if spec:
+                tree = parse_fields(spec)
+                if not is_allowed(tree, allowed):
+                    raise InvalidParametersException('fields can only select: %s' % allowed_names)
+                g._fieldset = (tree, root)
+            return fn(*args, **kwargs)
+
+        return wrapped_view
+    return wrapper
+
+
+def apply_fieldset(response):
+    """
+    Projects the response with the fields requested for the current view, if any
+
+    :param dict response: api response without the envelope
+    :return: projected response
+    """
+    fieldset = getattr(g, '_fieldset', None)
+    if fieldset is None:
+        return response
+    tree, root = fieldset
+    if root is None:
+        return project(response, tree)
+    if root in response:
+        response[root] = project(response[root], tree)
+    return response
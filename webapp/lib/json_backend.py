@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+    json_backend
+    ~~~~~~~~~~~~~~~
+
+    Pluggable json libraries used to encode responses and decode request bodies
+
+"""
+import json
+import logging
+import re
+import uuid
+
+from flask import current_app, has_app_context
+
+from webapp.lib.utils import json_default
+
+logger = logging.getLogger(__name__)
+
+# backend name -> module that implements the stdlib `json` api (`dumps` with `default` and `loads`)
+BACKENDS = {
+    'json': 'json',
+    'simplejson': 'simplejson',
+}
+
+
+# unique per process so that no string of a response can be taken for a raw fragment
+_RAW_TOKEN = '__raw_json_%s_' % uuid.uuid4().hex
+_RAW_PLACEHOLDER = re.compile(r'"%s(\d+)"' % _RAW_TOKEN)
+
+
+class RawJSON(object):
+    """
+    Already encoded json, e.g. from a cache, that is spliced as it is in the encoded response instead of
+    being decoded and encoded again. It can be any value of a response or the whole response.
+
+        >>> backend.dumps({'id': 1, 'entry': RawJSON('{"name":"cached"}')})
+        '{"id":1,"entry":{"name":"cached"}}'
+    """
+
+    __slots__ = ('encoded',)
+
+    def __init__(self, encoded):
+        """
+        :param encoded: json string, it is only validated when the backend validates raw fragments (debug)
+        """
+        self.encoded = encoded
+
+    def __repr__(self):
+        return '<RawJSON %r>' % self.encoded[:40]
+
+
+class JSONBackend(object):
+
+    def __init__(self, name, module, sort_keys=False, ensure_ascii=True, validate_raw=False):
+        """
+        Encodes and decodes json with a module that follows the stdlib `json` api. The encoding is
+        compact, does not allow NaN and uses :func:`webapp.lib.utils.json_default` for non native types,
+        falling back to the `json_encoder` of the current app for the types it does not know.
+
+        Sorting keys is off by default, with sorted keys the stdlib falls back to its pure python encoder.
+
+        :param str name: name of the backend
+        :param module: json module
+        :param bool sort_keys: sort the keys of the encoded objects
+        :param bool ensure_ascii: escape non ascii characters
+        :param bool validate_raw: decode :class:`RawJSON` fragments to check they are valid, for debugging
+        """
+        self.name = name
+        self.module = module
+        self.sort_keys = sort_keys
+        self.ensure_ascii = ensure_ascii
+        self.validate_raw = validate_raw
+
+    def dumps(self, obj):
+        """
+        :param obj: object to be encoded
+        :return: json string
+        """
+        fragments = []
+
+        def default(o):
+            if isinstance(o, RawJSON):  # encoded as a placeholder string that is replaced afterwards
+                fragments.append(self.check_raw(o))
+                return '%s%d' % (_RAW_TOKEN, len(fragments) - 1)
+            try:
+                return json_default(o)
+            except TypeError:
+                return _app_default(o)
+
+        if isinstance(obj, RawJSON):
+            return self.check_raw(obj)
+        encoded = self.module.dumps(obj, default=default, allow_nan=False, separators=(',', ':'),
+                                    sort_keys=self.sort_keys, ensure_ascii=self.ensure_ascii)
+        if fragments:
+            if isinstance(encoded, unicode):
+                fragments = [_to_unicode(fragment) for fragment in fragments]
+            encoded = _RAW_PLACEHOLDER.sub(lambda match: fragments[int(match.group(1))], encoded)
+        return encoded
+
+    def check_raw(self, raw):
+        """
+        :param RawJSON raw: raw fragment
+        :return: the encoded fragment
+        :raise ValueError: if the backend validates raw fragments and it is not valid json
+        """
+        if self.validate_raw:
+            try:
+                self.module.loads(raw.encoded)
+            except ValueError as e:
+                raise ValueError('invalid raw json %r: %s' % (raw, e))
+        return raw.encoded
+
+    def loads(self, data):
+        """
+        :param data: json string
+        :return: decoded object
+        :raise ValueError: if the data is not valid json
+        """
+        return self.module.loads(data)
+
+    def __repr__(self):
+        return '<JSONBackend %s>' % self.name
+
+
+def get_backend(name='json', sort_keys=False, ensure_ascii=True, validate_raw=False):
+    """
+    Loads a json backend by name, if the library is not installed it falls back to the stdlib.
+
+    :param str name: one of the :data:`BACKENDS`
+    :param bool sort_keys: sort the keys of the encoded objects
+    :param bool ensure_ascii: escape non ascii characters
+    :param bool validate_raw: check that :class:`RawJSON` fragments are valid json
+    :rtype: :class:`JSONBackend`
+    :raise ValueError: if the backend is unknown
+    """
+    if name not in BACKENDS:
+        raise ValueError('Unknown json backend %r, available: %s' % (name, ', '.join(sorted(BACKENDS))))
+    try:
+        module = __import__(BACKENDS[name])
+    except ImportError:
+        logger.warning('json backend %s is not installed, using the stdlib json', name)
+        name, module = 'json', json
+    return JSONBackend(name, module, sort_keys, ensure_ascii, validate_raw)
+
+
+def backend_from_config(config):
+    """
+    :param config: app config with `JSON_BACKEND`, `JSON_SORT_KEYS` and `JSON_AS_ASCII`, raw fragments are
+        validated in `DEBUG`
+    :rtype: :class:`JSONBackend`
+    """
+    return get_backend(config.get('JSON_BACKEND', 'json'),
+                       sort_keys=config.get('JSON_SORT_KEYS', True),
+                       ensure_ascii=config.get('JSON_AS_ASCII', True),
+                       validate_raw=config.get('DEBUG', False))
+
+
+def _app_default(o):
+    """ encodes `o` with the `default` of the app json encoder, e.g. a `CustomJSONEncoder` subclass """
+    if not has_app_context():
+        raise TypeError('%r is not JSON serializable' % (o,))
+    return current_app.json_encoder().default(o)
+
+
+def _to_unicode(fragment):
+    return fragment if isinstance(fragment, unicode) else fragment.decode('utf-8')
+
+
+default_backend = JSONBackend('json', json)
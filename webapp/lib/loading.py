@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+    loading
+    ~~~~~~~~~~~~~~~
+
+    Lazy loading of blueprints and extensions
+
+"""
+import threading
+
+from flask import url_for
+
+
+class LazyLoader(object):
+
+    def __init__(self):
+        """
+        Keeps blueprints and extensions that are loaded on demand. Extensions are initialized on the first
+        request, blueprints on the first request whose path is under their url prefix. Every load runs once,
+        even when many threads hit the app at the same time.
+        """
+        self._blueprints = []  # (url_prefix, load function)
+        self._extensions = []  # load functions
+        self._lock = threading.RLock()
+        self.pending = False
+
+    def add_blueprint(self, url_prefix, load):
+        """
+        :param str url_prefix: url prefix of the blueprint, '' or None (the blueprint's own prefix, unknown until
+            it is imported) match every path
+        :param load: function that imports and registers the blueprint
+        """
+        with self._lock:
+            self._blueprints.append(((url_prefix or '').rstrip('/'), load))
+            self.pending = True
+
+    def add_extension(self, load):
+        """
+        :param load: function that imports and initializes the extension
+        """
+        with self._lock:
+            self._extensions.append(load)
+            self.pending = True
+
+    def load_for_path(self, path):
+        """
+        Loads the pending extensions and the pending blueprints that could route `path`
+
+        :param str path: request path
+        """
+        if self._extensions or any(_matches(prefix, path) for prefix, _ in self._blueprints):
+            with self._lock:
+                self._load(lambda prefix: _matches(prefix, path))
+
+    def load_all(self):
+        """
+        Loads everything that is pending, e.g. before forking workers
+        """
+        with self._lock:
+            self._load(lambda prefix: True)
+
+    def handle_build_error(self, error, endpoint, values):
+        """
+        Url build error handler, `url_for` can target a blueprint that is not loaded yet
+
+        :return: the url once everything is loaded, None if nothing was pending
+        """
+        if not self.pending:
+            return None
+        self.load_all()
+        return url_for(endpoint, **values)
+
+    def _load(self, matches):
+        # called with the lock held, entries are removed once loaded so a failing import is retried
+        for load in list(self._extensions):
+            load()
+            self._extensions.remove(load)
+        for entry in [entry for entry in self._blueprints if matches(entry[0])]:
+            entry[1]()
+            self._blueprints.remove(entry)
+        self.pending = bool(self._blueprints or self._extensions)
+
+
+def _matches(prefix, path):
+    return not prefix or path == prefix or path.startswith(prefix + '/')
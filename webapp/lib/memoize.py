@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+    memoize
+    ~~~~~~~~~~~~~~~
+
+    Memoization of helper functions, per request and optionally per process with tag invalidation
+
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, has_app_context
+
+MISSING = object()
+
+_ids = itertools.count()
+
+
+class MemoStore(object):
+
+    def __init__(self, max_entries=10000, clock=time.time):
+        """
+        In process LRU store with per entry TTL and tags. When full, the least recently used entry is evicted.
+        Concurrent misses of a key are computed once, see :meth:`get_or_compute`.
+
+        :param int max_entries: maximum number of entries
+        :param clock: function that returns the current time in seconds
+        """
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (expires, value, tags), least recently used first
+        self._tags = {}  # tag -> keys
+        self._inflight = {}  # key -> _Flight of the value being computed
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        :return: stored value or :data:`MISSING` if the key is missing or expired
+        """
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return MISSING
+            if entry[0] is not None and entry[0] <= self._clock():
+                self._untag(key, entry[2])
+                return MISSING
+            self._data[key] = entry
+            return entry[1]
+
+    def set(self, key, value, ttl=None, tags=()):
+        """
+        :param key: hashable key
+        :param value: value to be stored
+        :param ttl: seconds until the value expires, None never expires
+        :param tags: tags of the value, see :meth:`invalidate`
+        """
+        with self._lock:
+            self._set(key, value, ttl, frozenset(tags))
+
+    def _set(self, key, value, ttl, tags):
+        # called with the lock held
+        expires = None if ttl is None else self._clock() + ttl
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._untag(key, old[2])
+        self._data[key] = (expires, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._data) > self.max_entries:
+            evicted, entry = self._data.popitem(last=False)
+            self._untag(evicted, entry[2])
+            self.evictions += 1
+
+    def delete(self, key):
+        """
+        Deletes a value, values of the key being computed are not stored
+
+        :return: True if the key was stored
+        """
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                flight.stale = True
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return False
+            self._untag(key, entry[2])
+            return True
+
+    def invalidate(self, *tags):
+        """
+        Deletes every value with any of the tags, values with the tags being computed are not stored
+
+        :return: number of deleted values
+        """
+        deleted = 0
+        tags = frozenset(tags)
+        with self._lock:
+            for flight in self._inflight.itervalues():
+                if not flight.tags.isdisjoint(tags):
+                    flight.stale = True
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    entry = self._data.pop(key, None)
+                    if entry is not None:
+                        self._untag(key, entry[2])
+                        deleted += 1
+        return deleted
+
+    def clear(self):
+        with self._lock:
+            for flight in self._inflight.itervalues():
+                flight.stale = True
+            self._data.clear()
+            self._tags.clear()
+
+    def get_or_compute(self, key, compute, ttl=None, tags=(), timeout=30):
+        """
+        Returns the stored value or computes it. While a thread computes a key, other threads that miss the
+        same key wait for its value instead of computing it again, so an expired hot key is computed once.
+
+        :param key: hashable key
+        :param compute: function without arguments that returns the value
+        :param ttl: seconds until the value expires, None never expires
+        :param tags: tags of the value
+        :param timeout: seconds to wait for another thread, after that the value is computed anyway
+        :return: tuple `(value, True if it was stored)`
+        """
+        value = self.get(key)
+        if value is not MISSING:
+            return value, True
+        tags = frozenset(tags)
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight(tags)
+        if not leader:
+            flight.event.wait(timeout)
+            value = self.get(key)
+            if value is not MISSING:
+                return value, True
+            return compute(), False  # the other thread failed or is too slow
+        try:
+            value = compute()
+            with self._lock:
+                if not flight.stale:  # not deleted or invalidated while it was computed
+                    self._set(key, value, ttl, tags)
+            return value, False
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.event.set()
+
+    def _untag(self, key, tags):
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Flight(object):
+
+    __slots__ = ('event', 'tags', 'stale')
+
+    def __init__(self, tags):
+        self.event = threading.Event()  # set when the value is computed
+        self.tags = tags
+        self.stale = False  # the key or one of its tags was invalidated, the value is not stored
+
+
+#: process store shared by the memoized functions, sized with `MEMOIZE_MAX_ENTRIES` by the app factory
+default_store = MemoStore()
+
+
+class Memoizer(object):
+
+    def __init__(self, ttl=None, tags=(), shared=None, key_fn=None, store=None):
+        """
+        Memoizes a function, see :func:`memoize`
+
+        :param ttl: seconds the values are kept in the process store
+        :param tags: format strings of the tags, formatted with the arguments of the function, or a function
+            that takes the same arguments and returns the tags
+        :param bool shared: use the process store, by default when a `ttl` or `tags` are set
+        :param key_fn: function that takes the same arguments and returns the hashable key
+        :param store: a :class:`MemoStore`, defaults to :data:`default_store`
+        """
+        self.ttl = ttl
+        self.tags = tags
+        self.shared = shared if shared is not None else bool(ttl or tags)
+        self.key_fn = key_fn
+        self.store = store if store is not None else default_store
+        self.request_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.name = None
+        self._lock = threading.Lock()  # the counters are updated by the worker threads
+
+    def __call__(self, fn):
+        # functions with the same name, e.g. made by a factory or methods of different classes, get their own keys
+        self.name = '%s.%s#%d' % (fn.__module__, fn.__name__, next(_ids))
+
+        @wraps(fn)
+        def memoized(*args, **kwargs):
+            key = self.make_key(*args, **kwargs)
+            if key is None:  # unhashable arguments
+                return fn(*args, **kwargs)
+
+            memo = _request_memo()
+            if memo is not None:
+                value = memo.get(key, MISSING)
+                if value is not MISSING:
+                    self._count('request_hits')
+                    return value
+
+            if self.shared:
+                value, stored = self.store.get_or_compute(key, lambda: fn(*args, **kwargs), self.ttl,
+                                                          self._get_tags(args, kwargs))
+                self._count('hits' if stored else 'misses')
+            else:
+                value = fn(*args, **kwargs)
+                self._count('misses')
+            if memo is not None:
+                memo[key] = value
+            return value
+
+        memoized.memo = self
+        return memoized
+
+    def make_key(self, *args, **kwargs):
+        """
+        :return: key of the arguments or None if they are not hashable
+        """
+        if self.key_fn is not None:
+            key = self.key_fn(*args, **kwargs)
+        else:
+            key = (args, frozenset(kwargs.iteritems())) if kwargs else args
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return self.name, key
+
+    def invalidate(self, *args, **kwargs):
+        """ Forgets the value of the arguments in the process store and the current request """
+        key = self.make_key(*args, **kwargs)
+        memo = _request_memo()
+        if memo is not None:
+            memo.pop(key, None)
+        return self.store.delete(key)
+
+    def stats(self):
+        """
+        :return: dict with the hits of the request memo and of the process store, the misses and the hit ratio
+        """
+        with self._lock:
+            request_hits, hits, misses = self.request_hits, self.hits, self.misses
+        total = request_hits + hits + misses
+        return {'request_hits': request_hits, 'hits': hits, 'misses': misses,
+                'hit_ratio': float(request_hits + hits) / total if total else 0.0}
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _get_tags(self, args, kwargs):
+        if callable(self.tags):
+            return self.tags(*args, **kwargs)
+        return [tag.format(*args, **kwargs) for tag in self.tags]
+
+
+def memoize(ttl=None, tags=(), shared=None, key_fn=None, store=None):
+    """
+    Usage:
+
+        @memoize()
+        def current_user():
+            return User.query.get(session['user_id'])
+
+        @memoize(ttl=300, tags=('tenant:{0}',))
+        def tenant_config(tenant_id):
+            return load_config(tenant_id)
+
+        invalidate_tags('tenant:42')
+
+    Values are always memoized for the current request, the memo is cleared after each request by
+    :func:`clear_request_memo`. With a `ttl` or `tags` they are also kept in a process wide LRU store shared
+    by the worker threads, where they can be invalidated by tag from any request. The decorated function has
+    a `memo` attribute, a :class:`Memoizer`, with `invalidate(*args)` and `stats()`.
+
+    Arguments are part of the key, functions with unhashable arguments are not memoized.
+    """
+    return Memoizer(ttl, tags, shared, key_fn, store)
+
+
+def invalidate_tags(*tags):
+    """
+    Deletes the values with any of the tags from the process store
+
+    :return: number of deleted values
+    """
+    return default_store.invalidate(*tags)
+
+
+def clear_request_memo(exception=None):
+    """
+    Teardown request hook that clears the request memo, it runs even if the view raised. `g` outlives a request
+    when the app context was pushed before it, e.g. in tests.
+    """
+    if has_app_context():
+        g.__dict__.pop('_memo', None)
+
+
+def _request_memo():
+    if not has_app_context():
+        return None
+    memo = getattr(g, '_memo', None)
+    if memo is None:
+        memo = g._memo = {}
+    return memo
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+    memory
+    ~~~~~~~~~~~~~~~
+
+    Per endpoint memory allocation tracking and detection of endpoints whose retained memory keeps growing
+
+"""
+import random
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, g, request
+
+from webapp.exceptions import ForbiddenException
+from webapp.lib.api import api_success
+from webapp.lib.utils import current_rss, token_matches
+
+try:
+    import tracemalloc  # python 3 or the pytracemalloc backport
+except ImportError:
+    tracemalloc = None
+
+UNMATCHED = 'unmatched'
+
+
+class _Endpoint(object):
+
+    def __init__(self):
+        self.requests = 0
+        self.net = 0  # bytes retained by all the requests
+        self.max = 0  # bytes retained by a single request
+        self.interval_net = 0  # bytes retained since the last snapshot
+        self.streak = 0  # consecutive snapshots in which the endpoint retained memory
+        self.sites = Counter()  # allocation site -> bytes, of the sampled requests
+
+
+class MemoryTracker(object):
+
+    def __init__(self, top=10, frames=1, sites_rate=0.01, snapshot_interval=300, growth_snapshots=3,
+                 min_growth=1024 * 1024, use_tracemalloc=True, measure=None, clock=time.time):
+        """
+        Tracks the net memory allocated by each request, per endpoint. With `tracemalloc` the traced memory is
+        measured and the allocation sites of a fraction of the requests are kept, otherwise (python 2 without
+        the pytracemalloc backport) the resident memory of the process is measured, which only grows when the
+        allocator asks the OS for more memory.
+
+        Requests that run concurrently in threads are measured together, the numbers are exact with a single
+        thread per process like the workers of :mod:`webapp.server`.
+
+        Every `snapshot_interval` seconds the memory retained by each endpoint since the previous snapshot is
+        checked, endpoints that retained more than `min_growth` bytes in `growth_snapshots` consecutive
+        snapshots are flagged as growing.
+
+        :param int top: allocation sites kept per endpoint and in the snapshot diff
+        :param int frames: frames of the traceback of each allocation stored by tracemalloc
+        :param float sites_rate: fraction of the requests whose allocation sites are recorded, each one takes
+            two tracemalloc snapshots
+        :param snapshot_interval: seconds between snapshots
+        :param int growth_snapshots: consecutive growing snapshots that flag an endpoint
+        :param int min_growth: bytes an endpoint has to retain between snapshots to be growing
+        :param bool use_tracemalloc: use tracemalloc if it is installed
+        :param measure: function that returns the memory in bytes, defaults to the traced memory or the RSS
+        :param clock: function that returns the current time in seconds
+        """
+        self.tracing = use_tracemalloc and tracemalloc is not None and measure is None
+        self.top = top
+        self.frames = frames
+        self.sites_rate = sites_rate if self.tracing else 0.0
+        self.snapshot_interval = snapshot_interval
+        self.growth_snapshots = growth_snapshots
+        self.min_growth = min_growth
+        self.snapshots = 0
+        self.top_growth = []  # allocation sites that grew the most between the last two snapshots
+        self._measure = measure or (_traced_memory if self.tracing else current_rss)
+        self._clock = clock
+        self._endpoints = {}
+        self._next_snapshot = clock() + snapshot_interval
+        self._last_snapshot = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(top=config.get('MEMORY_TOP_SITES', 10),
+                   frames=config.get('MEMORY_FRAMES', 1),
+                   sites_rate=config.get('MEMORY_SITES_RATE', 0.01),
+                   snapshot_interval=config.get('MEMORY_SNAPSHOT_INTERVAL', 300),
+                   growth_snapshots=config.get('MEMORY_GROWTH_SNAPSHOTS', 3),
+                   min_growth=config.get('MEMORY_MIN_GROWTH', 1024 * 1024))
+
+    @property
+    def backend(self):
+        return 'tracemalloc' if self.tracing else 'rss'
+
+    def start_tracing(self):
+        if self.tracing and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._last_snapshot = self._take_snapshot()
+
+    def start(self):
+        """ Before request hook that measures the memory before the request """
+        if self.sites_rate and random.random() < self.sites_rate:
+            g._memory_snapshot = self._take_snapshot()
+        g._memory_start = self._measure()
+
+    def finish(self, exception=None):
+        """
+        Teardown request hook that records the memory retained by the request, it runs after the other
+        teardown hooks have released what they keep for the request
+        """
+        start = g.__dict__.pop('_memory_start', None)
+        if start is None:
+            return
+        net = self._measure() - start
+        snapshot = g.__dict__.pop('_memory_snapshot', None)
+        sites = self._diff(snapshot, self._take_snapshot()) if snapshot is not None else ()
+        self.record(request.endpoint or UNMATCHED, net, sites)
+        if self._clock() >= self._next_snapshot:
+            self.snapshot()
+
+    def record(self, endpoint, net, sites=()):
+        """
+        :param str endpoint: flask endpoint
+        :param int net: bytes retained by the request, negative if it released memory
+        :param sites: `(site, bytes)` pairs of the allocation sites of the request
+        """
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = _Endpoint()
+            stats.requests += 1
+            stats.net += net
+            stats.interval_net += net
+            stats.max = max(stats.max, net)
+            for site, size in sites:
+                stats.sites[site] += size
+            if len(stats.sites) > self.top * 10:  # keeps the counter bounded
+                stats.sites = Counter(dict(stats.sites.most_common(self.top)))
+
+    def snapshot(self):
+        """
+        Compares the memory retained by each endpoint since the previous snapshot and, with tracemalloc,
+        the allocation sites of the whole process
+
+        :return: the growing endpoints
+        """
+        current = self._take_snapshot()
+        with self._lock:
+            self._next_snapshot = self._clock() + self.snapshot_interval
+            self.snapshots += 1
+            for stats in self._endpoints.itervalues():
+                stats.streak = stats.streak + 1 if stats.interval_net >= self.min_growth else 0
+                stats.interval_net = 0
+            if current is not None:
+                if self._last_snapshot is not None:
+                    self.top_growth = [{'site': site, 'size': size}
+                                       for site, size in self._diff(self._last_snapshot, current)]
+                self._last_snapshot = current
+            return self.growing()
+
+    def growing(self):
+        return sorted(endpoint for endpoint, stats in self._endpoints.iteritems()
+                      if stats.streak >= self.growth_snapshots)
+
+    def report(self):
+        """
+        :return: dict with the memory of the process, the stats of each endpoint and the growing endpoints
+        """
+        with self._lock:
+            endpoints = {}
+            for endpoint, stats in self._endpoints.iteritems():
+                endpoints[endpoint] = {
+                    'requests': stats.requests,
+                    'net_bytes': stats.net,
+                    'mean_bytes': stats.net // stats.requests,
+                    'max_bytes': stats.max,
+                    'growth_streak': stats.streak,
+                    'sites': [{'site': site, 'size': size} for site, size in stats.sites.most_common(self.top)],
+                }
+            process = {'rss': current_rss()}
+            if self.tracing and tracemalloc.is_tracing():
+                process['traced'], process['traced_peak'] = tracemalloc.get_traced_memory()
+            return {
+                'backend': self.backend,
+                'process': process,
+                'snapshots': self.snapshots,
+                'growing': self.growing(),
+                'top_growth': list(self.top_growth),
+                'endpoints': endpoints,
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self.top_growth = []
+
+    def _take_snapshot(self):
+        if self.tracing and tracemalloc.is_tracing():
+            return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        return None
+
+    def _diff(self, old, new):
+        """
+        :return: `(site, bytes)` pairs of the sites that allocated the most between the snapshots
+        """
+        if old is None or new is None:
+            return []
+        stats = [stat for stat in new.compare_to(old, 'lineno') if stat.size_diff > 0]
+        stats.sort(key=lambda stat: stat.size_diff, reverse=True)
+        return [('%s:%s' % (stat.traceback[0].filename, stat.traceback[0].lineno), stat.size_diff)
+                for stat in stats[:self.top]]
+
+
+def _traced_memory():
+    return tracemalloc.get_traced_memory()[0]
+
+
+def memory_view():
+    """
+    Memory report of the current process, requests need the `MEMORY_TOKEN` in the `MEMORY_HEADER`. With
+    `?snapshot=1` a snapshot is taken before the report and with `?reset=1` the endpoint stats are cleared.
+    """
+    config = current_app.config
+    token = config.get('MEMORY_TOKEN')
+    value = request.headers.get(config.get('MEMORY_HEADER', 'X-Debug-Token'))
+    if not token_matches(value, token):
+        raise ForbiddenException('A valid debug token is required')
+    tracker = current_app.memory_tracker
+    if request.args.get('snapshot'):
+        tracker.snapshot()
+    report = tracker.report()
+    if request.args.get('reset'):
+        tracker.reset()
+    return api_success(report)
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+    metrics
+    ~~~~~~~~~~~~~~~
+
+    Per endpoint request metrics exposed in the Prometheus text format
+
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, request
+
+from webapp.exceptions import ForbiddenException
+from webapp.lib.utils import token_matches
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Shard(object):
+    """ counters written by a single thread """
+
+    def __init__(self):
+        self.requests = {}  # (endpoint, method, status) -> count
+        self.latency = {}  # endpoint -> [count per bucket..., count over the last bucket, sum]
+        self.errors = {}  # error name -> count
+
+
+class Metrics(object):
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Request counters and latency histograms. Every thread updates its own shard so the hot path takes no
+        locks, shards are merged when the metrics are collected. The shards of finished threads are folded into
+        a retired shard, so servers that start a thread per request don't accumulate them.
+
+        :param buckets: upper bounds in seconds of the latency histogram buckets
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._local = threading.local()
+        self._shards = []  # (thread, shard) of the threads that recorded something
+        self._retired = _Shard()  # merged shards of the finished threads
+        self._fold_at = 16  # number of shards that triggers folding, doubles with the live threads
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+                if len(self._shards) >= self._fold_at:
+                    self._fold_finished()
+                    self._fold_at = max(16, len(self._shards) * 2)
+        return shard
+
+    def _fold_finished(self):
+        """ merges the shards of the finished threads into the retired shard, called with the lock held """
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                _merge(self._retired, shard)
+        self._shards = alive
+
+    def observe(self, endpoint, method, status, seconds):
+        """
+        Records a finished request
+
+        :param str endpoint: flask endpoint
+        :param str method: HTTP method
+        :param int status: response status code
+        :param float seconds: time spent handling the request
+        """
+        shard = self._shard()
+        key = (endpoint, method, status)
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+        histogram = shard.latency.get(endpoint)
+        if histogram is None:
+            histogram = shard.latency[endpoint] = [0] * (len(self.buckets) + 1) + [0.0]
+        histogram[bisect_left(self.buckets, seconds)] += 1
+        histogram[-1] += seconds
+
+    def count_error(self, error):
+        """
+        :param str error: api error name, e.g. invalid_parameters
+        """
+        errors = self._shard().errors
+        errors[error] = errors.get(error, 0) + 1
+
+    def collect(self):
+        """
+        :return: merged `(requests, latency, errors)` of all the threads
+        """
+        merged = _Shard()
+        with self._lock:
+            self._fold_finished()
+            _merge(merged, self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            _merge(merged, shard)
+        return merged.requests, merged.latency, merged.errors
+
+    def render(self):
+        """
+        :return: metrics in the Prometheus text format
+        """
+        requests, latency, errors = self.collect()
+        lines = ['# HELP http_requests_total Requests by endpoint, method and status code.',
+                 '# TYPE http_requests_total counter']
+        for (endpoint, method, status), count in sorted(requests.items()):
+            lines.append('http_requests_total{endpoint="%s",method="%s",status="%s"} %d'
+                         % (_escape(endpoint), method, status, count))
+
+        lines.extend(['# HELP http_request_duration_seconds Request latency by endpoint.',
+                      '# TYPE http_request_duration_seconds histogram'])
+        for endpoint, histogram in sorted(latency.items()):
+            endpoint = _escape(endpoint)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), histogram[:-1]):
+                cumulative += count
+                lines.append('http_request_duration_seconds_bucket{endpoint="%s",le="%s"} %d'
+                             % (endpoint, bound, cumulative))
+            lines.append('http_request_duration_seconds_sum{endpoint="%s"} %r' % (endpoint, histogram[-1]))
+            lines.append('http_request_duration_seconds_count{endpoint="%s"} %d' % (endpoint, cumulative))
+
+        lines.extend(['# HELP api_errors_total Api errors by error name.',
+                      '# TYPE api_errors_total counter'])
+        for error, count in sorted(errors.items()):
+            lines.append('api_errors_total{error="%s"} %d' % (_escape(error), count))
+        return '\n'.join(lines) + '\n'
+
+
+def _merge(target, shard):
+    for key, count in shard.requests.items():
+        target.requests[key] = target.requests.get(key, 0) + count
+    for endpoint, histogram in shard.latency.items():
+        merged = target.latency.setdefault(endpoint, [0] * len(histogram))
+        for index, value in enumerate(histogram):
+            merged[index] += value
+    for error, count in shard.errors.items():
+        target.errors[error] = target.errors.get(error, 0) + count
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def start_timer():
+    """ Before request hook that starts timing the request """
+    g._metrics_start = time.time()
+
+
+def record_request(response):
+    """
+    After request hook that records the request and the api error of the response if any. Requests that
+    did not match a route are grouped under the `unmatched` endpoint to keep the number of series bounded.
+    """
+    start = getattr(g, '_metrics_start', None)
+    if start is not None:
+        metrics = current_app.metrics
+        metrics.observe(request.endpoint or 'unmatched', request.method, response.status_code, time.time() - start)
+        error = getattr(g, 'api_error', None)
+        if error is not None:
+            metrics.count_error(error)
+    return response
+
+
+def metrics_view():
+    """
+    Metrics of the process. With a `METRICS_TOKEN` requests need it in the `METRICS_HEADER` or as a bearer
+    token (the `bearer_token` of a Prometheus scrape config), without one the route must not be reachable
+    from outside.
+    """
+    config = current_app.config
+    token = config.get('METRICS_TOKEN')
+    if token is not None:
+        value = request.headers.get(config.get('METRICS_HEADER', 'X-Debug-Token'))
+        authorization = request.headers.get('Authorization', '')
+        if value is None and authorization.startswith('Bearer '):
+            value = authorization[len('Bearer '):]
+        if not token_matches(value, token):
+            raise ForbiddenException('A valid metrics token is required')
+    return current_app.response_class(current_app.metrics.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+    ndjson
+    ~~~~~~~~~~~~~~~
+
+    Bulk ingest of newline delimited json bodies, validated one record at a time
+
+"""
+from functools import wraps
+
+from flask import current_app, request
+
+from webapp.exceptions import InvalidParametersException, PayloadTooLargeException
+from webapp.lib.api import get_json_backend
+from webapp.lib.body import check_body
+from webapp.lib.schema import compile_schema
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson')
+
+FAIL = 'fail'
+SKIP = 'skip'
+
+
+class Records(object):
+
+    def __init__(self, lines, validate, loads, on_error=FAIL, max_errors=100):
+        """
+        Iterable of the valid records of a body, lines are read and validated while it is iterated so only
+        one record is in memory at a time. It can only be iterated once.
+
+        :param lines: iterable of `(line number, line)`
+        :param validate: compiled schema, see :func:`webapp.lib.schema.compile_schema`
+        :param loads: function that decodes a line
+        :param str on_error: :data:`FAIL` to raise on the first invalid record, :data:`SKIP` to collect it
+        :param int max_errors: invalid records kept in `errors`, the rest are only counted
+        """
+        self.valid = 0
+        self.invalid = 0
+        self.errors = []  # dicts with the line number and the description of the invalid records
+        self._lines = lines
+        self._validate = validate
+        self._loads = loads
+        self._on_error = on_error
+        self._max_errors = max_errors
+
+    def __iter__(self):
+        for number, line in self._lines:
+            try:
+                record = self._loads(line)
+            except ValueError:
+                self._error(number, ['invalid JSON'])
+                continue
+            if not isinstance(record, dict):
+                self._error(number, ['a JSON object is required'])
+                continue
+            errors = self._validate(record)
+            if errors:
+                self._error(number, errors)
+                continue
+            self.valid += 1
+            yield record
+
+    def _error(self, number, errors):
+        description = ', '.join(errors)
+        if self._on_error == FAIL:
+            raise InvalidParametersException('line %d: %s' % (number, description))
+        self.invalid += 1
+        if len(self.errors) < self._max_errors:
+            self.errors.append({'line': number, 'description': description})
+
+
+def ndjson_required(required_fields=None, optional_fields=None, on_error=None, max_size=None):
+    """
+    Usage:
+
+        @base.route('/events', methods=['POST'])
+        @ndjson_required({'type': str, 'timestamp': float}, {'tags': [str]}, on_error=SKIP)
+        def ingest(records):
+            stored = store_events(records)
+            return {'stored': stored, 'invalid': records.invalid, 'errors': records.errors}
+
+    Sibling of :func:`webapp.lib.api.json_required` for `application/x-ndjson` bodies, one json object per
+    line. The view gets the valid records as the `records` keyword argument, a :class:`Records` that reads
+    and validates the body line by line while it is iterated, so memory use does not depend on the body size.
+    Blank lines are ignored.
+
+    With `on_error` :data:`FAIL` the first invalid record raises :class:`InvalidParametersException` with
+    its line number, with :data:`SKIP` invalid records are left out and collected in `records.errors`.
+
+    :param dict required_fields: dictionary with required fields as keys and the type they should be as value
+    :param dict optional_fields: dictionary with optional fields as keys and the type they should be as value
+    :param str on_error: error policy, defaults to `NDJSON_ON_ERROR`
+    :param int max_size: maximum body size in bytes, defaults to `NDJSON_MAX_BODY_SIZE` (None for no limit)
+    :return: :raise UnsupportedMediaTypeException: decorated function
+    """
+    validate = compile_schema(required_fields, optional_fields)
+    if on_error not in (None, FAIL, SKIP):
+        raise ValueError('on_error must be %r or %r' % (FAIL, SKIP))
+
+    def wrapper(fn):
+        @wraps(fn)
+        def wrapped_view(*args, **kwargs):
+            config = current_app.config
+            limit = max_size if max_size is not None else config.get('NDJSON_MAX_BODY_SIZE')
+            check_body(limit, NDJSON_TYPES)
+            lines = _iter_lines(request.stream, limit, config.get('NDJSON_MAX_LINE_SIZE', 1024 * 1024))
+            kwargs['records'] = Records(lines, validate, _get_loads(request.mimetype_params.get('charset')),
+                                        on_error or config.get('NDJSON_ON_ERROR', FAIL),
+                                        config.get('NDJSON_MAX_ERRORS', 100))
+            return fn(*args, **kwargs)
+
+        wrapped_view.body_limits = (max_size, NDJSON_TYPES)
+        return wrapped_view
+    return wrapper
+
+
+def _get_loads(charset):
+    loads = get_json_backend().loads
+    if charset is None:
+        return loads
+    return lambda line: loads(line.decode(charset))  # UnicodeDecodeError is a ValueError too
+
+
+def _iter_lines(stream, max_size, max_line_size):
+    """
+    Yields the numbered non blank lines of the stream, reading at most `max_line_size` bytes at a time
+    """
+    size = 0
+    number = 0
+    while True:
+        line = stream.readline(max_line_size + 1)
+        if not line:
+            return
+        number += 1
+        size += len(line)
+        if max_size is not None and size > max_size:
+            raise PayloadTooLargeException('the body can not be bigger than %d bytes' % max_size)
+        line = line.rstrip(b'\r\n')
+        if len(line) > max_line_size:
+            raise PayloadTooLargeException('line %d is longer than %d bytes' % (number, max_line_size))
+        if line.strip():
+            yield number, line
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+    pagination
+    ~~~~~~~~~~~~~~~
+
+    Keyset (cursor) pagination with signed cursors
+
+"""
+from itertools import islice
+from operator import itemgetter
+
+from flask import current_app, request
+from itsdangerous import BadData, URLSafeSerializer
+
+from webapp.exceptions import InvalidParametersException
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def paginate(fetch, key, limit=None):
+    """
+    Usage:
+
+        @base.route('/events')
+        def events():
+            def fetch(position, direction, limit):
+                query = Event.query
+                if direction == NEXT:
+                    if position is not None:
+                        query = query.filter(Event.id > position)
+                    return query.order_by(Event.id).limit(limit)
+                return query.filter(Event.id < position).order_by(Event.id.desc()).limit(limit)
+            return paginate(fetch, key=lambda event: event.id)
+
+    Paginates a keyset ordered collection. The client sends the page size in `?limit=` and the `cursor` of a
+    previous response, cursors are signed with the app secret key so they can't be forged. Pages are fetched
+    from the last key seen, so the cost does not depend on how deep the page is.
+
+    :param fetch: function `(position, direction, limit)` that returns up to `limit` items. With
+        `direction` :data:`NEXT` the items come after `position` (from the start if it is None) in ascending
+        order, with :data:`PREVIOUS` they come before `position` in descending order (nearest first).
+    :param key: function that returns the (json encodable) key of an item, or the name of a dict key
+    :param int limit: page size, defaults to the `limit` query argument
+    :return: dict with the `items` of the page, `next_cursor` and `prev_cursor` (None if there is no page)
+    :raise InvalidParametersException: if the limit or the cursor are not valid
+    """
+    if isinstance(key, basestring):
+        key = itemgetter(key)
+    if limit is None:
+        limit = _get_limit()
+    position, direction = None, NEXT
+    cursor = request.args.get('cursor')
+    if cursor:
+        position, direction = _load_cursor(cursor)
+
+    items = list(islice(fetch(position, direction, limit + 1), limit + 1))
+    has_more = len(items) > limit
+    items = items[:limit]
+    if direction == PREVIOUS:
+        items.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, position is not None
+
+    next_cursor = prev_cursor = None
+    if items:
+        if has_next:
+            next_cursor = _dump_cursor(key(items[-1]), NEXT)
+        if has_previous:
+            prev_cursor = _dump_cursor(key(items[0]), PREVIOUS)
+    elif direction == PREVIOUS:  # nothing before the position, the client can still go back to it
+        next_cursor = _dump_cursor(position, NEXT) if position is not None else None
+    return {'items': items, 'next_cursor': next_cursor, 'prev_cursor': prev_cursor}
+
+
+def _get_limit():
+    config = current_app.config
+    default = config.get('PAGINATION_DEFAULT_LIMIT', 20)
+    maximum = config.get('PAGINATION_MAX_LIMIT', 100)
+    limit = request.args.get('limit', default)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise InvalidParametersException('limit must be an integer')
+    if not 1 <= limit <= maximum:
+        raise InvalidParametersException('limit must be between 1 and %d' % maximum)
+    return limit
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.secret_key, salt='webapp.pagination')
+
+
+def _dump_cursor(position, direction):
+    return _serializer().dumps([position, direction])
+
+
+def _load_cursor(cursor):
+    try:
+        position, direction = _serializer().loads(cursor)
+    except (BadData, TypeError, ValueError):
+        raise InvalidParametersException('invalid cursor')
+    if direction not in (NEXT, PREVIOUS):
+        raise InvalidParametersException('invalid cursor')
+    return position, direction
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+    profiling
+    ~~~~~~~~~~~~~~~
+
+    Sampled cProfile capture of requests, the profiles are saved as pstats files per endpoint
+
+"""
+import cProfile
+import errno
+import itertools
+import os
+import random
+import time
+
+from flask import current_app, g, request
+
+from webapp.lib.utils import token_matches
+
+UNMATCHED = 'unmatched'
+
+
+class RequestProfiler(object):
+
+    def __init__(self, directory, rate=0.0, header='X-Profile', token=None, max_files=1000):
+        """
+        Profiles a fraction of the requests and the requests with the trigger header. Requests that are not
+        sampled only pay for a random number and a header lookup.
+
+        :param str directory: where the profiles are written, a directory per endpoint
+        :param float rate: fraction of the requests that are profiled, from 0 to 1
+        :param str header: header that triggers the profiling of a request when its value is the token
+        :param str token: secret value of the header, None disables the header
+        :param int max_files: profiles kept per endpoint, new ones are not written once there are as many
+        """
+        self.directory = directory
+        self.rate = rate
+        self.header = header
+        self.token = token
+        self.max_files = max_files
+        self._counter = itertools.count()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get('PROFILING_DIR', 'profiles'),
+                   rate=config.get('PROFILING_RATE', 0.0),
+                   header=config.get('PROFILING_HEADER', 'X-Profile'),
+                   token=config.get('PROFILING_TOKEN'),
+                   max_files=config.get('PROFILING_MAX_FILES', 1000))
+
+    def is_sampled(self):
+        if self.rate and random.random() < self.rate:
+            return True
+        return self.token is not None and token_matches(request.headers.get(self.header), self.token)
+
+    def start(self):
+        """ Before request hook that starts the profiler if the request is sampled """
+        if self.is_sampled():
+            profile = g._profile = cProfile.Profile()
+            profile.enable()
+
+    def finish(self, exception=None):
+        """ Teardown request hook that stops the profiler and writes the profile of the request """
+        profile = getattr(g, '_profile', None)
+        if profile is None:
+            return
+        profile.disable()
+        del g._profile
+        try:
+            self.save(profile, request.endpoint or UNMATCHED)
+        except (IOError, OSError):
+            current_app.logger.exception('could not save the profile of %s', request.path)
+
+    def save(self, profile, endpoint):
+        """
+        :return: path of the written file or None if the endpoint already has `max_files`
+        """
+        directory = os.path.join(self.directory, endpoint.replace(os.sep, '_'))
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        if self.max_files is not None and len(os.listdir(directory)) >= self.max_files:
+            return None
+        path = os.path.join(directory, '%d-%d-%d.pstats' % (time.time() * 1000, os.getpid(), next(self._counter)))
+        profile.dump_stats(path)
+        return path
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+    ratelimit
+    ~~~~~~~~~~~~~~~
+
+    Token bucket rate limiting, enabled by adding `webapp.lib.ratelimit.limiter` to `EXTENSIONS`
+
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from importlib import import_module
+
+from flask import current_app, g, request
+
+from webapp.exceptions import TooManyRequestsException
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+class Limit(object):
+
+    def __init__(self, count, period, burst=None):
+        """
+        `count` requests every `period` seconds, tokens are refilled continuously at `count / period` per
+        second up to `burst`
+
+        :param int count: requests allowed in a period
+        :param period: seconds
+        :param int burst: bucket size, defaults to `count`
+        """
+        self.count = count
+        self.period = period
+        self.rate = float(count) / period
+        self.burst = burst if burst is not None else count
+
+    @classmethod
+    def parse(cls, value, burst=None):
+        """
+        :param value: a :class:`Limit` or a string like `100/minute` or `10/second`
+        :param int burst: bucket size, defaults to the count
+        :rtype: Limit
+        """
+        if isinstance(value, cls):
+            return value
+        try:
+            count, period = value.split('/')
+            return cls(int(count), PERIODS[period.strip().rstrip('s')], burst)
+        except (AttributeError, KeyError, ValueError):
+            raise ValueError('invalid rate limit %r, use count/period with period one of %s' %
+                             (value, ', '.join(sorted(PERIODS))))
+
+    def __str__(self):
+        for name, seconds in PERIODS.iteritems():
+            if seconds == self.period:
+                return '%d/%s' % (self.count, name)
+        return '%d/%ss' % (self.count, self.period)
+
+
+class RateLimitStore(object):
+    """
+    Interface for token bucket stores. A shared store (e.g. redis with a lua script) only needs to implement
+    `consume` atomically.
+    """
+
+    def consume(self, key, limit, cost=1):
+        """
+        Takes `cost` tokens from the bucket of the key, buckets start full
+
+        :param str key: bucket key
+        :param Limit limit: rate and size of the bucket
+        :param int cost: tokens taken
+        :return: tuple `(allowed, remaining tokens, seconds until the tokens are available)`
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryStore(RateLimitStore):
+
+    def __init__(self, max_keys=100000, clock=time.time):
+        """
+        In process store, every call is O(1). Buckets are kept in least recently used order, buckets that are
+        full again are dropped as they are equal to new ones and when there are more than `max_keys` the
+        least recently used are evicted, so memory stays bounded with any number of clients.
+
+        :param int max_keys: maximum number of buckets
+        :param clock: function that returns the current time in seconds
+        """
+        self.max_keys = max_keys
+        self.evictions = 0
+        self._clock = clock
+        self._buckets = OrderedDict()  # key -> [tokens, updated, full at], least recently used first
+        self._lock = threading.Lock()
+
+    def consume(self, key, limit, cost=1):
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            if bucket is None:
+                tokens = limit.burst
+            else:
+                tokens = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = [tokens, now, now + (limit.burst - tokens) / limit.rate]
+            self._evict(now)
+        wait = 0 if allowed else (cost - tokens) / limit.rate
+        return allowed, int(tokens), wait
+
+    def _evict(self, now):
+        # the least recently used buckets are the first to be full again, stop at the first one that is not
+        buckets = self._buckets
+        while len(buckets) > self.max_keys:
+            buckets.popitem(last=False)
+            self.evictions += 1
+        for _ in xrange(2):
+            key = next(iter(buckets), None)
+            if key is None or buckets[key][2] > now:
+                break
+            del buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+def ip_key():
+    return request.remote_addr
+
+
+def api_key():
+    """ key of the `RATELIMIT_API_KEY_HEADER` header, clients without one are limited by ip """
+    key = request.headers.get(current_app.config.get('RATELIMIT_API_KEY_HEADER', 'X-Api-Key'))
+    if key:
+        return 'key:' + key
+    return ip_key()
+
+
+KEY_FUNCTIONS = {'ip': ip_key, 'api_key': api_key}
+
+
+class _AppState(object):
+    """ rate limiting state of an app, kept in `app.extensions['rate_limiter']` """
+
+    def __init__(self, store, key_fn, default_limit, headers):
+        self.store = store
+        self.key_fn = key_fn
+        self.default_limit = default_limit
+        self.headers = headers
+
+
+class RateLimiter(object):
+
+    def __init__(self, store=None, key_fn=None):
+        """
+        Rate limits requests with token buckets, routes use the limit of :meth:`limit` or the default
+        `RATELIMIT_DEFAULT`. Requests over the limit get a 429 `too_many_requests` api error with `Retry-After`.
+
+        The limiter can be bound to several apps, each one keeps its own store and settings in
+        `app.extensions['rate_limiter']`.
+
+        :param store: a :class:`RateLimitStore` shared by the apps, by default each app gets a
+            :class:`MemoryStore` of `RATELIMIT_MAX_KEYS`
+        :param key_fn: function that returns the client key of the current request (None is not limited),
+            defaults to `RATELIMIT_KEY`, `ip`, `api_key` or the import path of a function
+        """
+        self.store = store
+        self.key_fn = key_fn
+
+    def init_app(self, app):
+        config = app.config
+        if not config.get('RATELIMIT_ENABLED', True):
+            return
+        default = config.get('RATELIMIT_DEFAULT')
+        state = _AppState(store=self.store or MemoryStore(config.get('RATELIMIT_MAX_KEYS', 100000)),
+                          key_fn=self.key_fn or _get_key_fn(config.get('RATELIMIT_KEY', 'ip')),
+                          default_limit=Limit.parse(default) if default else None,
+                          headers=config.get('RATELIMIT_HEADERS', True))
+        app.extensions['rate_limiter'] = state
+        app.before_request(self.check_request)
+        if state.headers:
+            app.after_request(add_headers)
+
+    def limit(self, value, burst=None, key_fn=None, cost=1):
+        """
+        Usage:
+
+            @base.route('/search')
+            @limiter.limit('10/second', burst=20)
+            def search():
+                # do something
+
+        Sets the limit of a route, each route has its own buckets
+
+        :param value: limit like `100/minute`, see :meth:`Limit.parse`
+        :param int burst: bucket size, defaults to the count of the limit
+        :param key_fn: function that returns the client key, defaults to the limiter key function
+        :param int cost: tokens taken by each request
+        """
+        limit = Limit.parse(value, burst)
+
+        def wrapper(fn):
+            fn.rate_limit = (limit, key_fn, cost)
+            return fn
+        return wrapper
+
+    def exempt(self, fn):
+        """ Decorator for routes without limit, e.g. health checks """
+        fn.rate_limit = None
+        return fn
+
+    def check_request(self):
+        """
+        Before request hook that takes a token from the bucket of the client for the current route
+
+        :raise TooManyRequestsException: if the bucket is empty
+        """
+        state = current_app.extensions.get('rate_limiter')
+        view = current_app.view_functions.get(request.endpoint)
+        rate_limit = getattr(view, 'rate_limit', False)
+        if rate_limit is None or state is None:
+            return
+        if rate_limit is False:
+            if state.default_limit is None:
+                return
+            limit, key_fn, cost, scope = state.default_limit, None, 1, '*'
+        else:
+            limit, key_fn, cost = rate_limit
+            scope = request.endpoint
+        client = (key_fn or state.key_fn)()
+        if client is None:
+            return
+        allowed, remaining, wait = state.store.consume('%s|%s' % (scope, client), limit, cost)
+        g._rate_limit = (limit, remaining)
+        if not allowed:
+            raise TooManyRequestsException('rate limit of %s exceeded' % limit, int(math.ceil(wait)))
+
+
+def add_headers(response):
+    """ After request hook that adds the limit and the remaining requests of the client """
+    rate_limit = getattr(g, '_rate_limit', None)
+    if rate_limit is not None:
+        limit, remaining = rate_limit
+        response.headers['X-RateLimit-Limit'] = str(limit.burst)
+        response.headers['X-RateLimit-Remaining'] = str(remaining)
+    return response
+
+
+def _get_key_fn(key):
+    if callable(key):
+        return key
+    if key in KEY_FUNCTIONS:
+        return KEY_FUNCTIONS[key]
+    module_name, name = key.rsplit('.', 1)
+    return getattr(import_module(module_name), name)
+
+
+#: limiter loaded with `EXTENSIONS = ('webapp.lib.ratelimit.limiter',)`
+limiter = RateLimiter()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+    schema
+    ~~~~~~~~~~~~~~~
+
+    Compiles json field specs into validators
+
+    A field spec maps field names to the type they should be. Values can be a type, a dict
+    (nested object whose fields are all required) or a one element list (list whose items
+    match the element spec), e.g. {'tags': [str], 'address': {'zip': str}}.
+
+"""
+
+# str -> basestring so that unicode strings are ok, float -> take all of the integer values too
+TYPE_ALIASES = {
+    str: basestring,
+    float: (float, int, long),
+}
+
+_MISSING = "'%s' field is missing"
+_WRONG_TYPE = '%s field must be type %s'
+
+
+def compile_schema(required_fields=None, optional_fields=None):
+    """
+    Compiles required and optional field specs into a single validator. The returned function
+    takes a parsed json object and returns a list of error messages, the list is empty when the
+    object is valid. All the type lookups happen here, only once, so validating is just a loop
+    of `isinstance` checks.
+
+    :param dict required_fields: spec of the fields that have to be present
+    :param dict optional_fields: spec of the fields that are checked only if present
+    :return: validator function
+    """
+    checks = _compile_fields(required_fields or {}, True) + _compile_fields(optional_fields or {}, False)
+    if not any(check[4] for check in checks):
+        return _compile_flat(checks)
+
+    def validate(json_body):
+        errors = _run_checks(checks, json_body)
+        if not errors:
+            return []
+        return [_format_error(*error) for error in errors]
+
+    return validate
+
+
+def _compile_flat(checks):
+    """
+    Validator for specs without nested objects or lists. Error messages are formatted here and there are no
+    paths to build, validating is a single loop over the fields.
+    """
+    required = tuple((key, types, _MISSING % key, _WRONG_TYPE % (key, type_name))
+                     for key, is_required, types, type_name, _ in checks if is_required)
+    optional = tuple((key, types, _WRONG_TYPE % (key, type_name))
+                     for key, is_required, types, type_name, _ in checks if not is_required)
+
+    def validate(json_body):
+        errors = []
+        get = json_body.get
+        for key, types, missing, wrong_type in required:
+            field = get(key)
+            if field is None:
+                errors.append(missing)
+            elif not isinstance(field, types):
+                errors.append(wrong_type)
+        for key, types, wrong_type in optional:
+            field = get(key)
+            if field is not None and not isinstance(field, types):
+                errors.append(wrong_type)
+        return errors
+
+    return validate
+
+
+def _compile_fields(fields_dict, required):
+    """
+    Builds a list of check tuples `(key, required, types, type_name, nested)` for a field spec
+
+    :param dict fields_dict: dict that maps fields to the type they should be
+    :param bool required: indicates if the fields in the dict are required
+    :rtype: list
+    """
+    checks = []
+    for key, spec in fields_dict.iteritems():
+        types, type_name, nested = _compile_spec(spec)
+        checks.append((key, required, types, type_name, nested))
+    return checks
+
+
+def _compile_spec(spec):
+    """
+    Compiles a single spec into the types that `isinstance` checks, the name used in error
+    messages and, for objects and lists, a nested check function.
+    """
+    if isinstance(spec, dict):
+        checks = _compile_fields(spec, True)
+        return dict, 'object', lambda value: _run_checks(checks, value)
+    if isinstance(spec, list):
+        if len(spec) != 1:
+            raise ValueError('list specs must have exactly one element: %r' % (spec,))
+        item_types, item_name, item_nested = _compile_spec(spec[0])
+        return list, 'list of %s' % item_name, _list_check(item_types, item_name, item_nested)
+    return TYPE_ALIASES.get(spec, spec), spec.__name__, None
+
+
+def _list_check(item_types, item_name, item_nested):
+    def check(value):
+        errors = None
+        for index, item in enumerate(value):
+            if not isinstance(item, item_types):
+                item_errors = [((), _WRONG_TYPE, item_name)]
+            elif item_nested is not None:
+                item_errors = item_nested(item)
+            else:
+                continue
+            if item_errors:
+                if errors is None:
+                    errors = []
+                errors.extend(((index,) + path, msg, name) for path, msg, name in item_errors)
+        return errors
+    return check
+
+
+def _run_checks(checks, json_body):
+    """
+    Runs compiled checks against a json object. Errors are only built when something fails, they are
+    tuples of `(path, message, type_name)` that get formatted by :func:`_format_error`
+
+    :return: list of errors or None
+    """
+    errors = None
+    for key, required, types, type_name, nested in checks:
+        field = json_body.get(key)
+        if field is None:
+            if not required:
+                continue
+            error = [((key,), _MISSING, None)]
+        elif not isinstance(field, types):
+            error = [((key,), _WRONG_TYPE, type_name)]
+        elif nested is not None:
+            error = nested(field)
+            if not error:
+                continue
+            error = [((key,) + path, msg, name) for path, msg, name in error]
+        else:
+            continue
+        if errors is None:
+            errors = []
+        errors.extend(error)
+    return errors
+
+
+def _format_error(path, message, type_name):
+    if len(path) == 1:
+        name = path[0]
+    else:
+        name = _format_path(path)
+    if type_name is None:
+        return message % name
+    return message % (name, type_name)
+
+
+def _format_path(path):
+    name = ''
+    for part in path:
+        if isinstance(part, int):
+            name = '%s[%d]' % (name, part)
+        elif name:
+            name = '%s.%s' % (name, part)
+        else:
+            name = part
+    return name
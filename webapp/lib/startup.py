@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+    startup
+    ~~~~~~~~~~~~~~~
+
+    Instrumentation of the app factory steps
+
+"""
+import time
+from contextlib import contextmanager
+
+from webapp.lib.utils import current_rss, RSS_IS_PEAK
+
+
+class StartupProfiler(object):
+
+    def __init__(self, enabled=True):
+        """
+        Records wall time and resident memory delta of every step of :meth:`webapp.AppFactory.get_app`,
+        steps of lazy loaded blueprints and extensions are recorded when they happen. Without /proc (e.g. macOS)
+        the deltas are of the peak resident memory, steps that reuse freed memory show no growth.
+
+        :param bool enabled: when disabled steps are not measured
+        """
+        self.enabled = enabled
+        self.steps = []
+
+    @contextmanager
+    def step(self, kind, name):
+        """
+        Usage:
+
+            with profiler.step('import', 'webapp.base.base'):
+                import_module('webapp.base')
+
+        :param str kind: type of step, e.g. import, extension, blueprint or hook
+        :param str name: what the step loads
+        """
+        if not self.enabled:
+            yield
+            return
+        memory = current_rss()
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.steps.append({'kind': kind,
+                               'name': name,
+                               'seconds': time.time() - start,
+                               'memory': current_rss() - memory})
+
+    def report(self, sort='seconds'):
+        """
+        :param str sort: key used to sort the steps, slowest or biggest first
+        :return: dict with the totals, the steps and `memory_is_peak`, True if memory is the growth of the peak
+        """
+        return {'seconds': sum(step['seconds'] for step in self.steps),
+                'memory': sum(step['memory'] for step in self.steps),
+                'memory_is_peak': RSS_IS_PEAK,
+                'steps': sorted(self.steps, key=lambda step: step[sort], reverse=True)}
+
+    def log_line(self, slowest=3):
+        """
+        :param int slowest: number of steps included
+        :return: one line summary with the totals and the slowest steps
+        """
+        report = self.report()
+        steps = ', '.join('%s %s %.3fs %s' % (step['kind'], step['name'], step['seconds'],
+                                              format_bytes(step['memory']))
+                          for step in report['steps'][:slowest])
+        return 'startup took %.3fs %s in %d steps, slowest: %s' % (report['seconds'], format_bytes(report['memory']),
+                                                                   len(report['steps']), steps or 'none')
+
+
+def format_bytes(size):
+    """
+    :param int size: memory delta in bytes
+    :return: signed human readable size, e.g. +1.5MB
+    """
+    sign = '-' if size < 0 else '+'
+    size = abs(size)
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return '%s%.1f%s' % (sign, size, unit)
+        size /= 1024.0
+    return '%s%.1fGB' % (sign, size)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+    streaming
+    ~~~~~~~~~~~~~~~
+
+    Chunked json encoding for responses that contain generators or iterators
+
+"""
+from types import GeneratorType
+
+DEFAULT_CHUNK_SIZE = 16384
+
+
+def is_stream(value):
+    """
+    Checks if a value is a lazy iterator that should be streamed instead of materialized. Lists,
+    tuples, dicts and strings are not streams.
+
+    :param value: any value from a response dict
+    :rtype: bool
+    """
+    if isinstance(value, GeneratorType):
+        return True
+    return hasattr(value, 'next') and hasattr(value, '__iter__') and not isinstance(value, (basestring, dict))
+
+
+def has_streams(response):
+    """
+    :param dict response: api response
+    :return: True if any of the top level values of the response is a stream
+    """
+    for value in response.itervalues():
+        if is_stream(value):
+            return True
+    return False
+
+
+def iter_json(response, encode, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encodes a response dict as a json object piece by piece. Top level values that are streams are
+    encoded item by item as json arrays, any other value is encoded at once. Pieces are buffered and
+    yielded in chunks of about `chunk_size` bytes, so memory is bounded by the chunk size and by the
+    size of a single item.
+
+    :param dict response: api response, the `success` and `description` keys are emitted first
+    :param encode: function that encodes a value to a json string
+    :param int chunk_size: minimum size of the yielded chunks, the last one can be smaller
+    :return: generator of json strings
+    """
+    buf = []
+    size = 0
+    for piece in _iter_pieces(response, encode):
+        buf.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(buf)
+            buf = []
+            size = 0
+    if buf:
+        yield ''.join(buf)
+
+
+def _iter_pieces(response, encode):
+    keys = [key for key in ('success', 'description') if key in response]
+    keys.extend(key for key in response if key not in ('success', 'description'))
+    for index, key in enumerate(keys):
+        value = response[key]
+        yield '{' if index == 0 else ','
+        yield encode(key if isinstance(key, basestring) else str(key))
+        yield ':'
+        if is_stream(value):
+            yield '['
+            for item_index, item in enumerate(value):
+                if item_index:
+                    yield ','
+                yield encode(item)
+            yield ']'
+        else:
+            yield encode(value)
+    yield '}' if keys else '{}'
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+    timing
+    ~~~~~~~~~~~~~~~
+
+    Server-Timing header with the time spent in each phase of a request
+
+"""
+import time
+
+from flask import g
+
+# phases measured by the framework inside the view, they are not counted as view time
+NESTED_PHASES = ('validate', 'serialize')
+
+
+class ServerTiming(object):
+
+    def __init__(self):
+        """
+        Spans of the current request, only created when `SERVER_TIMING` is enabled
+        """
+        self.spans = []  # (name, seconds, description)
+
+    def add(self, name, seconds, description=None):
+        self.spans.append((name, seconds, description))
+
+    def header(self):
+        """
+        :return: value of the Server-Timing header, durations are in milliseconds
+        """
+        metrics = []
+        for name, seconds, description in self.spans:
+            metric = '%s;dur=%.3f' % (name, seconds * 1000)
+            if description is not None:
+                metric = '%s;desc="%s"' % (metric, description.replace('"', "'"))
+            metrics.append(metric)
+        return ', '.join(metrics)
+
+
+def get_timing():
+    """
+    :return: :class:`ServerTiming` of the current request or None if server timing is disabled
+    """
+    return getattr(g, '_server_timing', None)
+
+
+class span(object):
+
+    def __init__(self, name, description=None):
+        """
+        Usage:
+
+            with span('db', 'load users'):
+                users = load_users()
+
+        Times a block of code and adds it to the Server-Timing header, when server timing is disabled it
+        does nothing
+
+        :param str name: metric name, a token without spaces
+        :param str description: optional description shown by the browser
+        """
+        self.name = name
+        self.description = description
+        self.timing = None
+        self.start = None
+
+    def __enter__(self):
+        self.timing = get_timing()
+        if self.timing is not None:
+            self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if self.timing is not None:
+            self.timing.add(self.name, time.time() - self.start, self.description)
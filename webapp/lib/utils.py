@@ -6,9 +6,22 @@
     Collection of utilities
     
 """
+import datetime
+import decimal
+import hmac
+import inspect
+import os
 import re
+import resource
+import sys
+import uuid
 from flask.json import JSONEncoder
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 first_cap_re = re.compile('(.)([A-Z][a-z]+)')
 all_cap_re = re.compile('([a-z0-9])([A-Z])')
 
@@ -23,6 +36,132 @@ def camel_case_to_underscore(name):
     return all_cap_re.sub(r'\1_\2', s1).lower()
 
 
+_serializers = {}  # registered class -> serializer
+_class_serializers = {}  # concrete class -> serializer, resolved along the MRO
+
+
+def json_serializer(*classes):
+    """
+    Usage:
+
+        @json_serializer(Money)
+        def money_to_json(money):
+            return {'amount': str(money.amount), 'currency': money.currency}
+
+    Registers a function that converts instances of the classes, and of their subclasses, to a json encodable
+    object. It is used by :func:`json_default`, the app json backends and :class:`CustomJSONEncoder`.
+
+    :param classes: classes handled by the serializer
+    """
+    def wrapper(fn):
+        for cls in classes:
+            _serializers[cls] = fn
+        _class_serializers.clear()
+        return fn
+    return wrapper
+
+
+def serializer_for(cls):
+    """
+    Serializer of a class, the nearest registered class of its MRO or the fallback of :func:`json_default`.
+    Lookups are cached per class.
+
+    :param cls: class of the object to be serialized
+    :return: function that converts an instance to a json encodable object
+    """
+    fn = _class_serializers.get(cls)
+    if fn is None:
+        for base in inspect.getmro(cls):
+            fn = _serializers.get(base)
+            if fn is not None:
+                break
+        else:
+            if hasattr(cls, 'isoformat'):
+                fn = _isoformat
+            elif hasattr(cls, '__iter__') or hasattr(cls, '__getitem__'):
+                fn = _iterate
+            else:
+                fn = _not_serializable
+        _class_serializers[cls] = fn
+    return fn
+
+
+def json_default(o):
+    """
+    Converts objects that json can't encode natively with the serializer registered for their class, see
+    :func:`json_serializer`. Dates, decimals (as strings), UUIDs, sets and numpy arrays and scalars are built
+    in. Other objects with `isoformat` use it and any other iterable becomes a list
+    :param o: object to be converted
+    :return: json encodable object
+    :raise TypeError: if the object can't be converted
+    """
+    return serializer_for(o.__class__)(o)
+
+
+def _isoformat(o):
+    return o.isoformat()
+
+
+def _iterate(o):
+    try:
+        iterable = iter(o)
+    except TypeError:
+        return _not_serializable(o)
+    return list(iterable)
+
+
+def _not_serializable(o):
+    raise TypeError('%r is not JSON serializable' % (o,))
+
+
+json_serializer(datetime.date, datetime.datetime, datetime.time)(_isoformat)
+json_serializer(set, frozenset)(list)
+json_serializer(decimal.Decimal)(str)  # exact, `json_serializer(decimal.Decimal)(float)` writes numbers instead
+json_serializer(uuid.UUID)(str)
+
+if numpy is not None:
+    json_serializer(numpy.ndarray)(numpy.ndarray.tolist)  # converts the whole array at once
+    json_serializer(numpy.generic)(numpy.generic.item)
+
+
+def token_matches(value, token):
+    """
+    Compares a token sent by a client with the configured one in constant time
+
+    :param value: token of the request, None if it sent none
+    :param token: configured token, None never matches
+    :rtype: bool
+    """
+    return value is not None and token is not None and hmac.compare_digest(str(value), str(token))
+
+
+#: True where the resident memory of the process can only be read as its peak (no /proc, e.g. macOS), memory
+#: deltas are then the growth of the peak
+RSS_IS_PEAK = not os.path.exists('/proc/self/statm')
+
+
+def current_rss():
+    """
+    Resident memory of the current process in bytes. Reads /proc when available, otherwise it falls back
+    to the peak resident memory reported by `getrusage`, see :data:`RSS_IS_PEAK`
+    :rtype: int
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except (IOError, IndexError, ValueError):
+        return peak_rss()
+
+
+def peak_rss(platform=sys.platform):
+    """
+    Peak resident memory of the current process in bytes
+    :rtype: int
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform == 'darwin' else peak * 1024  # bytes on macOS, kilobytes elsewhere
+
+
 class CustomJSONEncoder(JSONEncoder):
 
     def __init__(self, *args, **kwargs):
@@ -38,11 +177,6 @@ class CustomJSONEncoder(JSONEncoder):
 
     def default(self, o):
         try:
-            if hasattr(o, 'isoformat'):
-                return o.isoformat()
-            iterable = iter(o)
+            return json_default(o)
         except TypeError:
-            pass
-        else:
-            return list(iterable)
-        return JSONEncoder.default(self, o)
\ No newline at end of file
+            return JSONEncoder.default(self, o)
\ No newline at end of file
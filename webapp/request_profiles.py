@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+    request_profiles
+    ~~~~~~~~~~~~~~~
+
+    Merges and summarizes the request profiles captured with `PROFILING_ENABLED`
+
+    Usage:
+
+        python -m webapp.request_profiles  # profiles and total time per endpoint
+        python -m webapp.request_profiles --endpoint base.hello_world --sort tottime --limit 20
+        python -m webapp.request_profiles --endpoint base.hello_world --merge hello.pstats  # e.g. for snakeviz
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import pstats
+import sys
+
+from werkzeug.utils import import_string
+
+
+def list_profiles(directory):
+    """
+    :return: dict of endpoint -> paths of its pstats files
+    """
+    profiles = {}
+    if not os.path.isdir(directory):
+        return profiles
+    for endpoint in sorted(os.listdir(directory)):
+        endpoint_dir = os.path.join(directory, endpoint)
+        if os.path.isdir(endpoint_dir):
+            paths = sorted(os.path.join(endpoint_dir, name) for name in os.listdir(endpoint_dir)
+                           if name.endswith('.pstats'))
+            if paths:
+                profiles[endpoint] = paths
+    return profiles
+
+
+def merge(paths, stream=None):
+    """
+    :return: :class:`pstats.Stats` with the profiles added up
+    """
+    stats = pstats.Stats(paths[0], stream=stream or sys.stdout)
+    for path in paths[1:]:
+        stats.add(path)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarize the sampled request profiles')
+    parser.add_argument('--env', default=os.environ.get('ENV', 'development'), help='settings module to use')
+    parser.add_argument('--dir', default=None, help='profiles directory, defaults to PROFILING_DIR')
+    parser.add_argument('--endpoint', action='append', help='endpoints to print, by default all of them')
+    parser.add_argument('--sort', default='cumulative', help='pstats sort key, e.g. cumulative or tottime')
+    parser.add_argument('--limit', type=int, default=15, help='functions printed per endpoint')
+    parser.add_argument('--merge', help='write the merged profile of the endpoint to this file')
+    args = parser.parse_args(argv)
+
+    directory = args.dir
+    if directory is None:
+        directory = getattr(import_string('settings.%s' % args.env), 'PROFILING_DIR', 'profiles')
+    profiles = list_profiles(directory)
+    if args.endpoint:
+        profiles = dict((endpoint, paths) for endpoint, paths in profiles.iteritems() if endpoint in args.endpoint)
+    if not profiles:
+        print('no profiles in %s' % directory, file=sys.stderr)
+        return 1
+
+    if args.merge:
+        if len(profiles) != 1:
+            print('--merge needs a single --endpoint', file=sys.stderr)
+            return 1
+        merge(profiles.values()[0]).dump_stats(args.merge)
+        return 0
+
+    print('{:<40} {:>8} {:>12} {:>12}'.format('endpoint', 'profiles', 'total s', 'mean ms'))
+    merged = {}
+    for endpoint, paths in sorted(profiles.iteritems()):
+        stats = merged[endpoint] = merge(paths)
+        print('{:<40} {:>8} {:>12.3f} {:>12.3f}'.format(endpoint, len(paths), stats.total_tt,
+                                                        stats.total_tt / len(paths) * 1000))
+    if args.endpoint:
+        for endpoint, stats in sorted(merged.iteritems()):
+            print('\n%s' % endpoint)
+            stats.strip_dirs().sort_stats(args.sort).print_stats(args.limit)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
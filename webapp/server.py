@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+    server
+    ~~~~~~~~~~~~~~~
+
+    Pre-fork production server. The app is built once in the master and the workers are forked from it, so
+    they share its memory (copy on write). Settings are selected with `ENV` like in `webapp.app`.
+
+    Usage:
+
+        ENV=staging python -m webapp.server --bind 0.0.0.0:8000 --workers 8 --max-requests 10000
+
+    Signals of the master:
+
+        TERM, INT  graceful stop, workers finish the request they are serving
+        HUP        rolling reload, the app is built again and the workers are replaced one by one
+        TTIN, TTOU add or remove a worker
+"""
+from __future__ import print_function
+
+import argparse
+import errno
+import logging
+import multiprocessing
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+from werkzeug.utils import import_string
+
+logger = logging.getLogger('webapp.server')
+
+
+def load_app(env):
+    """
+    Builds the app of the `env` settings with every blueprint and extension loaded, lazy loading would
+    otherwise import them in each worker after the fork
+    """
+    settings = import_string('settings.%s' % env)
+    settings.EAGER_LOADING = True
+    from webapp import AppFactory
+    return AppFactory(settings).get_app('webapp.app')
+
+
+def project_packages(config):
+    """
+    :return: top level packages of the project, `webapp`, `settings` and the ones of the blueprints, extensions
+        and hooks of the app config
+    """
+    paths = [blueprint[0] for blueprint in config.get('BLUEPRINTS', ())]
+    for name in ('EXTENSIONS', 'BEFORE_REQUEST_HOOKS', 'AFTER_REQUEST_HOOKS'):
+        paths.extend(config.get(name, ()))
+    return set(['webapp', 'settings']) | set(path.split('.', 1)[0] for path in paths)
+
+
+def unload_modules(packages):
+    """
+    Removes the modules of the packages from `sys.modules`, so that the app can be built with new code.
+    Libraries are kept even if they are installed inside the project, e.g. in a virtualenv.
+    """
+    for name in sys.modules.keys():
+        if name.split('.', 1)[0] in packages and name not in ('__main__', __name__):
+            del sys.modules[name]
+
+
+class WorkerServer(BaseWSGIServer):
+    """
+    Werkzeug wsgi server for the workers, its socket is non blocking because every worker of a shared socket
+    is woken up by a connection and only one of them gets it
+    """
+
+    timeout = 1.0  # seconds a worker waits for a connection before checking if it must stop
+
+    def __init__(self, host, port, app, handler=None, reuse_port=False, connection_timeout=30):
+        """
+        :param int connection_timeout: seconds a connection can block on a read or a write, so that a slow
+            client can not hold the worker
+        """
+        self.reuse_port = reuse_port
+        self.connection_timeout = connection_timeout
+        super(WorkerServer, self).__init__(host, port, app, handler)
+        self.socket.setblocking(False)
+
+    def server_bind(self):
+        if self.reuse_port:  # the kernel balances the connections between the sockets of the workers
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        BaseWSGIServer.server_bind(self)
+
+    def handle_request_if_ready(self):
+        """
+        Serves a request if a connection arrives before the timeout
+
+        :return: True if a request was served
+        """
+        try:
+            request, client_address = self.get_request()
+        except socket.error as e:
+            if e.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                raise
+            try:
+                select.select([self.socket], [], [], self.timeout)
+            except select.error as e:
+                if e.args[0] != errno.EINTR:
+                    raise
+            return False
+        request.settimeout(self.connection_timeout)
+        if self.verify_request(request, client_address):
+            try:
+                self.process_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+                self.shutdown_request(request)
+        else:
+            self.shutdown_request(request)
+        return True
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_request(self, *args, **kwargs):
+        pass  # access logs are left to the proxy in front
+
+
+class PreforkServer(object):
+
+    def __init__(self, env, host='127.0.0.1', port=5000, workers=None, max_requests=0, reuse_port=False,
+                 graceful_timeout=30, connection_timeout=30, access_log=False):
+        """
+        :param str env: settings module, e.g. `staging`
+        :param str host: address to listen on
+        :param int port: port to listen on
+        :param int workers: number of worker processes, defaults to the number of cores
+        :param int max_requests: requests served by a worker before it is replaced, 0 for no limit. A random
+            jitter of up to 10% avoids replacing every worker at the same time
+        :param bool reuse_port: each worker binds its own socket with `SO_REUSEPORT` and the kernel balances
+            the connections, otherwise the workers accept from the socket of the master
+        :param int graceful_timeout: seconds workers have to finish their requests when stopping
+        :param int connection_timeout: seconds a worker waits on a read or a write of a client connection
+        :param bool access_log: log every request
+        """
+        self.env = env
+        self.host = host
+        self.port = port
+        self.num_workers = workers or multiprocessing.cpu_count()
+        self.max_requests = max_requests
+        self.reuse_port = reuse_port
+        self.graceful_timeout = graceful_timeout
+        self.connection_timeout = connection_timeout
+        self.access_log = access_log
+        self.app = None
+        self.listener = None
+        self.workers = {}  # pid -> generation
+        self.generation = 0
+        self._signals = []
+        self._stopping = False
+
+    def run(self):
+        """ Builds the app, starts the workers and supervises them until the master is stopped """
+        self.app = load_app(self.env)
+        if not self.reuse_port:
+            self.listener = self._make_server()
+            self.port = self.listener.server_address[1]
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(sig, self._queue_signal)
+        logger.info('listening on %s:%d with %d workers', self.host, self.port, self.num_workers)
+
+        while not self._stopping:
+            self._reap()
+            self._handle_signals()
+            if self._stopping:
+                break
+            self._spawn_missing()
+            time.sleep(0.2)
+        self.stop()
+
+    def stop(self):
+        """ Asks the workers to finish and kills the ones that are still running after the graceful timeout """
+        self._signal_workers(signal.SIGTERM, self.workers)
+        deadline = time.time() + self.graceful_timeout
+        while self.workers and time.time() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        self._signal_workers(signal.SIGKILL, self.workers)
+        self._reap()
+        if self.listener is not None:
+            self.listener.server_close()
+
+    def reload(self):
+        """
+        Rolling reload: the app is built again with fresh code and settings, then each old worker is replaced
+        by a new one. The listening socket stays open, so no connection is refused while workers change.
+        """
+        try:
+            unload_modules(project_packages(self.app.config))
+            app = load_app(self.env)
+        except Exception:
+            logger.exception('reload failed, the workers keep the current app')
+            return
+        self.app = app
+        self.generation += 1
+        for pid, generation in self.workers.items():
+            if generation < self.generation:
+                self._spawn()
+                self._signal_workers(signal.SIGTERM, [pid])
+        logger.info('reloaded, generation %d', self.generation)
+
+    def _queue_signal(self, sig, frame):
+        self._signals.append(sig)
+
+    def _handle_signals(self):
+        while self._signals:
+            sig = self._signals.pop(0)
+            if sig in (signal.SIGTERM, signal.SIGINT):
+                self._stopping = True
+            elif sig == signal.SIGHUP:
+                self.reload()
+            elif sig == signal.SIGTTIN:
+                self.num_workers += 1
+            elif sig == signal.SIGTTOU and self.num_workers > 1:
+                self.num_workers -= 1
+                oldest = min(self.workers, key=self.workers.get) if self.workers else None
+                if oldest is not None:
+                    self._signal_workers(signal.SIGTERM, [oldest])
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError as e:
+                if e.errno == errno.ECHILD:
+                    return
+                raise
+            if not pid:
+                return
+            if self.workers.pop(pid, None) is not None and not self._stopping and status != 0:
+                logger.warning('worker %d died with status %d', pid, status)
+
+    def _spawn_missing(self):
+        current = sum(1 for generation in self.workers.itervalues() if generation == self.generation)
+        for _ in xrange(self.num_workers - current):
+            self._spawn()
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = self.generation
+            return pid
+        status = 0
+        try:
+            self._run_worker()
+        except Exception:
+            logger.exception('worker %d crashed', os.getpid())
+            status = 1
+        finally:
+            os._exit(status)
+
+    def _run_worker(self):
+        for sig in (signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(sig, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # the master stops the workers on ctrl+c
+        alive = [True]
+
+        def stop(sig, frame):
+            alive[0] = False
+        signal.signal(signal.SIGTERM, stop)
+        random.seed()  # otherwise every worker repeats the random sequence of the master
+
+        server = self.listener if self.listener is not None else self._make_server()
+        server.app = self.app
+        max_requests = self.max_requests
+        if max_requests:
+            max_requests += random.randint(0, max_requests // 10)
+        served = 0
+        while alive[0] and os.getppid() != 1:
+            if server.handle_request_if_ready():
+                served += 1
+                if max_requests and served >= max_requests:
+                    break
+        server.server_close()
+
+    def _make_server(self):
+        handler = WSGIRequestHandler if self.access_log else QuietHandler
+        return WorkerServer(self.host, self.port, self.app, handler, self.reuse_port, self.connection_timeout)
+
+    def _signal_workers(self, sig, pids):
+        for pid in list(pids):
+            try:
+                os.kill(pid, sig)
+            except OSError as e:
+                if e.errno != errno.ESRCH:
+                    raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the app with a pre-fork server')
+    parser.add_argument('--env', default=os.environ.get('ENV', 'development'), help='settings module to use')
+    parser.add_argument('--bind', default=None, help='host:port, defaults to SERVER_BIND')
+    parser.add_argument('--workers', type=int, default=None, help='defaults to SERVER_WORKERS or the cores')
+    parser.add_argument('--max-requests', type=int, default=None, help='defaults to SERVER_MAX_REQUESTS')
+    parser.add_argument('--reuse-port', action='store_true', default=None, help='bind a socket per worker')
+    parser.add_argument('--graceful-timeout', type=int, default=None)
+    parser.add_argument('--connection-timeout', type=int, default=None, help='defaults to SERVER_CONNECTION_TIMEOUT')
+    parser.add_argument('--access-log', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(process)d] %(levelname)s %(message)s')
+    settings = import_string('settings.%s' % args.env)
+    bind = args.bind or getattr(settings, 'SERVER_BIND', '127.0.0.1:5000')
+    host, _, port = bind.rpartition(':')
+    server = PreforkServer(
+        args.env, host or '127.0.0.1', int(port),
+        workers=_option(args.workers, settings, 'SERVER_WORKERS', None),
+        max_requests=_option(args.max_requests, settings, 'SERVER_MAX_REQUESTS', 0),
+        reuse_port=_option(args.reuse_port, settings, 'SERVER_REUSE_PORT', False),
+        graceful_timeout=_option(args.graceful_timeout, settings, 'SERVER_GRACEFUL_TIMEOUT', 30),
+        connection_timeout=_option(args.connection_timeout, settings, 'SERVER_CONNECTION_TIMEOUT', 30),
+        access_log=args.access_log)
+    server.run()
+    return 0
+
+
+def _option(value, settings, name, default):
+    return value if value is not None else getattr(settings, name, default)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+    startup_profile
+    ~~~~~~~~~~~~~~~
+
+    Prints where the time and memory of building the app go
+
+    Usage:
+
+        python -m webapp.startup_profile --sort memory --limit 10
+        python -m webapp.startup_profile --json --max-seconds 2  # fails when startup is slower, e.g. in CI
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import sys
+
+from werkzeug.utils import import_string
+from webapp import AppFactory
+from webapp.lib.startup import format_bytes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Profile the startup of the app')
+    parser.add_argument('--env', default=os.environ.get('ENV', 'development'), help='settings module to use')
+    parser.add_argument('--sort', choices=('seconds', 'memory'), default='seconds')
+    parser.add_argument('--limit', type=int, default=None, help='number of steps to print')
+    parser.add_argument('--json', action='store_true', help='print the report as json')
+    parser.add_argument('--max-seconds', type=float, default=None, help='exit with 1 if startup is slower')
+    args = parser.parse_args(argv)
+
+    settings = import_string('settings.%s' % args.env)
+    settings.STARTUP_PROFILING = True
+    app = AppFactory(settings).get_app('webapp.app')
+    if app.lazy_loader is not None:  # lazy steps would otherwise be missing
+        app.lazy_loader.load_all()
+
+    report = app.startup_profiler.report(args.sort)
+    report['steps'] = report['steps'][:args.limit]
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print('{:<10} {:>9} {:>10}  {}'.format('kind', 'seconds', 'memory', 'name'))
+        for step in report['steps']:
+            print('{:<10} {:>9.4f} {:>10}  {}'.format(step['kind'], step['seconds'], format_bytes(step['memory']),
+                                                      step['name']))
+        print('{:<10} {:>9.4f} {:>10}'.format('total', report['seconds'], format_bytes(report['memory'])))
+        if report['memory_is_peak']:
+            print('memory is the growth of the peak resident memory, /proc is not available')
+
+    if args.max_seconds is not None and report['seconds'] > args.max_seconds:
+        print('startup took %.3fs, more than %.3fs' % (report['seconds'], args.max_seconds), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())